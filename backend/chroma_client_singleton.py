@@ -1,11 +1,11 @@
 import os
-from chromadb import HttpClient
 
 class ChromaClientSingleton:
     _instance = None
     
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
+            from chromadb import HttpClient
             cls._instance = super(ChromaClientSingleton, cls).__new__(cls)
             host = os.getenv("CHROMA_HOST", "chromadb")
             port = int(os.getenv("CHROMA_PORT", "8000"))
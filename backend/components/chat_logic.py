@@ -1,10 +1,33 @@
 # backend/components/chat_logic.py
 
-from langchain_community.vectorstores import Chroma
-from langchain_openai import ChatOpenAI
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables import RunnablePassthrough, RunnableLambda
 from langchain_core.output_parsers import StrOutputParser
+from backend.utils.model_loader import get_chat_model
+from backend.utils.metrics import instrument_llm, stage_timer
+from backend.components.retrieval_cache import cached_embed_query, cached_embed_queries, cached_similarity_search
+from backend.components.context_compression import compress_contexts, compress_documents
+from backend.components.multi_query import fuse_results, multi_query_search, parse_query_lines, template_variants
+
+# Same default as VectorStore.as_retriever()
+RETRIEVAL_K = 4
+# Concurrent LLM calls per /ask-batch/ request.
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+# Sends the answer LLM only the retrieved sentences closest to the question (see context_compression).
+CONTEXT_COMPRESSION = os.getenv("CONTEXT_COMPRESSION", "false").lower() == "true"
+# Extra query variants retrieved for each question and fused with it; 0 retrieves the question alone.
+RETRIEVAL_QUERY_VARIANTS = int(os.getenv("RETRIEVAL_QUERY_VARIANTS", "0"))
+# "template" derives the variants without an LLM; "llm" asks for them in the standalone-question call.
+RETRIEVAL_VARIANT_MODE = os.getenv("RETRIEVAL_VARIANT_MODE", "template")
+
+RETRIEVAL_VARIANT_MODES = ("template", "llm")
+
+if RETRIEVAL_VARIANT_MODE not in RETRIEVAL_VARIANT_MODES:
+    raise ValueError(f"RETRIEVAL_VARIANT_MODE must be one of {RETRIEVAL_VARIANT_MODES}, got {RETRIEVAL_VARIANT_MODE!r}")
 
 # Language-specific prompts for QA
 ANSWER_PROMPTS = {
@@ -43,30 +66,92 @@ STANDALONE_QUESTION_PROMPTS = {
     )
 }
 
-def create_qa_chain(vector_store, language="en"):
+MULTI_QUERY_PROMPTS = {
+    "en": ChatPromptTemplate.from_messages(
+        [
+            ("system", "Given the following conversation and a follow-up question, rephrase the follow-up question to be a standalone question. "
+                       "Then write {count} differently worded search queries for the same question. "
+                       "Reply with the standalone question on the first line and one query per following line, without numbering."),
+            MessagesPlaceholder(variable_name="chat_history"),
+            ("human", "Follow-Up Question: {question}"),
+        ]
+    ),
+    "es": ChatPromptTemplate.from_messages(
+        [
+            ("system", "Dada la siguiente conversación y una pregunta de seguimiento, reformula la pregunta de seguimiento para que sea una pregunta independiente. "
+                       "Luego escribe {count} consultas de búsqueda con distintas palabras para la misma pregunta. "
+                       "Responde con la pregunta independiente en la primera línea y una consulta por línea a continuación, sin numerarlas."),
+            MessagesPlaceholder(variable_name="chat_history"),
+            ("human", "Pregunta de seguimiento: {question}"),
+        ]
+    )
+}
+
+def retrieve_documents(vector_store, queries, collection_version=None, k=RETRIEVAL_K):
+    """
+    Retrieves the top-k chunks for the first query. With more queries (variants of the same
+    question), they are embedded in one batch, searched concurrently and fused, so the
+    latency stays close to that of a single search.
+    Returns the documents and the first query's embedding.
+    """
+    with stage_timer("qa_chain", "embed_query"):
+        if len(queries) == 1:
+            query_embeddings = [cached_embed_query(vector_store.embeddings, queries[0])]
+        else:
+            query_embeddings = cached_embed_queries(vector_store.embeddings, queries)
+    with stage_timer("qa_chain", "retrieval"):
+        if len(queries) == 1:
+            documents = cached_similarity_search(vector_store, query_embeddings[0], k, collection_version)
+        else:
+            documents = fuse_results(multi_query_search(vector_store, query_embeddings, k, collection_version), k)
+    return documents, query_embeddings[0]
+
+def create_qa_chain(vector_store, language="en", collection_version=None):
     """
     Creates a full conversational QA chain using LCEL.
+    Each stage (question rewrite, query embedding, retrieval, answer) is timed separately.
+    Query embeddings are cached, and so are retrieval results when collection_version is given.
+    With RETRIEVAL_QUERY_VARIANTS, variants of the standalone question are retrieved too and fused.
+    With CONTEXT_COMPRESSION, the retrieved chunks are cut down to their most relevant sentences.
     """
-    llm = ChatOpenAI(temperature=0)
-    retriever = vector_store.as_retriever()
+    llm = get_chat_model(temperature=0)
 
     answer_prompt = ANSWER_PROMPTS.get(language, ANSWER_PROMPTS["en"])
     standalone_question_prompt = STANDALONE_QUESTION_PROMPTS.get(language, STANDALONE_QUESTION_PROMPTS["en"])
 
-    standalone_question_chain = (
-        standalone_question_prompt
-        | llm
-        | StrOutputParser()
-    )
+    if RETRIEVAL_QUERY_VARIANTS and RETRIEVAL_VARIANT_MODE == "llm":
+        # One LLM call returns the standalone question and its variants, so there is no extra round trip.
+        multi_query_prompt = MULTI_QUERY_PROMPTS.get(language, MULTI_QUERY_PROMPTS["en"]).partial(count=str(RETRIEVAL_QUERY_VARIANTS))
+        queries_chain = (
+            multi_query_prompt
+            | instrument_llm(llm, "rewrite")
+            | StrOutputParser()
+            | RunnableLambda(lambda text: parse_query_lines(text, RETRIEVAL_QUERY_VARIANTS))
+        )
+        question_step = RunnablePassthrough.assign(queries=queries_chain) | RunnablePassthrough.assign(
+            queries=lambda x: x["queries"] or [x["question"]],
+        )
+    else:
+        standalone_question_chain = (
+            standalone_question_prompt
+            | instrument_llm(llm, "rewrite")
+            | StrOutputParser()
+        )
+        question_step = RunnablePassthrough.assign(standalone_question=standalone_question_chain) | RunnablePassthrough.assign(
+            queries=lambda x: template_variants(x["standalone_question"], RETRIEVAL_QUERY_VARIANTS, language),
+        )
+
+    def retrieve(x):
+        documents, query_embedding = retrieve_documents(vector_store, x["queries"], collection_version)
+        if CONTEXT_COMPRESSION:
+            with stage_timer("qa_chain", "compress"):
+                documents = compress_documents(vector_store.embeddings, query_embedding, documents)
+        return documents
     
     qa_chain = (
-        RunnablePassthrough.assign(
-            standalone_question=standalone_question_chain,
-            chat_history=lambda x: x["chat_history"],
-            question=lambda x: x["question"]
-        )
+        question_step
         | RunnablePassthrough.assign(
-            context=lambda x: retriever.invoke(x["standalone_question"]),
+            context=RunnableLambda(retrieve),
         )
         | RunnablePassthrough.assign(
             context=lambda x: "\n\n".join([doc.page_content for doc in x["context"]]),
@@ -79,9 +164,93 @@ def create_qa_chain(vector_store, language="en"):
             }
         )
         | answer_prompt
-        | llm
+        | instrument_llm(llm, "answer")
         | StrOutputParser()
         | RunnableLambda(lambda x: {"answer": x})
     )
     
-    return qa_chain
\ No newline at end of file
+    return qa_chain
+
+
+def batch_similarity_search(vector_store, query_embeddings, k=RETRIEVAL_K):
+    """Retrieves the top-k chunks for every query embedding with a single Chroma query."""
+    if not query_embeddings:
+        return []
+    if hasattr(vector_store, "quantized_index"):
+        # Quantized stores search their in-memory index per query instead.
+        return [vector_store.similarity_search_by_vector(embedding, k=k) for embedding in query_embeddings]
+    results = vector_store._collection.query(
+        query_embeddings=query_embeddings, n_results=k, include=["documents", "metadatas"]
+    )
+    return [
+        [Document(id=doc_id, page_content=text, metadata=metadata or {}) for doc_id, text, metadata in zip(ids, texts, metadatas)]
+        for ids, texts, metadatas in zip(results["ids"], results["documents"], results["metadatas"])
+    ]
+
+def answer_questions(vector_store, questions, chat_history, language="en", max_concurrency=BATCH_LLM_CONCURRENCY):
+    """
+    Answers a batch of questions against the same documents.
+    Questions are only rewritten when there is chat history to resolve. All of them are
+    embedded in one forward pass and retrieved with one multi-query request (and, with
+    CONTEXT_COMPRESSION, their contexts are compressed in one batch), and the LLM
+    calls run concurrently, at most max_concurrency at a time.
+    Returns one result per question (answer or error, with timings) and the batch timings.
+    A result with an error has no answer (None).
+    """
+    llm = get_chat_model(temperature=0)
+    answer_prompt = ANSWER_PROMPTS.get(language, ANSWER_PROMPTS["en"])
+    standalone_question_prompt = STANDALONE_QUESTION_PROMPTS.get(language, STANDALONE_QUESTION_PROMPTS["en"])
+    rewrite_chain = standalone_question_prompt | instrument_llm(llm, "rewrite") | StrOutputParser()
+    answer_chain = answer_prompt | instrument_llm(llm, "answer") | StrOutputParser()
+
+    results = [{"question": question, "answer": None, "timings": {}} for question in questions]
+    batch_timings = {}
+
+    def run_timed(index, name, func):
+        start = time.perf_counter()
+        try:
+            return func()
+        except Exception as e:
+            results[index]["error"] = str(e)
+            return None
+        finally:
+            results[index]["timings"][f"{name}_ms"] = (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+        standalone_questions = list(questions)
+        if chat_history:
+            rewrites = pool.map(
+                lambda i: run_timed(i, "rewrite", lambda: rewrite_chain.invoke({"question": questions[i], "chat_history": chat_history})),
+                range(len(questions)),
+            )
+            standalone_questions = [rewrite or question for rewrite, question in zip(rewrites, questions)]
+
+        # A question whose rewrite failed is reported with its error and not answered.
+        pending = [i for i, result in enumerate(results) if "error" not in result]
+
+        start = time.perf_counter()
+        with stage_timer("qa_chain", "embed_query"):
+            query_embeddings = cached_embed_queries(vector_store.embeddings, [standalone_questions[i] for i in pending])
+        batch_timings["embed_ms"] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        with stage_timer("qa_chain", "retrieval"):
+            contexts = batch_similarity_search(vector_store, query_embeddings)
+        batch_timings["retrieval_ms"] = (time.perf_counter() - start) * 1000
+
+        if CONTEXT_COMPRESSION:
+            start = time.perf_counter()
+            with stage_timer("qa_chain", "compress"):
+                contexts = compress_contexts(vector_store.embeddings, query_embeddings, contexts)
+            batch_timings["compress_ms"] = (time.perf_counter() - start) * 1000
+
+        def answer(i, context_docs):
+            context = "\n\n".join(doc.page_content for doc in context_docs)
+            results[i]["answer"] = run_timed(
+                i, "answer", lambda: answer_chain.invoke({"context": context, "question": questions[i], "chat_history": chat_history})
+            )
+
+        list(pool.map(answer, pending, contexts))
+
+    return results, batch_timings
+
@@ -0,0 +1,111 @@
+# backend/components/context_compression.py
+
+import os
+import re
+from typing import List
+
+import numpy as np
+from langchain_core.documents import Document
+
+from backend.components.retrieval_cache import LRUCache
+from backend.components.token_chunker import get_tokenizer
+from backend.utils.metrics import CONTEXT_COMPRESSION_TOKENS
+
+# Tokens of retrieved text kept per question. Contexts already within the budget are left as they are.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "400"))
+# The budget is counted in tokens of the answer LLM, not of the embedding model.
+CONTEXT_ENCODING = os.getenv("CONTEXT_ENCODING", "cl100k_base")
+# Sentence embeddings kept per process (entries); chunks are retrieved again and again for one session.
+SENTENCE_EMBEDDING_CACHE_SIZE = int(os.getenv("SENTENCE_EMBEDDING_CACHE_SIZE", "8192"))
+
+# Sentence ends, or paragraph breaks for text without punctuation (tables, headings).
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+# Shorter fragments ("Fig. 2", a cut-off word at a chunk edge) are merged into the previous sentence.
+_MIN_SENTENCE_CHARS = 20
+
+_sentence_cache = LRUCache(SENTENCE_EMBEDDING_CACHE_SIZE)
+
+def split_sentences(text: str) -> List[str]:
+    sentences = []
+    for piece in _SENTENCE_BOUNDARY.split(text):
+        piece = piece.strip()
+        if not piece:
+            continue
+        if sentences and len(piece) < _MIN_SENTENCE_CHARS:
+            sentences[-1] = f"{sentences[-1]} {piece}"
+        else:
+            sentences.append(piece)
+    return sentences
+
+def _embed_sentences(embeddings, sentences: List[str]) -> np.ndarray:
+    """Unit-length embeddings of the sentences, one row each; cache misses are embedded in one batch."""
+    model = getattr(embeddings, "model_name", None) or type(embeddings).__name__
+    vectors = [_sentence_cache.get((model, sentence)) for sentence in sentences]
+    missing = [sentence for sentence, vector in zip(sentences, vectors) if vector is None]
+    if missing:
+        computed = np.asarray(embeddings.embed_documents(missing), dtype=np.float32)
+        computed /= np.maximum(np.linalg.norm(computed, axis=1, keepdims=True), 1e-12)
+        computed_by_sentence = dict(zip(missing, computed))
+        for i, sentence in enumerate(sentences):
+            if vectors[i] is None:
+                vectors[i] = computed_by_sentence[sentence]
+                _sentence_cache.put((model, sentence), vectors[i])
+    return np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+def compress_contexts(embeddings, query_embeddings: List[List[float]], contexts: List[List[Document]], token_budget: int = None) -> List[List[Document]]:
+    """
+    Shrinks each question's retrieved chunks to the sentences most similar to its query
+    embedding, within token_budget tokens. Every distinct sentence of all contexts is embedded
+    in one batch and scored with one matrix product. Kept sentences stay in their chunk, in
+    their original order, so each returned Document keeps its id and metadata (the source).
+    """
+    token_budget = token_budget or CONTEXT_TOKEN_BUDGET
+    split = [[split_sentences(doc.page_content) for doc in documents] for documents in contexts]
+    distinct = list(dict.fromkeys(sentence for chunks in split for sentences in chunks for sentence in sentences))
+    if not distinct:
+        return contexts
+    row = {sentence: i for i, sentence in enumerate(distinct)}
+    tokens = np.array(get_tokenizer(CONTEXT_ENCODING).count_batch(distinct))
+
+    pending = [i for i, chunks in enumerate(split) if sum(tokens[row[s]] for sentences in chunks for s in sentences) > token_budget]
+    if not pending:
+        return contexts
+
+    queries = np.asarray([query_embeddings[i] for i in pending], dtype=np.float32)
+    queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    scores = _embed_sentences(embeddings, distinct) @ queries.T
+
+    compressed = list(contexts)
+    for column, i in enumerate(pending):
+        # (chunk index, sentence index, row) of every sentence in this question's context.
+        positions = [(c, s, row[sentence]) for c, sentences in enumerate(split[i]) for s, sentence in enumerate(sentences)]
+        order = np.argsort(-scores[[r for _, _, r in positions], column], kind="stable")
+        kept, used = set(), 0
+        for p in order:
+            cost = tokens[positions[p][2]]
+            # The best sentence is always kept, even on its own over the budget.
+            if kept and used + cost > token_budget:
+                continue
+            kept.add(positions[p][:2])
+            used += cost
+            if used >= token_budget:
+                break
+
+        documents = []
+        for c, (doc, sentences) in enumerate(zip(contexts[i], split[i])):
+            parts, previous = [], None
+            for s, sentence in enumerate(sentences):
+                if (c, s) in kept:
+                    # An ellipsis marks the sentences left out between two kept ones.
+                    parts.append(sentence if previous is None or previous == s - 1 else f"… {sentence}")
+                    previous = s
+            if parts:
+                documents.append(Document(id=doc.id, page_content=" ".join(parts), metadata=doc.metadata))
+        compressed[i] = documents
+        CONTEXT_COMPRESSION_TOKENS.labels("retrieved").inc(int(sum(tokens[r] for _, _, r in positions)))
+        CONTEXT_COMPRESSION_TOKENS.labels("kept").inc(int(used))
+    return compressed
+
+def compress_documents(embeddings, query_embedding: List[float], documents: List[Document], token_budget: int = None) -> List[Document]:
+    """compress_contexts for a single question."""
+    return compress_contexts(embeddings, [query_embedding], [documents], token_budget)[0]
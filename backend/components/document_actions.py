@@ -1,8 +1,9 @@
 # backend/components/document_actions.py
 
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from backend.utils.model_loader import get_chat_model
+from backend.utils.metrics import instrument_llm
 
 SUMMARIZE_PROMPTS = {
     "en": ChatPromptTemplate.from_template("Provide a concise and objective summary of the following text:\n\n{text}"),
@@ -34,17 +35,17 @@ CLASSIFICATION_PROMPTS = {
 def get_summarize_chain(language="en"):
     """Returns the LangChain chain for document summarization."""
     summary_prompt = SUMMARIZE_PROMPTS.get(language, SUMMARIZE_PROMPTS["en"])
-    llm = ChatOpenAI(temperature=0)
-    return summary_prompt | llm | StrOutputParser()
+    llm = get_chat_model(temperature=0)
+    return summary_prompt | instrument_llm(llm, "summarize") | StrOutputParser()
 
 def get_comparison_chain(language="en"):
     """Returns the LangChain chain for document comparison."""
     comparison_prompt = COMPARE_PROMPTS.get(language, COMPARE_PROMPTS["en"])
-    llm = ChatOpenAI(temperature=0)
-    return comparison_prompt | llm | StrOutputParser()
+    llm = get_chat_model(temperature=0)
+    return comparison_prompt | instrument_llm(llm, "compare") | StrOutputParser()
 
 def get_classification_chain(language="en"):
     """Returns the LangChain chain for topic classification."""
     classification_prompt = CLASSIFICATION_PROMPTS.get(language, CLASSIFICATION_PROMPTS["en"])
-    llm = ChatOpenAI(temperature=0)
-    return classification_prompt | llm | StrOutputParser()
\ No newline at end of file
+    llm = get_chat_model(temperature=0)
+    return classification_prompt | instrument_llm(llm, "classify") | StrOutputParser()
\ No newline at end of file
@@ -1,47 +1,86 @@
 import io
-from PyPDF2 import PdfReader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from typing import List
+import json
+import os
+import uuid
+import numpy as np
+from typing import Callable, List, Optional, Tuple
 from langchain_core.documents import Document
+from backend.components.pdf_extractors import extract_pdf_pages
+from backend.components.token_chunker import create_page_chunks
+from backend.utils.metrics import stage_timer
 
-def get_pdf_text(pdf_files: list) -> str:
+# Chunks embedded per embed_documents call during ingestion; cancellation is checked between batches.
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "256"))
+
+def get_pdf_pages(pdf_file: dict) -> List[str]:
     """
-    Extracts text from a list of PDF file objects.
+    Extracts the text of each page of a PDF file object, keeping page boundaries.
+    Pages without extractable text are returned as empty strings.
+    The extraction backend is chosen per file (see pdf_extractors).
     """
-    text = ""
-    for pdf_file in pdf_files:
-        pdf_reader = PdfReader(io.BytesIO(pdf_file["content"]))
-        for page in pdf_reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text
-    return text
+    return extract_pdf_pages(pdf_file["content"], pdf_file.get("filename", ""))
 
-def create_text_chunks(text: str) -> List[str]:
+def embed_file(pdf_file: dict, embeddings, check_cancelled: Optional[Callable[[], None]] = None) -> Tuple[List[Document], np.ndarray]:
     """
-    Splits a long string of text into smaller string chunks.
+    Extracts, chunks and embeds a single PDF file object.
+    Returns the chunk Documents and a float32 matrix with one row per chunk.
+    check_cancelled, if given, is called before every embedding batch; it stops
+    the work by raising.
     """
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
-    )
-    chunks = text_splitter.split_text(text)
-    return chunks
+    with stage_timer("ingestion", "extract"):
+        pages = get_pdf_pages(pdf_file)
+    with stage_timer("ingestion", "chunk"):
+        documents = create_page_chunks(pages, pdf_file["filename"])
+    if not documents:
+        return [], np.zeros((0, 0), dtype=np.float32)
+    texts = [doc.page_content for doc in documents]
+    vectors = []
+    with stage_timer("ingestion", "embed"):
+        for start in range(0, len(texts), INGEST_EMBED_BATCH_SIZE):
+            if check_cancelled:
+                check_cancelled()
+            vectors.extend(embeddings.embed_documents(texts[start:start + INGEST_EMBED_BATCH_SIZE]))
+    return documents, np.asarray(vectors, dtype=np.float32)
+
+def pack_embedded_chunks(documents: List[Document], vectors: np.ndarray) -> bytes:
+    """Serializes embedded chunks into a compact binary payload for staging."""
+    buffer = io.BytesIO()
+    payload = json.dumps([{"text": doc.page_content, "metadata": doc.metadata} for doc in documents])
+    np.savez(buffer, vectors=vectors, documents=np.asarray(payload))
+    return buffer.getvalue()
+
+def unpack_embedded_chunks(data: bytes) -> Tuple[List[Document], np.ndarray]:
+    """Inverse of pack_embedded_chunks."""
+    with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+        payload = json.loads(str(arrays["documents"]))
+        vectors = arrays["vectors"]
+    documents = [Document(page_content=item["text"], metadata=item["metadata"]) for item in payload]
+    return documents, vectors
 
-def vectorize_and_store(
-    chunks: List[Document], 
-    embeddings, 
-    chroma_client, 
-    collection_name: str
-) -> Chroma:
+def store_embedded_chunks(
+    chroma_client,
+    collection_name: str,
+    documents: List[Document],
+    vectors: np.ndarray,
+    ids: List[str] = None,
+    check_cancelled: Optional[Callable[[], None]] = None,
+):
     """
-    Vectorizes document chunks and stores them in a specific ChromaDB collection.
+    Adds pre-computed embeddings to a ChromaDB collection in client-sized batches.
+    New chunk ids are generated unless ids are given. Returns the raw Chroma collection.
+    check_cancelled, if given, is called before every batch and stops the work by raising.
     """
-    vector_store = Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        client=chroma_client,
-        collection_name=collection_name
-    )
-    return vector_store
\ No newline at end of file
+    collection = chroma_client.get_or_create_collection(name=collection_name)
+    batch_size = chroma_client.get_max_batch_size()
+    ids = ids or [str(uuid.uuid4()) for _ in documents]
+    for start in range(0, len(documents), batch_size):
+        if check_cancelled:
+            check_cancelled()
+        end = start + batch_size
+        collection.add(
+            ids=ids[start:end],
+            embeddings=vectors[start:end],
+            documents=[doc.page_content for doc in documents[start:end]],
+            metadatas=[doc.metadata for doc in documents[start:end]],
+        )
+    return collection
\ No newline at end of file
@@ -0,0 +1,103 @@
+# backend/components/multi_query.py
+
+import asyncio
+import functools
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from langchain_core.documents import Document
+
+from backend.components.retrieval_cache import cached_similarity_search
+
+# Long-lived search threads: the local Chroma client opens a database connection per thread,
+# so fresh threads for every question would pay for new connections each time.
+_search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="multi-query-search")
+
+# Reciprocal rank fusion constant; 60 is the usual choice and damps the weight of the top ranks.
+RRF_K = 60
+
+_STOPWORDS = {
+    "en": set(
+        "a an the what which who whom whose when where why how is are was were be been being do does did "
+        "of in on at to for from by with about into over under this that these those it its there their "
+        "can could should would will shall may might must i we you me us my our your please tell say says "
+        "and or but document documents file files".split()
+    ),
+    "es": set(
+        "un una unos unas el la los las lo qué que cuál cuáles quién quiénes cuándo dónde por porqué cómo "
+        "es son era eran fue ser está están de del en a al para con sobre entre este esta estos estas ese esa "
+        "eso su sus hay se me nos mi mis tu tus puede pueden debe deben dice dicen y e o u pero ni documento documentos archivo archivos".split()
+    ),
+}
+_CONJUNCTIONS = {"en": r"\b(?:and|or|as well as)\b", "es": r"\b(?:y|e|o|u|así como)\b"}
+_STATEMENT_TEMPLATES = {"en": "Information about {keywords}.", "es": "Información sobre {keywords}."}
+# Numbering or bullets an LLM puts in front of listed queries.
+_LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)]|query\s*\d*:|consulta\s*\d*:)\s*", re.IGNORECASE)
+
+def _keywords(text: str, language: str) -> str:
+    stopwords = _STOPWORDS.get(language, _STOPWORDS["en"])
+    return " ".join(word for word in re.findall(r"\w+", text.lower()) if word not in stopwords)
+
+def template_variants(question: str, count: int, language: str = "en") -> List[str]:
+    """
+    The question followed by up to count cheap rephrasings, without an LLM call: the keywords
+    of each part of a compound question ("X and Y"), its keywords alone, and a statement form.
+    """
+    keywords = _keywords(question, language)
+    clauses = re.split(_CONJUNCTIONS.get(language, _CONJUNCTIONS["en"]), question, flags=re.IGNORECASE)
+    # The parts of a compound question differ most from it, so they come first.
+    candidates = [_keywords(clause, language) for clause in clauses] if len(clauses) > 1 else []
+    candidates.append(keywords)
+    if keywords:
+        candidates.append(_STATEMENT_TEMPLATES.get(language, _STATEMENT_TEMPLATES["en"]).format(keywords=keywords))
+
+    queries = [question]
+    for candidate in candidates:
+        if len(queries) > count:
+            break
+        if candidate and candidate.lower() not in (query.lower() for query in queries):
+            queries.append(candidate)
+    return queries
+
+def parse_query_lines(text: str, count: int) -> List[str]:
+    """Splits an LLM's one-query-per-line output into at most count + 1 distinct queries."""
+    queries = []
+    for line in text.splitlines():
+        query = _LIST_MARKER.sub("", line).strip().strip('"')
+        if query and query.lower() not in (q.lower() for q in queries):
+            queries.append(query)
+    return queries[:count + 1]
+
+def multi_query_search(vector_store, query_embeddings: List[List[float]], k: int, collection_version=None) -> List[List[Document]]:
+    """
+    Runs one cached similarity search per query embedding, concurrently (asyncio.gather over
+    a shared thread pool), so the round trips to the Chroma server overlap instead of adding up.
+    """
+    async def search_all():
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(*(
+            loop.run_in_executor(_search_pool, functools.partial(cached_similarity_search, vector_store, embedding, k, collection_version))
+            for embedding in query_embeddings
+        ))
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(search_all())
+    # Called from inside an event loop (normally the chain runs in a worker thread): search in turn.
+    return [cached_similarity_search(vector_store, embedding, k, collection_version) for embedding in query_embeddings]
+
+def fuse_results(result_lists: List[List[Document]], k: int) -> List[Document]:
+    """
+    Merges ranked result lists with reciprocal rank fusion and drops duplicates; a chunk found
+    by several queries ranks above one found by a single query. Ties keep the first list's order.
+    """
+    scores, documents = {}, {}
+    for results in result_lists:
+        for rank, document in enumerate(results):
+            key = document.id or document.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+            documents.setdefault(key, document)
+    ranked = sorted(scores, key=lambda key: -scores[key])
+    return [documents[key] for key in ranked[:k]]
@@ -0,0 +1,274 @@
+# backend/components/pdf_extractors.py
+
+import importlib.util
+import io
+import logging
+import os
+import pickle
+import re
+import select
+import struct
+import subprocess
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Iterator, List
+
+from backend.utils.metrics import PDF_EXTRACTIONS
+
+logger = logging.getLogger(__name__)
+
+# "auto" picks the backends per file; a comma-separated list of names (e.g. "pypdf,PyPDF2")
+# forces that order, still falling back to the next name when one fails.
+PDF_EXTRACTOR = os.getenv("PDF_EXTRACTOR", "auto")
+# Each backend gets this long per file before its worker process is killed and the next one is tried.
+PDF_EXTRACT_TIMEOUT_SECONDS = float(os.getenv("PDF_EXTRACT_TIMEOUT_SECONDS", "120"))
+# Files with more pages than this skip the slow, layout-analysing backends in auto mode.
+PDF_SLOW_EXTRACTOR_MAX_PAGES = int(os.getenv("PDF_SLOW_EXTRACTOR_MAX_PAGES", "100"))
+
+_PAGE_PATTERN = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+# Messages between the API/worker process and an extraction worker are pickles prefixed with their length.
+_HEADER = struct.Struct("!Q")
+_COUNT_PATTERN = re.compile(rb"/Count\s+(\d+)")
+
+class ExtractionTimeout(Exception):
+    pass
+
+@dataclass
+class PdfTraits:
+    """Characteristics of a PDF read from its raw bytes without parsing it."""
+    size: int
+    pages: int
+    encrypted: bool
+    has_fonts: bool
+
+def inspect_pdf(content: bytes) -> PdfTraits:
+    # Page objects may sit in compressed object streams, so also use the page tree's /Count.
+    counts = [int(count) for count in _COUNT_PATTERN.findall(content)]
+    pages = max([len(_PAGE_PATTERN.findall(content))] + counts)
+    return PdfTraits(
+        size=len(content),
+        pages=pages,
+        encrypted=b"/Encrypt" in content,
+        # A PDF without any font resource is scanned images only and has no text layer.
+        has_fonts=b"/Font" in content or b"/ObjStm" in content,
+    )
+
+class PdfExtractor(ABC):
+    """One text-extraction backend. Subclasses yield the text of each page in order."""
+
+    name: str = ""
+    module: str = ""
+    # Layout-analysing backends are more faithful on complex pages but much slower.
+    slow: bool = False
+    decrypts: bool = False
+
+    def available(self) -> bool:
+        return importlib.util.find_spec(self.module) is not None
+
+    @abstractmethod
+    def iter_pages(self, content: bytes) -> Iterator[str]:
+        """Yields the text of each page, in this process."""
+
+    def extract_pages(self, content: bytes, timeout: float) -> List[str]:
+        """
+        Extracts every page in a worker process, raising ExtractionTimeout once timeout
+        seconds have passed. The worker is killed then, so a backend stuck in a single page
+        (or in native code) is stopped too, and a crash in it cannot take this process down.
+        """
+        return _run_in_worker(self.name, content, timeout)
+
+class _PyPDFFamilyExtractor(PdfExtractor):
+    decrypts = True
+
+    def iter_pages(self, content: bytes) -> Iterator[str]:
+        reader = importlib.import_module(self.module).PdfReader(io.BytesIO(content))
+        if reader.is_encrypted:
+            reader.decrypt("")
+        for page in reader.pages:
+            yield page.extract_text()
+
+class PyPDF2Extractor(_PyPDFFamilyExtractor):
+    name = module = "PyPDF2"
+
+class PypdfExtractor(_PyPDFFamilyExtractor):
+    name = module = "pypdf"
+
+class PdfminerExtractor(PdfExtractor):
+    name = "pdfminer"
+    module = "pdfminer"
+    slow = True
+
+    def iter_pages(self, content: bytes) -> Iterator[str]:
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+
+        for layout in extract_pages(io.BytesIO(content)):
+            yield "".join(element.get_text() for element in layout if isinstance(element, LTTextContainer))
+
+class PdfiumExtractor(PdfExtractor):
+    name = module = "pypdfium2"
+    decrypts = True
+    # PDFium is not thread-safe. Extraction workers handle one file at a time, so this lock
+    # only matters when iter_pages is called directly from several threads (the benchmark).
+    _lock = threading.Lock()
+
+    def iter_pages(self, content: bytes) -> Iterator[str]:
+        import pypdfium2
+
+        with self._lock:
+            document = pypdfium2.PdfDocument(content)
+            try:
+                for index in range(len(document)):
+                    page = document[index]
+                    textpage = page.get_textpage()
+                    yield textpage.get_text_range()
+                    textpage.close()
+                    page.close()
+            finally:
+                document.close()
+
+# Fastest first, as measured by benchmarks/bench_pdf_extractors.py; all but PyPDF2 are optional.
+EXTRACTORS = {extractor.name: extractor for extractor in (PdfiumExtractor(), PyPDF2Extractor(), PypdfExtractor(), PdfminerExtractor())}
+
+def _write_message(stream, message):
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    stream.write(_HEADER.pack(len(payload)))
+    stream.write(payload)
+    stream.flush()
+
+def _read_exactly(fd: int, size: int, deadline: float) -> bytes:
+    chunks, remaining = [], size
+    while remaining:
+        wait = deadline - time.monotonic()
+        if wait <= 0 or not select.select([fd], [], [], wait)[0]:
+            raise ExtractionTimeout("deadline reached")
+        chunk = os.read(fd, min(remaining, 1 << 20))
+        if not chunk:
+            raise RuntimeError("extraction worker exited")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+class _ExtractionWorker:
+    """A child process running `python -m backend.components.pdf_extractors`, which serves one file at a time."""
+
+    def __init__(self):
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+        # The worker records no metrics; keep it from leaving per-pid files in the multiprocess directory.
+        env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "backend.components.pdf_extractors"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env,
+        )
+
+    def extract(self, name: str, content: bytes, deadline: float):
+        """Returns the worker's (status, value) reply: ("ok", pages) or ("error", message)."""
+        _write_message(self.process.stdin, (name, content))
+        fd = self.process.stdout.fileno()
+        size, = _HEADER.unpack(_read_exactly(fd, _HEADER.size, deadline))
+        return pickle.loads(_read_exactly(fd, size, deadline))
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()
+        self.process.stdin.close()
+        self.process.stdout.close()
+
+# Workers are started on first use and reused; one is only killed when it times out or fails.
+_idle_workers: List[_ExtractionWorker] = []
+_workers_lock = threading.Lock()
+
+def _run_in_worker(name: str, content: bytes, timeout: float) -> List[str]:
+    deadline = time.monotonic() + timeout
+    with _workers_lock:
+        worker = _idle_workers.pop() if _idle_workers else None
+    worker = worker or _ExtractionWorker()
+    try:
+        status, value = worker.extract(name, content, deadline)
+    except ExtractionTimeout:
+        worker.kill()
+        raise ExtractionTimeout(f"{name} exceeded {timeout:.0f}s") from None
+    except BaseException:
+        # The worker crashed, or this call was interrupted mid-message: its state is unknown.
+        worker.kill()
+        raise
+    with _workers_lock:
+        _idle_workers.append(worker)
+    if status == "error":
+        raise RuntimeError(value)
+    return value
+
+def _serve():
+    """Extraction worker loop: reads (backend name, content) requests from stdin until it closes."""
+    requests, replies = sys.stdin.buffer, os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    # Anything a backend prints goes to stderr, so it cannot corrupt the replies.
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    while True:
+        header = requests.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return
+        name, content = pickle.loads(requests.read(_HEADER.unpack(header)[0]))
+        try:
+            reply = ("ok", [text or "" for text in EXTRACTORS[name].iter_pages(content)])
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {e}")
+        _write_message(replies, reply)
+
+def choose_extractors(traits: PdfTraits) -> List[PdfExtractor]:
+    """The backends to try for a file, in order."""
+    if PDF_EXTRACTOR != "auto":
+        names = [name.strip() for name in PDF_EXTRACTOR.split(",") if name.strip()]
+        unknown = [name for name in names if name not in EXTRACTORS]
+        if unknown:
+            raise ValueError(f"Unknown PDF_EXTRACTOR {unknown}; choose from {list(EXTRACTORS)}")
+        return [EXTRACTORS[name] for name in names if EXTRACTORS[name].available()]
+
+    candidates = [extractor for extractor in EXTRACTORS.values() if extractor.available()]
+    if traits.pages > PDF_SLOW_EXTRACTOR_MAX_PAGES:
+        # Kept as a last resort: on a long file it would mostly run into the timeout.
+        candidates.sort(key=lambda extractor: extractor.slow)
+    if traits.encrypted:
+        candidates.sort(key=lambda extractor: not extractor.decrypts)
+    return candidates
+
+def extract_pdf_pages(content: bytes, filename: str = "") -> List[str]:
+    """
+    Extracts the text of each page with the first backend that succeeds for this file.
+    A backend that raises or times out is skipped for the next one. A result without any
+    text is also retried with the next backend when the file has fonts (i.e. a text layer).
+    """
+    traits = inspect_pdf(content)
+    extractors = choose_extractors(traits)
+    if not extractors:
+        raise RuntimeError("No PDF extraction backend is installed.")
+
+    fallback, errors = None, []
+    for extractor in extractors:
+        try:
+            pages = extractor.extract_pages(content, PDF_EXTRACT_TIMEOUT_SECONDS)
+        except ExtractionTimeout as e:
+            PDF_EXTRACTIONS.labels(extractor.name, "timeout").inc()
+            errors.append(str(e))
+            logger.warning(f"PDF extraction of {filename} timed out with {extractor.name}: {e}")
+            continue
+        except Exception as e:
+            PDF_EXTRACTIONS.labels(extractor.name, "error").inc()
+            errors.append(f"{extractor.name}: {e}")
+            logger.warning(f"PDF extraction of {filename} failed with {extractor.name}: {e}")
+            continue
+        if any(page.strip() for page in pages) or not traits.has_fonts:
+            PDF_EXTRACTIONS.labels(extractor.name, "ok").inc()
+            return pages
+        PDF_EXTRACTIONS.labels(extractor.name, "empty").inc()
+        fallback = fallback or pages
+
+    if fallback is not None:
+        return fallback
+    raise RuntimeError(f"Could not extract text from {filename}: {'; '.join(errors)}")
+
+if __name__ == "__main__":
+    _serve()
@@ -0,0 +1,172 @@
+# backend/components/retrieval_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from backend.utils.metrics import RETRIEVAL_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# In-process LRU sizes (entries); 0 disables the respective cache.
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "2048"))
+# "memory" keeps the caches per process; "redis" also shares them between replicas.
+RETRIEVAL_CACHE_BACKEND = os.getenv("RETRIEVAL_CACHE_BACKEND", "memory")
+RETRIEVAL_CACHE_REDIS_TTL = int(os.getenv("RETRIEVAL_CACHE_REDIS_TTL", "3600"))
+
+RETRIEVAL_CACHE_BACKENDS = ("memory", "redis")
+
+if RETRIEVAL_CACHE_BACKEND not in RETRIEVAL_CACHE_BACKENDS:
+    raise ValueError(f"RETRIEVAL_CACHE_BACKEND must be one of {RETRIEVAL_CACHE_BACKENDS}, got {RETRIEVAL_CACHE_BACKEND!r}")
+
+class LRUCache:
+    """
+    A small thread-safe LRU mapping with a fixed number of entries or, with weigh,
+    a fixed total weight (e.g. bytes) of entries.
+    """
+
+    def __init__(self, maxsize: int, weigh=None):
+        self.maxsize = maxsize
+        self.weigh = weigh
+        self.weight = 0
+        self._data: OrderedDict = OrderedDict()
+        self._weights: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        weight = self.weigh(value) if self.weigh else 1
+        if self.maxsize <= 0 or weight > self.maxsize:
+            return
+        with self._lock:
+            self._discard(key)
+            self._data[key] = value
+            self._weights[key] = weight
+            self.weight += weight
+            while self.weight > self.maxsize:
+                self._discard(next(iter(self._data)))
+
+    def pop(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            self._discard(key)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._weights.clear()
+            self.weight = 0
+
+    def _discard(self, key):
+        if key in self._data:
+            del self._data[key]
+            self.weight -= self._weights.pop(key)
+
+    def __len__(self):
+        return len(self._data)
+
+_embedding_cache = LRUCache(EMBEDDING_CACHE_SIZE)
+_retrieval_cache = LRUCache(RETRIEVAL_CACHE_SIZE)
+_redis_cache_service = None
+
+def _redis():
+    """Shared RedisCacheService for the second cache level, or None with the memory backend."""
+    global _redis_cache_service
+    if RETRIEVAL_CACHE_BACKEND != "redis":
+        return None
+    if _redis_cache_service is None:
+        from backend.services.redis_cache_service import get_redis_cache_service
+        _redis_cache_service = get_redis_cache_service()
+    return _redis_cache_service
+
+def _lookup(cache: LRUCache, name: str, key: str):
+    value = cache.get(key)
+    if value is None and _redis() is not None:
+        try:
+            value = _redis().get_json(f"{name}_cache:{key}")
+        except Exception as e:
+            logger.warning(f"Could not read {name} cache from Redis: {e}")
+        if value is not None:
+            cache.put(key, value)
+    RETRIEVAL_CACHE_REQUESTS.labels(name, "miss" if value is None else "hit").inc()
+    return value
+
+def _store(cache: LRUCache, name: str, key: str, value):
+    cache.put(key, value)
+    if _redis() is not None:
+        try:
+            _redis().set_json(f"{name}_cache:{key}", value, ex=RETRIEVAL_CACHE_REDIS_TTL)
+        except Exception as e:
+            logger.warning(f"Could not write {name} cache to Redis: {e}")
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+def _model_id(embeddings) -> str:
+    return getattr(embeddings, "model_name", None) or type(embeddings).__name__
+
+def cached_embed_query(embeddings, text: str) -> List[float]:
+    """embeddings.embed_query(text), memoized per model and query text."""
+    if EMBEDDING_CACHE_SIZE <= 0:
+        return embeddings.embed_query(text)
+    key = _digest(_model_id(embeddings), text)
+    vector = _lookup(_embedding_cache, "embedding", key)
+    if vector is None:
+        vector = list(map(float, embeddings.embed_query(text)))
+        _store(_embedding_cache, "embedding", key, vector)
+    return vector
+
+def cached_embed_queries(embeddings, texts: List[str]) -> List[List[float]]:
+    """Like cached_embed_query for many texts; the cache misses are embedded in one batch."""
+    if EMBEDDING_CACHE_SIZE <= 0:
+        return embeddings.embed_documents(texts)
+    keys = [_digest(_model_id(embeddings), text) for text in texts]
+    vectors = [_lookup(_embedding_cache, "embedding", key) for key in keys]
+    missing = sorted({text for text, vector in zip(texts, vectors) if vector is None})
+    if missing:
+        computed = dict(zip(missing, embeddings.embed_documents(missing)))
+        for i, text in enumerate(texts):
+            if vectors[i] is None:
+                vectors[i] = list(map(float, computed[text]))
+                _store(_embedding_cache, "embedding", keys[i], vectors[i])
+    return vectors
+
+def cached_similarity_search(
+    vector_store,
+    embedding: List[float],
+    k: int,
+    collection_version: Optional[int],
+    filter: Optional[Dict[str, Any]] = None,
+) -> list:
+    """
+    vector_store.similarity_search_by_vector, with the resulting chunk ids memoized per
+    (collection, collection version, query embedding, k, filter). A cache hit only fetches
+    the chunks by id. Without a collection version the search is not cached, because
+    there would be no way to tell when the collection was re-ingested.
+    """
+    if RETRIEVAL_CACHE_SIZE <= 0 or collection_version is None:
+        return vector_store.similarity_search_by_vector(embedding, k=k, filter=filter)
+
+    key = _digest(vector_store._collection.name, collection_version, _digest(embedding), k, filter)
+    ids = _lookup(_retrieval_cache, "retrieval", key)
+    if ids is not None:
+        documents = {doc.id: doc for doc in vector_store.get_by_ids(ids)}
+        if len(documents) == len(ids):
+            return [documents[doc_id] for doc_id in ids]
+
+    documents = vector_store.similarity_search_by_vector(embedding, k=k, filter=filter)
+    if all(doc.id for doc in documents):
+        _store(_retrieval_cache, "retrieval", key, [doc.id for doc in documents])
+    return documents
@@ -0,0 +1,163 @@
+# backend/components/token_chunker.py
+
+import os
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import accumulate
+from typing import List, Tuple
+
+from langchain_core.documents import Document
+
+from backend.utils.model_loader import EMBEDDING_MODEL_NAME
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "250"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "50"))
+# Chunks are sized in tokens of the embedding model by default, so that a chunk always fits
+# its input window (256 wordpieces for all-MiniLM-L6-v2) and is never silently truncated.
+CHUNK_ENCODING = os.getenv("CHUNK_ENCODING", f"hf:{EMBEDDING_MODEL_NAME}")
+
+# A piece is one word together with the whitespace in front of it, which is how
+# BPE encoders usually merge it (" word" is a single token far more often than "word ").
+_PIECE_PATTERN = re.compile(r"\s*(\S+)")
+# The "approx" tokenizer: runs of up to 4 letters or 3 digits, or any other single character.
+_APPROX_TOKEN_PATTERN = re.compile(r"[A-Za-z]{1,4}|[0-9]{1,3}|\S")
+
+
+class _TiktokenTokenizer:
+    def __init__(self, name: str):
+        import tiktoken
+        # Loaded from TIKTOKEN_CACHE_DIR when the file is there (the Docker image pre-fetches it).
+        self.encoding = tiktoken.get_encoding(name)
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        return [len(ids) for ids in self.encoding.encode_ordinary_batch(texts)]
+
+    def token_starts(self, text: str) -> List[int]:
+        tokens = self.encoding.encode_ordinary(text)
+        if text.isascii():
+            # Byte offsets equal character offsets, which skips the slow per-token decode.
+            return list(accumulate((len(b) for b in self.encoding.decode_tokens_bytes(tokens)), initial=0))[:-1]
+        return self.encoding.decode_with_offsets(tokens)[1]
+
+
+class _HuggingFaceTokenizer:
+    def __init__(self, model_name: str):
+        from transformers import AutoTokenizer
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        return [len(ids) for ids in self.tokenizer(texts, add_special_tokens=False, verbose=False)["input_ids"]]
+
+    def token_starts(self, text: str) -> List[int]:
+        encoded = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+        return [start for start, _ in encoded["offset_mapping"]]
+
+
+class _ApproximateTokenizer:
+    """Dependency-free estimate, for offline benchmarks; roughly the size of BPE tokens on English text."""
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        return [sum(1 for _ in _APPROX_TOKEN_PATTERN.finditer(text)) for text in texts]
+
+    def token_starts(self, text: str) -> List[int]:
+        return [m.start() for m in _APPROX_TOKEN_PATTERN.finditer(text)]
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(name: str = None):
+    """
+    Returns a cached tokenizer, so it is only loaded once per process. name is a tiktoken
+    encoding ("cl100k_base"), "hf:<model>" for a Hugging Face tokenizer, or "approx".
+    """
+    name = name or CHUNK_ENCODING
+    if name == "approx":
+        return _ApproximateTokenizer()
+    if name.startswith("hf:"):
+        return _HuggingFaceTokenizer(name[len("hf:"):])
+    return _TiktokenTokenizer(name)
+
+
+def split_page(
+    text: str,
+    chunk_tokens: int = CHUNK_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    encoding_name: str = None,
+) -> List[Tuple[int, int, int]]:
+    """
+    Splits a page into token-bounded spans.
+    Returns (start_char, end_char, token_count) tuples. Spans only cut through a word
+    that is longer than a whole chunk, such as text extracted without spaces or CJK text.
+    """
+    matches = list(_PIECE_PATTERN.finditer(text))
+    if not matches:
+        return []
+
+    # Encode the page once and attribute every token to the piece it starts in;
+    # this is exact and much faster than encoding pieces one by one.
+    token_offsets = get_tokenizer(encoding_name).token_starts(text)
+    boundaries = [bisect_left(token_offsets, m.start()) for m in matches] + [len(token_offsets)]
+
+    # (start_char, end_char, token_count) of every unit a chunk may start or end at.
+    units = []
+    for i, m in enumerate(matches):
+        first, last = boundaries[i], boundaries[i + 1]
+        if last - first <= chunk_tokens:
+            units.append((m.start(1), m.end(), last - first))
+            continue
+        for start_token in range(first, last, chunk_tokens):
+            end_token = min(start_token + chunk_tokens, last)
+            start_char = m.start(1) if start_token == first else max(token_offsets[start_token], m.start(1))
+            end_char = m.end() if end_token == last else token_offsets[end_token]
+            units.append((start_char, end_char, end_token - start_token))
+
+    spans = []
+    start = 0
+    while start < len(units):
+        end = start
+        total = 0
+        # Always take at least one unit; units are never larger than the budget.
+        while end < len(units) and (end == start or total + units[end][2] <= chunk_tokens):
+            total += units[end][2]
+            end += 1
+        spans.append((units[start][0], units[end - 1][1], total))
+        if end == len(units):
+            break
+
+        overlap = 0
+        next_start = end
+        while next_start > start + 1 and overlap + units[next_start - 1][2] <= overlap_tokens:
+            next_start -= 1
+            overlap += units[next_start][2]
+        start = next_start
+    return spans
+
+
+def create_page_chunks(
+    pages: List[str],
+    filename: str,
+    chunk_tokens: int = CHUNK_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+) -> List[Document]:
+    """
+    Splits a file's page stream into token-sized Documents.
+    Each chunk stays within one page and records its page number (1-based),
+    chunk index within the file and character offsets within the page.
+    """
+    documents = []
+    for page_number, page_text in enumerate(pages, start=1):
+        if not page_text:
+            continue
+        for start_char, end_char, token_count in split_page(page_text, chunk_tokens, overlap_tokens):
+            documents.append(Document(
+                page_content=page_text[start_char:end_char],
+                metadata={
+                    "filename": filename,
+                    "page": page_number,
+                    "chunk_index": len(documents),
+                    "start_char": start_char,
+                    "end_char": end_char,
+                    "token_count": token_count,
+                },
+            ))
+    return documents
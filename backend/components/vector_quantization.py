@@ -0,0 +1,176 @@
+# backend/components/vector_quantization.py
+
+import io
+from typing import List, Optional, Dict, Any
+
+import numpy as np
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+# Rows scored per block so the int8 -> float32 upcast never materializes the whole matrix.
+_SEARCH_BLOCK_ROWS = 65536
+
+
+def quantize(vectors: np.ndarray, mode: str):
+    """
+    Quantizes a (n, d) float32 matrix.
+    Returns the codes and a per-vector scale (None for float16).
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if mode == "float16":
+        return vectors.astype(np.float16), None
+    if mode == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.rint(vectors / scales[:, None]).clip(-127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unsupported quantization mode: {mode}")
+
+
+def dequantize(codes: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    """Reconstructs approximate float32 vectors from quantized codes."""
+    vectors = codes.astype(np.float32)
+    if scales is not None:
+        vectors *= scales[:, None]
+    return vectors
+
+
+def placeholder_embeddings(n: int) -> np.ndarray:
+    """
+    The vectors stored in Chroma for chunks whose real vectors live in a QuantizedIndex:
+    one zero per chunk, so Chroma keeps the texts and metadata but no float32 copy.
+    """
+    return np.zeros((n, 1), dtype=np.float32)
+
+
+class QuantizedIndex:
+    """
+    Compact, brute-force L2 index over float16 or int8 codes. When quantization is enabled
+    it is the only copy of a collection's vectors. Rows are ranked by the exact distance
+    between the float32 query and their reconstructed vectors.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        codes: np.ndarray,
+        scales: Optional[np.ndarray],
+        filenames: List[str],
+        mode: str,
+        sq_norms: Optional[np.ndarray] = None,
+    ):
+        self.ids = list(ids)
+        self.codes = codes
+        self.scales = scales
+        self.filenames = np.asarray(filenames)
+        self.mode = mode
+        self._rows = None
+        # ||scale * q||^2 of every reconstructed vector, needed for the L2 expansion.
+        # Serialized with the index, so loading it skips this pass.
+        if sq_norms is not None:
+            self.sq_norms = sq_norms
+            return
+        self.sq_norms = np.zeros(len(self.ids), dtype=np.float32)
+        for start in range(0, len(self.ids), _SEARCH_BLOCK_ROWS):
+            block = dequantize(codes[start:start + _SEARCH_BLOCK_ROWS], None if scales is None else scales[start:start + _SEARCH_BLOCK_ROWS])
+            self.sq_norms[start:start + len(block)] = np.einsum("ij,ij->i", block, block)
+
+    @classmethod
+    def from_embeddings(cls, ids: List[str], embeddings, metadatas: List[Dict[str, Any]], mode: str) -> "QuantizedIndex":
+        codes, scales = quantize(np.asarray(embeddings, dtype=np.float32), mode)
+        filenames = [(m or {}).get("filename", "") for m in metadatas]
+        return cls(ids, codes, scales, filenames, mode)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the vector codes, scales and norms."""
+        return self.codes.nbytes + self.sq_norms.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def rows_of(self, ids: List[str]) -> np.ndarray:
+        """Row positions of the given chunk ids; ids not in the index are skipped."""
+        if self._rows is None:
+            self._rows = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        return np.asarray([self._rows[chunk_id] for chunk_id in ids if chunk_id in self._rows], dtype=np.int64)
+
+    def search(self, query: np.ndarray, k: int, filename: Optional[str] = None, rows: Optional[np.ndarray] = None) -> List[int]:
+        """
+        Returns the row positions of the k nearest rows, optionally only among the rows of
+        one file or among the given rows.
+        """
+        if not self.ids:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        if rows is None:
+            rows = np.arange(len(self.ids)) if filename is None else np.flatnonzero(self.filenames == filename)
+        if rows.size == 0:
+            return []
+
+        distances = np.empty(rows.size, dtype=np.float32)
+        for start in range(0, rows.size, _SEARCH_BLOCK_ROWS):
+            block = rows[start:start + _SEARCH_BLOCK_ROWS]
+            dots = self.codes[block].astype(np.float32) @ query
+            if self.scales is not None:
+                dots *= self.scales[block]
+            # ||x||^2 is constant per query, so it is dropped from the ranking.
+            distances[start:start + block.size] = self.sq_norms[block] - 2.0 * dots
+
+        k = min(k, rows.size)
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return rows[top].tolist()
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        arrays = {
+            "ids": np.asarray(self.ids, dtype=str),
+            "codes": self.codes,
+            "sq_norms": self.sq_norms,
+            "filenames": self.filenames.astype(str),
+            "mode": np.asarray(self.mode),
+        }
+        if self.scales is not None:
+            arrays["scales"] = self.scales
+        np.savez(buffer, **arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "QuantizedIndex":
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            scales = arrays["scales"] if "scales" in arrays.files else None
+            sq_norms = arrays["sq_norms"] if "sq_norms" in arrays.files else None
+            return cls(arrays["ids"].tolist(), arrays["codes"], scales, arrays["filenames"].tolist(), str(arrays["mode"]), sq_norms)
+
+
+class QuantizedChroma(Chroma):
+    """
+    Chroma vector store for collections whose vectors are kept in a QuantizedIndex.
+    The collection itself only holds the chunk texts and metadata (with placeholder
+    vectors), so the search runs on the index and the hits are fetched by id.
+    """
+
+    def __init__(self, *args, quantized_index: QuantizedIndex, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.quantized_index = quantized_index
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, str]] = None, **kwargs) -> List[Document]:
+        query_embedding = self.embeddings.embed_query(query)
+        return self.similarity_search_by_vector(query_embedding, k=k, filter=filter, **kwargs)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs) -> List[Document]:
+        if filter and set(filter) != {"filename"}:
+            # Only filename filters are mirrored in the index; Chroma resolves the others to ids.
+            matching = self._collection.get(where=filter, include=[])["ids"]
+            positions = self.quantized_index.search(embedding, k, rows=self.quantized_index.rows_of(matching))
+        else:
+            positions = self.quantized_index.search(embedding, k, filename=filter.get("filename") if filter else None)
+        if not positions:
+            return []
+
+        ids = [self.quantized_index.ids[p] for p in positions]
+        result = self._collection.get(ids=ids, include=["documents", "metadatas"])
+        found = {chunk_id: (text, metadata) for chunk_id, text, metadata in zip(result["ids"], result["documents"], result["metadatas"])}
+        return [
+            Document(id=chunk_id, page_content=found[chunk_id][0], metadata=found[chunk_id][1] or {})
+            for chunk_id in ids
+            if chunk_id in found
+        ]
@@ -0,0 +1,59 @@
+# backend/embedding_server.py
+#
+# Shared embedding worker: holds the only copy of the embedding model on a host and
+# micro-batches the queries of every API replica and Celery worker that points at it
+# with EMBEDDING_EXECUTOR=remote.
+#
+#   uvicorn backend.embedding_server:app --host 0.0.0.0 --port 8002 --workers 1
+#
+# Run it with a single worker: more workers would each load the model again.
+
+import logging
+from typing import List, Literal
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+
+from backend.utils.embedding_executor import MicroBatchingEmbeddings
+from backend.utils.env_loader import load_env
+from backend.utils.metrics import render_metrics
+from backend.utils.model_loader import EmbeddingsSingleton, EMBEDDING_MODEL_NAME
+
+load_env()
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+app = FastAPI()
+_embeddings: MicroBatchingEmbeddings = None
+
+class EmbedRequest(BaseModel):
+    texts: List[str] = Field(..., max_length=1024)
+    kind: Literal["query", "documents"] = "query"
+
+@app.on_event("startup")
+def load_model():
+    global _embeddings
+    _embeddings = MicroBatchingEmbeddings(EmbeddingsSingleton())
+    _embeddings.embed_documents(["warm-up"])
+    logger.info(f"Embedding server ready with {EMBEDDING_MODEL_NAME}.")
+
+@app.post("/embed")
+async def embed(request: EmbedRequest):
+    # Single queries go through the batcher so concurrent requests share a forward pass;
+    # a request with several texts is already a batch.
+    if request.kind == "query" and len(request.texts) == 1:
+        vectors = [await run_in_threadpool(_embeddings.embed_query, request.texts[0])]
+    else:
+        vectors = await run_in_threadpool(_embeddings.embed_documents, request.texts)
+    return {"model": EMBEDDING_MODEL_NAME, "embeddings": [list(map(float, vector)) for vector in vectors]}
+
+@app.get("/ready")
+def readiness_probe():
+    return JSONResponse(status_code=200 if _embeddings is not None else 503, content={"model": EMBEDDING_MODEL_NAME})
+
+@app.get("/metrics")
+def metrics_endpoint():
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
@@ -0,0 +1,23 @@
+# backend/gunicorn_conf.py
+#
+# Production entry point for the API:
+#   gunicorn backend.main:app -c backend/gunicorn_conf.py
+#
+# The embedding model is loaded in the gunicorn master before the workers fork,
+# so they share its memory copy-on-write and never pay the load on a request.
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 300
+
+
+def on_starting(server):
+    from backend.utils.model_loader import preload_embeddings_model
+
+    preload_embeddings_model()
+    gc.freeze()
@@ -1,28 +1,61 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Depends, Request
+from fastapi import FastAPI, HTTPException, Depends, Request, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Any
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
+import asyncio
 import logging
-from langchain_community.vectorstores import Chroma
 
-from backend.tasks import process_documents_task
-from backend.services.database_service import DatabaseService, get_database_service
+from backend.services.database_service import DatabaseService, get_database_service, CHATROOMS_DEFAULT_PAGE_SIZE, CHATROOMS_MAX_PAGE_SIZE, SEARCH_QUERY_MAX_LENGTH
 from backend.services.redis_cache_service import RedisCacheService, get_redis_cache_service
 from backend.services.document_service import DocumentService, get_document_service
 from backend.services.chat_service import ChatService, get_chat_service
 from backend.services.document_actions_service import DocumentActionsService, get_document_actions_service
-from backend.models.schemas import QuestionRequest, DeleteChatroomRequest, SummarizeRequest, CompareRequest, ClassifyRequest
+from backend.services.admission_service import AdmissionService, get_admission_service
+from backend.services.coalescing_service import CoalescingService, get_coalescing_service
+from backend.models.schemas import QuestionRequest, BatchQuestionRequest, DeleteChatroomRequest, SummarizeRequest, CompareRequest, ClassifyRequest, create_missing_indexes
 
-from backend.database import Base, engine
+from backend.database import Base, engine, SessionLocal
 from backend.utils.env_loader import load_env
+from backend.utils.model_loader import preload_embeddings_model, get_embeddings_model_status
+from backend.utils.metrics import HTTP_REQUEST_SECONDS, render_metrics
+from backend.utils.json_codec import FastJSONResponse
+from backend.utils.upload_streaming import stream_pdf_upload
+from backend.utils.profiling import (
+    profiling_enabled, requested_profile_mode, profiled, profiled_in_thread, run_in_threadpool, track_profiled_tasks,
+    is_admin, PROFILE_INDEX_KEY, PROFILE_FORMATS,
+)
+import os
+import time
+import uuid
 
 MAX_FILES_PER_CHAT = 5
+# Responses at least this large are gzip-compressed for clients that accept it. Level 5 keeps
+# most of level 9's ratio on JSON at a fraction of the CPU; 0 disables compression.
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+RESPONSE_COMPRESSION_LEVEL = int(os.getenv("RESPONSE_COMPRESSION_LEVEL", "5"))
+
+# /process-pdfs/ parses its body itself; this documents the form for the OpenAPI schema.
+UPLOAD_OPENAPI_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["files", "session_id"],
+            "properties": {
+                "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+                "session_id": {"type": "string"},
+            },
+        }}},
+    }
+}
 
 load_env()
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -30,54 +63,161 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if RESPONSE_COMPRESSION_LEVEL > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=RESPONSE_COMPRESSION_MIN_BYTES, compresslevel=RESPONSE_COMPRESSION_LEVEL)
+
+@app.middleware("http")
+async def observe_request_duration(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.labels(
+        request.method, route.path if route else "unmatched", str(response.status_code)
+    ).observe(time.perf_counter() - start)
+    return response
+
+if profiling_enabled():
+    # Only registered when PROFILING_ADMIN_TOKEN is set, so there is no overhead otherwise.
+    @app.on_event("startup")
+    async def install_profile_task_tracking():
+        # Lets the sampler tell the profiled request's tasks apart from the others on the loop.
+        track_profiled_tasks(asyncio.get_running_loop())
+
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        mode = requested_profile_mode(request.headers, request.query_params)
+        if not mode:
+            return await call_next(request)
+
+        profile_id = uuid.uuid4().hex
+        request.state.profile_mode = mode
+        request.state.profile_id = profile_id
+        with profiled(get_redis_cache_service(), mode, f"{request.method} {request.url.path}", profile_id) as result:
+            response = await call_next(request)
+        if result is not None:
+            response.headers["X-Profile-Id"] = profile_id
+        else:
+            response.headers["X-Profile-Status"] = "skipped: too many concurrent profiles"
+        return response
 
 @app.on_event("startup")
 def on_startup():
     try:
         logging.info("Attempting to create database tables...")
         Base.metadata.create_all(bind=engine)
+        create_missing_indexes(engine)
         logging.info("Database tables created successfully!")
+        backfilled = DatabaseService(SessionLocal).backfill_session_files()
+        if backfilled:
+            logging.info(f"Indexed the filenames of {backfilled} existing chat sessions.")
     except Exception as e:
         logging.error(f"Error creating database tables: {e}", exc_info=True)
+    try:
+        preload_embeddings_model()
+    except Exception as e:
+        logging.error(f"Error preloading embeddings model: {e}", exc_info=True)
+
+@app.get("/metrics")
+@profiled_in_thread
+def metrics_endpoint():
+    """Prometheus scrape endpoint."""
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+@app.get("/ready")
+@profiled_in_thread
+def readiness_probe():
+    """Readiness probe: 200 once the embedding model is loaded and warmed up, 503 before."""
+    status = get_embeddings_model_status()
+    return JSONResponse(status_code=200 if status["loaded"] else 503, content={"embeddings_model": status})
 
 # --- API Endpoints ---
 
-@app.post("/process-pdfs/")
+@app.post("/process-pdfs/", openapi_extra=UPLOAD_OPENAPI_SCHEMA)
 async def process_pdfs_endpoint(
-    files: list[UploadFile] = File(...),
-    session_id: str = Form(...),
+    request: Request,
     cache_service: RedisCacheService = Depends(get_redis_cache_service),
-    db_service: DatabaseService = Depends(get_database_service)
+    db_service: DatabaseService = Depends(get_database_service),
+    doc_service: DocumentService = Depends(get_document_service),
+    coalescing_service: CoalescingService = Depends(get_coalescing_service)
 ):
-    if len(files) > MAX_FILES_PER_CHAT:
-        raise HTTPException(
-            status_code=400,
-            detail=f"You can only upload {MAX_FILES_PER_CHAT}."
-        )
+    # Celery is only loaded once an upload or a status request needs it, which keeps the app's import fast.
+    from celery.states import READY_STATES
+    from backend.tasks import ingest_queue, process_documents_task
+
+    # The body is parsed here, as it streams in, so size limits apply before it is fully read.
+    fields, uploads = await stream_pdf_upload(request, max_files=MAX_FILES_PER_CHAT)
     try:
-        cache_service.delete_keys(f"vector_store_ready:{session_id}")
-        file_data = [{"filename": file.filename, "content": file.file.read()} for file in files] 
-        session_exists = db_service.get_session(session_id)
-        if not session_exists:
-            db_service.create_session(session_id, [file['filename'] for file in file_data])
-        else:
-            db_service.update_uploaded_files(session_id, [file['filename'] for file in file_data])
+        session_id = fields.get("session_id")
+        if not session_id:
+            raise HTTPException(status_code=400, detail="session_id is required.")
+        if not uploads:
+            raise HTTPException(status_code=400, detail="At least one PDF file is required.")
+
+        file_data = [{"filename": upload.filename, "sha256": upload.sha256, "size": upload.size} for upload in uploads]
+        task_id, is_duplicate = coalescing_service.claim_ingest(
+            session_id, file_data, is_running=lambda task_id: process_documents_task.AsyncResult(task_id).state not in READY_STATES
+        )
+        if is_duplicate:
+            return {"message": "Processing already in progress.", "task_id": task_id}
+
+        try:
+            for file, upload in zip(file_data, uploads):
+                file["content_path"] = await run_in_threadpool(doc_service.stage_upload, upload)
 
-        task = process_documents_task.delay(session_id, file_data)
+            # An existing session keeps serving its current collection and file list until the
+            # new collection is committed and swapped in.
+            session_exists = db_service.get_session(session_id)
+            if not session_exists:
+                db_service.create_session(session_id, [file['filename'] for file in file_data])
+
+            # A previous upload for the session still queued is revoked; one already running stops
+            # at its next check between batches instead of overwriting this upload's collection.
+            superseded_task_id = doc_service.claim_ingest_task(session_id, task_id)
+            if superseded_task_id:
+                process_documents_task.AsyncResult(superseded_task_id).revoke()
+
+            profile_mode = getattr(request.state, "profile_mode", None)
+            profile_id = getattr(request.state, "profile_id", None)
+            task = process_documents_task.apply_async(
+                args=(session_id, file_data),
+                kwargs={"profile_mode": profile_mode, "profile_id": profile_id},
+                task_id=task_id,
+                queue=ingest_queue(file_data),
+            )
+        except Exception:
+            coalescing_service.release_ingest(session_id, file_data, task_id)
+            raise
+        try:
+            coalescing_service.confirm_ingest(session_id, file_data, task_id)
+        except Exception as e:
+            logger.error(f"Could not extend the reservation of upload task {task_id}: {e}")
         return {"message": "Processing started.", "task_id": task.id}
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logger.error("Error starting PDF processing task:", exc_info=True)
         raise HTTPException(status_code=500, detail="Error starting PDF processing.")
+    finally:
+        for upload in uploads:
+            upload.close()
       
 @app.get("/task-status/{task_id}")
 async def get_task_status(task_id: str):
+    from backend.tasks import process_documents_task
+
     task = process_documents_task.AsyncResult(task_id)
+    # Only progress and results are dicts; a revoked task's info is the TaskRevokedError.
+    info = task.info if isinstance(task.info, dict) else {}
     if task.state == 'PENDING':
         response = {'state': task.state, 'status': 'Pending...'}
+    elif task.state == 'REVOKED' or info.get('status') == 'superseded':
+        # A newer upload for the session replaced this one, before it started or while it ran.
+        response = {'state': 'REVOKED', 'status': 'superseded'}
     elif task.state != 'FAILURE':
-        response = {'state': task.state, 'status': task.info.get('status', 'Processing...'), 'result': task.info.get('result')}
+        response = {'state': task.state, 'status': info.get('status', 'Processing...'), 'result': info.get('result')}
         if 'complete' in response['status']:
-            response['result'] = task.info
+            response['result'] = info
     else:
         response = {'state': task.state, 'status': str(task.info)}
     return response
@@ -87,18 +227,27 @@ async def ask_question_endpoint(
     request: QuestionRequest, 
     db_service: DatabaseService = Depends(get_database_service),
     chat_service: ChatService = Depends(get_chat_service),
-    doc_service: DocumentService = Depends(get_document_service)
+    doc_service: DocumentService = Depends(get_document_service),
+    admission_service: AdmissionService = Depends(get_admission_service),
+    coalescing_service: CoalescingService = Depends(get_coalescing_service)
 ):
-    try:
-        vector_store = doc_service.get_vector_store(request.session_id)
+    async def answer_question():
+        vector_store = await run_in_threadpool(doc_service.get_vector_store, request.session_id)
         if not vector_store:
             raise HTTPException(status_code=404, detail="Vector store not found. Documents must be processed first.")
         
-        answer = chat_service.get_answer(vector_store, request.question, request.session_id, request.language)
+        async with admission_service.slot("ask_question", request.session_id):
+            answer = await run_in_threadpool(chat_service.get_answer, vector_store, request.question, request.session_id, request.language, version)
         db_service.add_message(request.session_id, "user", request.question)
         db_service.add_message(request.session_id, "assistant", answer)
         updated_chat_history = db_service.get_chat_history(request.session_id)
         return {"messages": updated_chat_history}
+
+    try:
+        version = doc_service.get_collection_version(request.session_id)
+        return FastJSONResponse(await coalescing_service.run(
+            "ask_question", request.session_id, request.model_dump(), version, answer_question
+        ))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -106,23 +255,61 @@ async def ask_question_endpoint(
         raise HTTPException(status_code=500, detail="Error asking question.")
         
 
+@app.post("/ask-batch/")
+async def ask_batch_endpoint(
+    request: BatchQuestionRequest,
+    chat_service: ChatService = Depends(get_chat_service),
+    doc_service: DocumentService = Depends(get_document_service),
+    admission_service: AdmissionService = Depends(get_admission_service)
+):
+    """Answers up to 50 questions against the session's documents in one request."""
+    try:
+        vector_store = await run_in_threadpool(doc_service.get_vector_store, request.session_id)
+        if not vector_store:
+            raise HTTPException(status_code=404, detail="Vector store not found. Documents must be processed first.")
+
+        # One admission slot per concurrent LLM call the batch makes.
+        wanted = chat_service.batch_concurrency(request.questions)
+        async with admission_service.slots("ask_batch", request.session_id, wanted) as held:
+            return FastJSONResponse(await run_in_threadpool(
+                chat_service.get_batch_answers, vector_store, request.questions, request.session_id,
+                request.language, request.write_history, held
+            ))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error("Error answering question batch:", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error answering questions.")
+
 @app.post("/summarize/")
 async def summarize_endpoint(
     request: SummarizeRequest,
     actions_service: DocumentActionsService = Depends(get_document_actions_service),
     doc_service: DocumentService = Depends(get_document_service),
-    db_service: DatabaseService = Depends(get_database_service)
+    db_service: DatabaseService = Depends(get_database_service),
+    admission_service: AdmissionService = Depends(get_admission_service),
+    coalescing_service: CoalescingService = Depends(get_coalescing_service)
 ):
-    try:
-        vector_store = doc_service.get_vector_store(request.session_id)
-        if not vector_store:
-            raise HTTPException(status_code=404, detail="Vector store not found. Documents must be processed first.")
-            
-        summary = actions_service.summarize_documents(vector_store, request.filenames, request.language)
+    async def summarize():
+        summary = actions_service.get_cached_result("summarize", request.session_id, request.filenames, request.language, version)
+        if summary is None:
+            vector_store = await run_in_threadpool(doc_service.get_vector_store, request.session_id)
+            if not vector_store:
+                raise HTTPException(status_code=404, detail="Vector store not found. Documents must be processed first.")
+
+            async with admission_service.slot("summarize", request.session_id):
+                summary = await run_in_threadpool(actions_service.summarize_documents, vector_store, request.filenames, request.language, version)
+            actions_service.cache_result("summarize", request.session_id, request.filenames, request.language, version, summary)
         
         db_service.add_message(request.session_id, "assistant", summary)
         
         return {"summary": summary}
+
+    try:
+        version = doc_service.get_collection_version(request.session_id)
+        return FastJSONResponse(await coalescing_service.run(
+            "summarize", request.session_id, request.model_dump(), version, summarize
+        ))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -134,18 +321,30 @@ async def compare_endpoint(
     request: CompareRequest,
     actions_service: DocumentActionsService = Depends(get_document_actions_service),
     doc_service: DocumentService = Depends(get_document_service),
-    db_service: DatabaseService = Depends(get_database_service)
+    db_service: DatabaseService = Depends(get_database_service),
+    admission_service: AdmissionService = Depends(get_admission_service),
+    coalescing_service: CoalescingService = Depends(get_coalescing_service)
 ):
-    try:
-        vector_store = doc_service.get_vector_store(request.session_id)
-        if not vector_store:
-            raise HTTPException(status_code=404, detail="Vector store not found. Documents must be processed first.")
-            
-        comparison = actions_service.compare_documents(vector_store, request.filenames, request.language)
+    async def compare():
+        comparison = actions_service.get_cached_result("compare", request.session_id, request.filenames, request.language, version)
+        if comparison is None:
+            vector_store = await run_in_threadpool(doc_service.get_vector_store, request.session_id)
+            if not vector_store:
+                raise HTTPException(status_code=404, detail="Vector store not found. Documents must be processed first.")
+
+            async with admission_service.slot("compare", request.session_id):
+                comparison = await run_in_threadpool(actions_service.compare_documents, vector_store, request.filenames, request.language, version)
+            actions_service.cache_result("compare", request.session_id, request.filenames, request.language, version, comparison)
         
         db_service.add_message(request.session_id, "assistant", comparison)
         
         return {"comparison": comparison}
+
+    try:
+        version = doc_service.get_collection_version(request.session_id)
+        return FastJSONResponse(await coalescing_service.run(
+            "compare", request.session_id, request.model_dump(), version, compare
+        ))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -157,38 +356,86 @@ async def classify_topics_endpoint(
     request: ClassifyRequest,
     actions_service: DocumentActionsService = Depends(get_document_actions_service),
     doc_service: DocumentService = Depends(get_document_service),
-    db_service: DatabaseService = Depends(get_database_service)
+    db_service: DatabaseService = Depends(get_database_service),
+    admission_service: AdmissionService = Depends(get_admission_service),
+    coalescing_service: CoalescingService = Depends(get_coalescing_service)
 ):
-    try:
-        vector_store = doc_service.get_vector_store(request.session_id)
-        if not vector_store:
-            raise HTTPException(status_code=404, detail="Vector store not found. Documents must be processed first.")
-            
-        topics = actions_service.classify_topics(vector_store, request.language)
+    async def classify():
+        topics = actions_service.get_cached_result("classify", request.session_id, None, request.language, version)
+        if topics is None:
+            vector_store = await run_in_threadpool(doc_service.get_vector_store, request.session_id)
+            if not vector_store:
+                raise HTTPException(status_code=404, detail="Vector store not found. Documents must be processed first.")
+
+            async with admission_service.slot("classify", request.session_id):
+                topics = await run_in_threadpool(actions_service.classify_topics, vector_store, request.language, version)
+            actions_service.cache_result("classify", request.session_id, None, request.language, version, topics)
         
         db_service.add_message(request.session_id, "assistant", topics)
         
         return {"topics": topics}
+
+    try:
+        version = doc_service.get_collection_version(request.session_id)
+        return FastJSONResponse(await coalescing_service.run(
+            "classify", request.session_id, request.model_dump(), version, classify
+        ))
     except HTTPException as e:
         raise e
     except Exception as e:
         logger.error(f"Error classifying topics: {e}")
         raise HTTPException(status_code=500, detail="Error classifying topics.")
       
+def session_etag(prefix: str, revision: Optional[int]) -> Optional[str]:
+    """Weak ETag for a session read; revisions are taken before the read, so it may only lag the body."""
+    return f'W/"{prefix}-{revision}"' if revision is not None else None
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or not etag:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates or etag[2:] in candidates
+
+def conditional_json(content: dict, etag: Optional[str]) -> FastJSONResponse:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"} if etag else None
+    return FastJSONResponse(content=content, headers=headers)
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
 @app.get("/chat-history/{session_id}")
-async def get_chat_history_endpoint(session_id: str, db_service: DatabaseService = Depends(get_database_service)):
+async def get_chat_history_endpoint(
+    session_id: str,
+    if_none_match: Optional[str] = Header(None),
+    db_service: DatabaseService = Depends(get_database_service),
+    doc_service: DocumentService = Depends(get_document_service),
+):
     try:
-        chat_history = db_service.get_chat_history(session_id)
-        return {"messages": chat_history}
+        # A client holding the current revision gets a 304 without touching Postgres or the archive.
+        etag = session_etag("history", await run_in_threadpool(db_service.get_session_revision, session_id))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        # History archived by idle-session eviction is moved back into Postgres first.
+        await run_in_threadpool(doc_service.restore_history, session_id)
+        chat_history = await run_in_threadpool(db_service.get_chat_history, session_id)
+        return conditional_json({"messages": chat_history}, etag)
     except Exception as e:
         logger.error("Error getting chat history:", exc_info=True)
         raise HTTPException(status_code=500, detail="Error getting chat history.")
 
 @app.get("/get-all-chatrooms/")
-async def get_all_chatrooms_endpoint(db_service: DatabaseService = Depends(get_database_service)):
+async def get_all_chatrooms_endpoint(
+    limit: int = Query(CHATROOMS_DEFAULT_PAGE_SIZE, ge=1, le=CHATROOMS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    q: Optional[str] = Query(None, max_length=SEARCH_QUERY_MAX_LENGTH),
+    filename: Optional[str] = Query(None, max_length=SEARCH_QUERY_MAX_LENGTH),
+    db_service: DatabaseService = Depends(get_database_service)
+):
+    """Lists chatrooms newest first. Pass the returned next_cursor back to get the following page."""
     try:
-        chatrooms = db_service.get_all_chatrooms()
-        return {"chatrooms": chatrooms}
+        return db_service.list_chatrooms(limit=limit, cursor=cursor, name_query=q, filename_query=filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error("Error getting all chatrooms:", exc_info=True)
         raise HTTPException(status_code=500, detail="Error getting all chatrooms.")
@@ -210,8 +457,47 @@ async def delete_chatroom_endpoint(
         raise HTTPException(status_code=500, detail="Error deleting chatroom.")
 
 @app.get("/chat-files/{session_id}")
-def get_chat_files(session_id: str, db_service: DatabaseService = Depends(get_database_service)):
+@profiled_in_thread
+def get_chat_files(
+    session_id: str,
+    if_none_match: Optional[str] = Header(None),
+    db_service: DatabaseService = Depends(get_database_service),
+):
+    etag = session_etag("files", db_service.get_session_revision(session_id))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
     chat_session = db_service.get_session(session_id)
-    if not chat_session:
-        return {"files": []}
-    return {"files": chat_session.uploaded_files}
\ No newline at end of file
+    return conditional_json({"files": chat_session.uploaded_files if chat_session else []}, etag)
+
+# --- Profiling (admin only) ---
+
+@app.get("/profiles/")
+@profiled_in_thread
+def list_profiles(
+    x_admin_token: str = Header(None),
+    cache_service: RedisCacheService = Depends(get_redis_cache_service)
+):
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required.")
+    metas = (cache_service.get_json(f"profile_meta:{profile_id}") for profile_id in cache_service.get_recent(PROFILE_INDEX_KEY))
+    return {"profiles": [meta for meta in metas if meta]}
+
+@app.get("/profiles/{profile_id}")
+@profiled_in_thread
+def download_profile(
+    profile_id: str,
+    x_admin_token: str = Header(None),
+    cache_service: RedisCacheService = Depends(get_redis_cache_service)
+):
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required.")
+    data = cache_service.get_bytes(f"profile:{profile_id}")
+    meta = cache_service.get_json(f"profile_meta:{profile_id}")
+    if data is None or meta is None:
+        raise HTTPException(status_code=404, detail="Profile not found or expired.")
+    media_type, extension = PROFILE_FORMATS[meta["mode"]]
+    return Response(
+        content=data,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.{extension}"'},
+    )
@@ -1,9 +1,9 @@
 import uuid
-from sqlalchemy import Column, String, DateTime, Text, func, TypeDecorator, Integer
+from sqlalchemy import Column, String, DateTime, Text, func, TypeDecorator, Integer, Index, DDL, event
 from sqlalchemy.dialects.postgresql import UUID
 import json
 from backend.database import Base
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 
 class JSONEncodedList(TypeDecorator):
@@ -20,12 +20,46 @@ class JSONEncodedList(TypeDecorator):
             return json.loads(value)
         return value
 
+# Trigram indexes back the substring searches on chatroom names and filenames.
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+
 class ChatSession(Base):
     __tablename__ = 'chat_sessions'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String)
     uploaded_files = Column(JSONEncodedList, default=[])
     created_at = Column(DateTime, default=func.now())
+    __table_args__ = (
+        Index("ix_chat_sessions_created_at_id", "created_at", "id"),
+        Index("ix_chat_sessions_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
+
+class ChatSessionFile(Base):
+    """One row per uploaded file, so filename search can use an index instead of the JSON blob."""
+    __tablename__ = 'chat_session_files'
+    id = Column(Integer, primary_key=True)
+    session_id = Column(UUID(as_uuid=True), index=True, nullable=False)
+    filename = Column(String, nullable=False)
+    __table_args__ = (
+        Index("ix_chat_session_files_filename_trgm", "filename", postgresql_using="gin", postgresql_ops={"filename": "gin_trgm_ops"}),
+    )
+
+class SessionCollection(Base):
+    """
+    Points a session at the Chroma collection that serves its queries. Re-ingestion builds
+    a new versioned collection and swaps this pointer, so queries never see a partial one.
+    """
+    __tablename__ = 'session_collections'
+    session_id = Column(UUID(as_uuid=True), primary_key=True)
+    version = Column(Integer, nullable=False)
+    collection_name = Column(String, nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+def create_missing_indexes(bind):
+    """create_all skips indexes of tables that already exist; this adds them to older databases."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
 
 class ChatMessage(Base):
     __tablename__ = 'chat_messages'
@@ -40,6 +74,12 @@ class QuestionRequest(BaseModel):
     question: str
     language: str
 
+class BatchQuestionRequest(BaseModel):
+    session_id: str
+    questions: List[str] = Field(..., min_length=1, max_length=50)
+    language: str
+    write_history: bool = False
+
 class SummarizeRequest(BaseModel):
     session_id: str
     filenames: Optional[List[str]] = None
@@ -0,0 +1,291 @@
+# backend/services/admission_service.py
+
+import asyncio
+import logging
+import math
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, HTTPException
+
+from backend.services.redis_cache_service import RedisCacheService, get_redis_cache_service
+from backend.utils.profiling import run_in_threadpool
+from backend.utils.metrics import ADMISSION_WAIT_SECONDS, ADMISSION_REJECTIONS, LLM_IN_FLIGHT, LLM_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+# Global cap on in-flight LLM-bound requests across all API replicas (0 disables admission control).
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# A single session may hold at most this many slots and queue at most this many requests.
+LLM_MAX_CONCURRENCY_PER_SESSION = int(os.getenv("LLM_MAX_CONCURRENCY_PER_SESSION", "2"))
+LLM_MAX_QUEUED_PER_SESSION = int(os.getenv("LLM_MAX_QUEUED_PER_SESSION", "4"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+LLM_MAX_WAIT_SECONDS = float(os.getenv("LLM_MAX_WAIT_SECONDS", "20"))
+# Slots held longer than this are assumed to belong to a crashed replica and are reclaimed.
+LLM_SLOT_LEASE_SECONDS = float(os.getenv("LLM_SLOT_LEASE_SECONDS", "300"))
+ADMISSION_POLL_SECONDS = 0.05
+
+SLOTS_KEY = "llm_admission:slots"
+QUEUE_KEY = "llm_admission:queue"
+SESSION_SLOTS_PREFIX = "llm_admission:session:"
+HOLD_SECONDS_KEY = "llm_admission:avg_hold_seconds"
+
+# Tokens are "<session_id>|<uuid>" so the scripts can attribute queue entries to sessions.
+_ENQUEUE_SCRIPT = """
+local now = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - tonumber(ARGV[6]))
+local depth = redis.call('ZCARD', KEYS[2])
+if depth >= tonumber(ARGV[3]) then return {-1, depth} end
+local session = ARGV[5] .. '|'
+local queued = 0
+for _, token in ipairs(redis.call('ZRANGE', KEYS[2], 0, -1)) do
+  if string.sub(token, 1, #session) == session then queued = queued + 1 end
+end
+if queued >= tonumber(ARGV[4]) then return {-2, depth} end
+redis.call('ZADD', KEYS[2], now, ARGV[1])
+return {depth, redis.call('ZCARD', KEYS[1])}
+"""
+
+# A waiter is admitted when a slot is free, its session is under its cap, and fewer eligible
+# waiters are ahead of it than there are free slots. Waiters whose session is at its cap are
+# skipped, so one busy session cannot block everybody queued behind it. A token no longer in
+# the queue (discarded by a cancelled request, or purged as stale) is never admitted: -1.
+_ACQUIRE_SCRIPT = """
+if not redis.call('ZSCORE', KEYS[2], ARGV[1]) then return -1 end
+local now = tonumber(ARGV[2])
+local limit = tonumber(ARGV[4])
+local per_session = tonumber(ARGV[5])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local free = limit - redis.call('ZCARD', KEYS[1])
+if free <= 0 then return 0 end
+local function session_busy(token)
+  local session = string.match(token, '^(.*)|')
+  return redis.call('ZCOUNT', ARGV[6] .. session, now, '+inf') >= per_session
+end
+if session_busy(ARGV[1]) then return 0 end
+local ahead = 0
+for _, token in ipairs(redis.call('ZRANGE', KEYS[2], 0, -1)) do
+  if token == ARGV[1] then break end
+  if not session_busy(token) then ahead = ahead + 1 end
+end
+if ahead >= free then return 0 end
+local session_key = ARGV[6] .. string.match(ARGV[1], '^(.*)|')
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+redis.call('ZADD', session_key, ARGV[3], ARGV[1])
+redis.call('PEXPIREAT', session_key, math.ceil(tonumber(ARGV[3]) * 1000))
+redis.call('ZREM', KEYS[2], ARGV[1])
+return 1
+"""
+
+class AdmissionRejected(HTTPException):
+    """429 raised when an LLM-bound request cannot be admitted in time."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(
+            status_code=429,
+            detail=f"The service is busy ({reason}). Please retry later.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        self.reason = reason
+
+class AdmissionUnavailable(Exception):
+    """Raised when a request could not even be queued because Redis is unreachable."""
+
+class AdmissionService:
+    """
+    Redis-backed concurrency limiter for requests that call the LLM.
+    Requests wait in a bounded FIFO queue for one of LLM_MAX_CONCURRENCY global slots
+    and are rejected with 429 and Retry-After when the queue is full or the expected
+    wait exceeds LLM_MAX_WAIT_SECONDS.
+    """
+
+    def __init__(self, cache_service: RedisCacheService):
+        self.cache_service = cache_service
+        self.client = cache_service.client
+
+    def _scripts(self):
+        # Registered lazily and per client: register_script only hashes locally.
+        return self.client.register_script(_ENQUEUE_SCRIPT), self.client.register_script(_ACQUIRE_SCRIPT)
+
+    def _average_hold_seconds(self) -> float | None:
+        value = self.client.get(HOLD_SECONDS_KEY)
+        return float(value) if value else None
+
+    def _record_hold(self, seconds: float):
+        previous = self._average_hold_seconds()
+        average = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+        self.client.set(HOLD_SECONDS_KEY, average, ex=3600)
+
+    def _retry_after(self, depth: int) -> float:
+        average = self._average_hold_seconds() or LLM_MAX_WAIT_SECONDS
+        return (depth + 1) / LLM_MAX_CONCURRENCY * average
+
+    def _reject(self, endpoint: str, reason: str, retry_after: float):
+        ADMISSION_REJECTIONS.labels(endpoint, reason).inc()
+        logger.warning(f"Rejected {endpoint} request: {reason}, Retry-After {retry_after:.1f}s.")
+        raise AdmissionRejected(reason, retry_after)
+
+    async def _acquire(self, endpoint: str, session_id: str) -> str:
+        """
+        Queues a token and polls until it holds a slot. Redis calls run in the threadpool so
+        polling does not block the event loop. If anything fails or the request is cancelled
+        after the token was queued, the token is removed again so it never counts as a waiter
+        ahead of others. Raises AdmissionUnavailable only when the token could not be queued.
+        """
+        enqueue, acquire = self._scripts()
+        token = f"{session_id}|{uuid.uuid4().hex}"
+        try:
+            depth, in_flight = await run_in_threadpool(
+                enqueue,
+                keys=[SLOTS_KEY, QUEUE_KEY],
+                args=[token, time.time(), LLM_MAX_QUEUE, LLM_MAX_QUEUED_PER_SESSION, session_id, LLM_MAX_WAIT_SECONDS * 2],
+            )
+        except Exception as e:
+            raise AdmissionUnavailable(str(e)) from e
+        LLM_QUEUE_DEPTH.set(max(depth, 0))
+        if depth == -1:
+            self._reject(endpoint, "queue_full", self._retry_after(LLM_MAX_QUEUE))
+        if depth == -2:
+            self._reject(endpoint, "session_queue_full", self._retry_after(LLM_MAX_QUEUE))
+
+        try:
+            # Fail fast when the requests already waiting will clearly outlast our wait budget.
+            average = await run_in_threadpool(self._average_hold_seconds)
+            if average and in_flight >= LLM_MAX_CONCURRENCY and depth / LLM_MAX_CONCURRENCY * average > LLM_MAX_WAIT_SECONDS:
+                self._reject(endpoint, "expected_wait_too_long", self._retry_after(depth))
+
+            deadline = time.monotonic() + LLM_MAX_WAIT_SECONDS
+            while True:
+                now = time.time()
+                admitted = await run_in_threadpool(
+                    acquire,
+                    keys=[SLOTS_KEY, QUEUE_KEY],
+                    args=[token, now, now + LLM_SLOT_LEASE_SECONDS, LLM_MAX_CONCURRENCY,
+                          LLM_MAX_CONCURRENCY_PER_SESSION, SESSION_SLOTS_PREFIX],
+                )
+                if admitted == 1:
+                    return token
+                if admitted == -1 or time.monotonic() >= deadline:
+                    self._reject(endpoint, "wait_timeout", self._retry_after(await run_in_threadpool(self.client.zcard, QUEUE_KEY)))
+                await asyncio.sleep(ADMISSION_POLL_SECONDS)
+        except BaseException:
+            self._discard(token)
+            raise
+
+    def _discard(self, token: str):
+        """Removes a token from the queue and, if it was admitted meanwhile, from the slots."""
+        session_id = token.rsplit("|", 1)[0]
+        try:
+            pipeline = self.client.pipeline()
+            pipeline.zrem(QUEUE_KEY, token)
+            pipeline.zrem(SLOTS_KEY, token)
+            pipeline.zrem(f"{SESSION_SLOTS_PREFIX}{session_id}", token)
+            pipeline.execute()
+        except Exception as e:
+            logger.error(f"Could not discard admission token {token}; it will be purged once stale: {e}")
+
+    def _release(self, token: str, held_seconds: float):
+        session_id = token.rsplit("|", 1)[0]
+        pipeline = self.client.pipeline()
+        pipeline.zrem(SLOTS_KEY, token)
+        pipeline.zrem(f"{SESSION_SLOTS_PREFIX}{session_id}", token)
+        pipeline.zcard(SLOTS_KEY)
+        pipeline.zcard(QUEUE_KEY)
+        _, _, in_flight, depth = pipeline.execute()
+        LLM_IN_FLIGHT.set(in_flight)
+        LLM_QUEUE_DEPTH.set(depth)
+        self._record_hold(held_seconds)
+
+    async def _try_acquire(self, session_id: str) -> str | None:
+        """
+        Takes a free slot without waiting and returns its token, or None. The token is queued
+        behind the current waiters like any other, so it is only admitted when there are
+        more free slots than waiters: extra slots never jump the queue.
+        """
+        enqueue, acquire = self._scripts()
+        token = f"{session_id}|{uuid.uuid4().hex}"
+        try:
+            depth, _ = await run_in_threadpool(
+                enqueue,
+                keys=[SLOTS_KEY, QUEUE_KEY],
+                args=[token, time.time(), LLM_MAX_QUEUE, LLM_MAX_QUEUED_PER_SESSION, session_id, LLM_MAX_WAIT_SECONDS * 2],
+            )
+            if depth < 0:
+                return None
+            now = time.time()
+            admitted = await run_in_threadpool(
+                acquire,
+                keys=[SLOTS_KEY, QUEUE_KEY],
+                args=[token, now, now + LLM_SLOT_LEASE_SECONDS, LLM_MAX_CONCURRENCY,
+                      LLM_MAX_CONCURRENCY_PER_SESSION, SESSION_SLOTS_PREFIX],
+            )
+        except BaseException as e:
+            self._discard(token)
+            if not isinstance(e, Exception):
+                raise
+            logger.error(f"Could not take an extra LLM slot: {e}")
+            return None
+        if admitted == 1:
+            return token
+        await run_in_threadpool(self._discard, token)
+        return None
+
+    @asynccontextmanager
+    async def slot(self, endpoint: str, session_id: str):
+        """Holds one LLM slot for the enclosed block, waiting for it or raising AdmissionRejected."""
+        async with self.slots(endpoint, session_id, 1):
+            yield
+
+    @asynccontextmanager
+    async def slots(self, endpoint: str, session_id: str, count: int):
+        """
+        Holds up to count LLM slots for the enclosed block, for requests that make several
+        LLM calls at once. The first slot is waited for like in slot(); the others are only
+        taken if they are free right away. Yields the number of slots held, which is how
+        many LLM calls the block may run concurrently.
+        """
+        if LLM_MAX_CONCURRENCY <= 0:
+            yield count
+            return
+
+        start = time.perf_counter()
+        try:
+            tokens = [await self._acquire(endpoint, session_id)]
+        except AdmissionUnavailable as e:
+            # Redis being unavailable should not take the LLM endpoints down with it.
+            logger.error(f"Admission control unavailable, admitting {endpoint} request: {e}")
+            yield count
+            return
+        acquired = time.perf_counter()
+        ADMISSION_WAIT_SECONDS.labels(endpoint).observe(acquired - start)
+
+        try:
+            while len(tokens) < count:
+                token = await self._try_acquire(session_id)
+                if token is None:
+                    break
+                tokens.append(token)
+            LLM_IN_FLIGHT.set(await run_in_threadpool(self.client.zcard, SLOTS_KEY))
+            yield len(tokens)
+        finally:
+            held_seconds = time.perf_counter() - acquired
+            for i, token in enumerate(tokens):
+                try:
+                    await run_in_threadpool(self._release, token, held_seconds)
+                except BaseException as e:
+                    # Also reached when the request is cancelled while releasing: drop the slots directly.
+                    for remaining in tokens[i:]:
+                        self._discard(remaining)
+                    if not isinstance(e, Exception):
+                        raise
+                    logger.error(f"Could not release LLM slot {token}: {e}")
+                    break
+
+# --- Dependency Injection for FastAPI ---
+def get_admission_service(
+    cache_service: RedisCacheService = Depends(get_redis_cache_service),
+) -> AdmissionService:
+    return AdmissionService(cache_service=cache_service)
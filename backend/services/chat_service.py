@@ -1,21 +1,25 @@
-from backend.components.chat_logic import create_qa_chain
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+import time
+from typing import TYPE_CHECKING
 from backend.services.database_service import DatabaseService, get_database_service
-from langchain_community.vectorstores import Chroma
 from fastapi import Depends
 
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+
 class ChatService:
     """Service to handle core conversational logic."""
     
     def __init__(self, db_service: DatabaseService):
         self.db_service = db_service
     
-    def get_answer(self, vector_store: Chroma, question: str, session_id: str, language: str):
+    def get_answer(self, vector_store: "Chroma", question: str, session_id: str, language: str, collection_version: int = None):
         """
         Invokes the QA chain to get an answer to a question.
         The vector_store is now a direct parameter.
         """
-        qa_chain = create_qa_chain(vector_store, language=language)
+        from backend.components.chat_logic import create_qa_chain
+
+        qa_chain = create_qa_chain(vector_store, language=language, collection_version=collection_version)
 
         db_history = self.db_service.get_chat_history(session_id)
         formatted_history = self._format_chat_history(db_history)
@@ -23,8 +27,46 @@ class ChatService:
         response = qa_chain.invoke({'question': question, 'chat_history': formatted_history})
         return response['answer']
 
+    def batch_concurrency(self, questions: list) -> int:
+        """How many LLM calls a batch of questions can use at once, and so how many admission slots it asks for."""
+        from backend.components.chat_logic import BATCH_LLM_CONCURRENCY
+
+        return max(1, min(len(questions), BATCH_LLM_CONCURRENCY))
+
+    def get_batch_answers(
+        self, vector_store: "Chroma", questions: list, session_id: str, language: str,
+        write_history: bool = False, max_concurrency: int = None,
+    ):
+        """
+        Answers a batch of questions against the session's documents in one pass,
+        with at most max_concurrency LLM calls at a time (BATCH_LLM_CONCURRENCY by default).
+        With write_history, every answered question is added to the chat history in one transaction;
+        questions that failed are not.
+        """
+        from backend.components.chat_logic import answer_questions, BATCH_LLM_CONCURRENCY
+
+        start = time.perf_counter()
+        formatted_history = self._format_chat_history(self.db_service.get_chat_history(session_id))
+        results, timings = answer_questions(
+            vector_store, questions, formatted_history, language=language,
+            max_concurrency=max_concurrency or BATCH_LLM_CONCURRENCY,
+        )
+
+        if write_history:
+            messages = []
+            for result in results:
+                if result["answer"] is not None and "error" not in result:
+                    messages.append({"role": "user", "content": result["question"]})
+                    messages.append({"role": "assistant", "content": result["answer"]})
+            self.db_service.add_messages(session_id, messages)
+
+        timings["total_ms"] = (time.perf_counter() - start) * 1000
+        return {"answers": results, "timings": timings}
+
     def _format_chat_history(self, history: list):
         """Formats the chat history for the QA chain."""
+        from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
         formatted = []
         for msg in history:
             if msg['role'] == 'user':
@@ -0,0 +1,265 @@
+# backend/services/coalescing_service.py
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from fastapi import Depends, HTTPException
+
+from backend.services.redis_cache_service import RedisCacheService, get_redis_cache_service
+from backend.utils import json_codec
+from backend.utils.profiling import run_in_threadpool
+from backend.utils.metrics import COALESCED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# The leader refreshes its lock every third of this, so followers of a crashed leader
+# notice within this long that it is gone and run the request themselves.
+SINGLE_FLIGHT_LOCK_SECONDS = float(os.getenv("SINGLE_FLIGHT_LOCK_SECONDS", "10"))
+# Followers of a live but slow leader stop waiting and run the request themselves after this long.
+SINGLE_FLIGHT_MAX_WAIT_SECONDS = float(os.getenv("SINGLE_FLIGHT_MAX_WAIT_SECONDS", "300"))
+# The leader's outcome stays readable this long, for followers that check just after it finished.
+SINGLE_FLIGHT_RESULT_TTL = int(os.getenv("SINGLE_FLIGHT_RESULT_TTL", "15"))
+# An identical upload for the same session is not resubmitted while its task runs, for at most this long.
+INGEST_DEDUP_SECONDS = int(os.getenv("INGEST_DEDUP_SECONDS", "900"))
+# A claimed upload whose task was never published (the API replica died while staging it)
+# blocks identical uploads for at most this long; publishing extends it to INGEST_DEDUP_SECONDS.
+INGEST_RESERVATION_SECONDS = int(os.getenv("INGEST_RESERVATION_SECONDS", "60"))
+INGEST_CLAIM_ATTEMPTS = 3
+LEADER_CHECK_SECONDS = 1.0
+POLL_SECONDS = 0.05
+
+# Takes the lock unless it is held, and returns the owner holding it afterwards.
+_CLAIM_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current then return current end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+return ARGV[1]
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+# Sets the expiry of a key, only while it still holds the caller's value.
+_EXTEND_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('PEXPIRE', KEYS[1], ARGV[2]) end
+return 0
+"""
+
+# Replaces a key's value only if it still holds the one the caller read (compare-and-set).
+_REPLACE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+  return 1
+end
+return 0
+"""
+
+def normalize_payload(payload: Any) -> Any:
+    """Collapses whitespace in strings (recursively) so trivially different duplicates share a key."""
+    if isinstance(payload, str):
+        return " ".join(payload.split())
+    if isinstance(payload, dict):
+        return {key: normalize_payload(value) for key, value in payload.items()}
+    if isinstance(payload, (list, tuple)):
+        return [normalize_payload(value) for value in payload]
+    return payload
+
+def coalescing_key(endpoint: str, session_id: str, payload: Any, version: int) -> str:
+    material = json.dumps([endpoint, session_id, normalize_payload(payload), version], sort_keys=True)
+    return hashlib.sha256(material.encode()).hexdigest()
+
+class CoalescingService:
+    """
+    Single-flight execution of identical in-flight requests across API replicas.
+    The first request takes a Redis lock and runs; duplicates subscribe to a result
+    channel and return the leader's outcome instead of calling the LLM again.
+    """
+
+    def __init__(self, cache_service: RedisCacheService):
+        self.cache_service = cache_service
+        self.client = cache_service.client
+
+    async def run(
+        self,
+        endpoint: str,
+        session_id: str,
+        payload: Any,
+        version: int,
+        func: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """Runs func once per (endpoint, session, normalized payload, collection version) at a time."""
+        key = coalescing_key(endpoint, session_id, payload, version)
+        lock_key = f"singleflight:lock:{key}"
+        owner = uuid.uuid4().hex
+        try:
+            leader = await run_in_threadpool(
+                self.client.register_script(_CLAIM_SCRIPT), keys=[lock_key], args=[owner, int(SINGLE_FLIGHT_LOCK_SECONDS * 1000)]
+            )
+        except Exception as e:
+            logger.error(f"Single-flight unavailable, running {endpoint} request uncoalesced: {e}")
+            return await func()
+
+        leader = leader.decode()
+        if leader == owner:
+            COALESCED_REQUESTS.labels(endpoint, "leader").inc()
+            return await self._lead(key, lock_key, owner, func)
+
+        outcome = await self._follow(key, lock_key, leader)
+        if outcome is None:
+            COALESCED_REQUESTS.labels(endpoint, "orphaned").inc()
+            logger.warning(f"Leader of a coalesced {endpoint} request vanished; running it again.")
+            return await func()
+        COALESCED_REQUESTS.labels(endpoint, "follower").inc()
+        if "error" in outcome:
+            raise HTTPException(**outcome["error"])
+        return outcome["result"]
+
+    async def _keep_lock(self, lock_key: str, owner: str):
+        """Refreshes the leader's lock until cancelled, so it only expires if the leader dies."""
+        extend = self.client.register_script(_EXTEND_SCRIPT)
+        while True:
+            await asyncio.sleep(SINGLE_FLIGHT_LOCK_SECONDS / 3)
+            try:
+                if not await run_in_threadpool(extend, keys=[lock_key], args=[owner, int(SINGLE_FLIGHT_LOCK_SECONDS * 1000)]):
+                    logger.warning(f"Single-flight lock {lock_key} was lost; duplicates may run the request too.")
+                    return
+            except Exception as e:
+                logger.error(f"Could not refresh single-flight lock {lock_key}: {e}")
+
+    async def _lead(self, key: str, lock_key: str, owner: str, func) -> Dict[str, Any]:
+        outcome = None
+        keep_lock = asyncio.create_task(self._keep_lock(lock_key, owner))
+        try:
+            result = await func()
+            outcome = {"result": result}
+            return result
+        except HTTPException as e:
+            outcome = {"error": {"status_code": e.status_code, "detail": e.detail, "headers": e.headers}}
+            raise
+        except Exception:
+            outcome = {"error": {"status_code": 500, "detail": "Error processing the request."}}
+            raise
+        finally:
+            keep_lock.cancel()
+            # Shielded, so followers still get the outcome when this request is cancelled.
+            await asyncio.shield(run_in_threadpool(self._publish, key, lock_key, owner, outcome))
+
+    def _publish(self, key: str, lock_key: str, owner: str, outcome: Dict[str, Any] | None):
+        """Stores and broadcasts the leader's outcome, tagged with its owner, then releases the lock."""
+        try:
+            message = json_codec.dumps({"owner": owner, "outcome": outcome})
+            self.client.set(f"singleflight:result:{key}", message, ex=SINGLE_FLIGHT_RESULT_TTL)
+            self.client.publish(f"singleflight:done:{key}", message)
+            self.client.register_script(_RELEASE_SCRIPT)(keys=[lock_key], args=[owner])
+        except Exception as e:
+            logger.error(f"Could not publish single-flight result {key}; followers will time out: {e}")
+
+    async def _follow(self, key: str, lock_key: str, leader: str) -> Dict[str, Any] | None:
+        """
+        Waits for the outcome of the given leader; returns None if it disappears without one.
+        Redis is polled off the event loop, like the admission queue.
+        """
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await run_in_threadpool(pubsub.subscribe, f"singleflight:done:{key}")
+            deadline = time.monotonic() + SINGLE_FLIGHT_MAX_WAIT_SECONDS
+            # Checked at once: the leader may have finished before the subscription.
+            next_leader_check = time.monotonic()
+            while time.monotonic() < deadline:
+                check_leader = time.monotonic() >= next_leader_check
+                done, outcome = await run_in_threadpool(self._poll, pubsub, key, lock_key, leader, check_leader)
+                if done:
+                    return outcome
+                if check_leader:
+                    next_leader_check = time.monotonic() + LEADER_CHECK_SECONDS
+                await asyncio.sleep(POLL_SECONDS)
+            return None
+        finally:
+            pubsub.close()
+
+    def _poll(self, pubsub, key: str, lock_key: str, leader: str, check_leader: bool) -> Tuple[bool, Dict[str, Any] | None]:
+        """
+        One follower check. Returns (done, outcome). Outcomes of other leaders (an earlier
+        one's stored result, or a later one's broadcast) are ignored.
+        """
+        while message := pubsub.get_message(timeout=0):
+            finished = json_codec.loads(message["data"])
+            if finished["owner"] == leader:
+                return True, finished["outcome"]
+        if not check_leader:
+            return False, None
+        current = self.client.get(lock_key)
+        if current is not None and current.decode() == leader:
+            return False, None
+        stored = self.client.get(f"singleflight:result:{key}")
+        finished = json_codec.loads(stored) if stored else None
+        return True, finished["outcome"] if finished and finished["owner"] == leader else None
+
+    def claim_ingest(
+        self,
+        session_id: str,
+        file_data: List[Dict[str, Any]],
+        is_running: Callable[[str], bool],
+    ) -> Tuple[str, bool]:
+        """
+        Reserves a task id for an upload. Returns (task_id, is_duplicate): when the same files
+        were already submitted for the session and that task is still running, its id is
+        returned with is_duplicate=True and nothing should be submitted.
+        The reservation lasts INGEST_RESERVATION_SECONDS until confirm_ingest is called, since
+        Celery reports an id it has never seen as PENDING, just like a queued task.
+        """
+        key = self._ingest_key(session_id, file_data)
+        task_id = str(uuid.uuid4())
+        replace = self.client.register_script(_REPLACE_SCRIPT)
+        existing = None
+        for _ in range(INGEST_CLAIM_ATTEMPTS):
+            if self.client.set(key, task_id, nx=True, ex=INGEST_RESERVATION_SECONDS):
+                return task_id, False
+            existing = self.client.get(key)
+            if existing is None:
+                continue
+            if is_running(existing.decode()):
+                break
+            # Take over a finished upload's reservation, unless another request just did.
+            if replace(keys=[key], args=[existing, task_id, INGEST_RESERVATION_SECONDS]):
+                return task_id, False
+        else:
+            # Every attempt raced with other requests claiming the same upload; one of them won.
+            existing = self.client.get(key) or existing
+        if existing is None:
+            # The reservation keeps expiring under us; run the upload rather than fail it.
+            return task_id, False
+        COALESCED_REQUESTS.labels("process_pdfs", "follower").inc()
+        return existing.decode(), True
+
+    def confirm_ingest(self, session_id: str, file_data: List[Dict[str, Any]], task_id: str):
+        """Keeps an upload's reservation for INGEST_DEDUP_SECONDS once its task is published."""
+        self.client.register_script(_EXTEND_SCRIPT)(
+            keys=[self._ingest_key(session_id, file_data)], args=[task_id, INGEST_DEDUP_SECONDS * 1000]
+        )
+
+    def release_ingest(self, session_id: str, file_data: List[Dict[str, Any]], task_id: str):
+        """Drops an upload's reservation, e.g. when its task could not be submitted."""
+        self.client.register_script(_RELEASE_SCRIPT)(keys=[self._ingest_key(session_id, file_data)], args=[task_id])
+
+    @staticmethod
+    def _ingest_key(session_id: str, file_data: List[Dict[str, Any]]) -> str:
+        digest = hashlib.sha256()
+        for file in file_data:
+            digest.update(file["filename"].encode())
+            digest.update(bytes.fromhex(file["sha256"]) if "sha256" in file else hashlib.sha256(file["content"]).digest())
+        return f"singleflight:ingest:{session_id}:{digest.hexdigest()}"
+
+# --- Dependency Injection for FastAPI ---
+def get_coalescing_service(
+    cache_service: RedisCacheService = Depends(get_redis_cache_service),
+) -> CoalescingService:
+    return CoalescingService(cache_service=cache_service)
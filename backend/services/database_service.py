@@ -1,43 +1,112 @@
-from typing import List, Dict, Any, Generator
-from backend.models.schemas import ChatSession, ChatMessage
+import base64
+import os
+import uuid
+from datetime import datetime
+from typing import List, Dict, Any, Generator, Tuple
+from backend.models.schemas import ChatSession, ChatMessage, ChatSessionFile, SessionCollection
 from typing import Optional
+from sqlalchemy import and_, or_, select
 from sqlalchemy.orm import sessionmaker, Session as DBSession
+from backend.services.redis_cache_service import RedisCacheService, get_redis_cache_service
+from backend.utils.metrics import timed
 from fastapi import Depends
 
+CHATROOMS_DEFAULT_PAGE_SIZE = int(os.getenv("CHATROOMS_DEFAULT_PAGE_SIZE", "20"))
+CHATROOMS_MAX_PAGE_SIZE = int(os.getenv("CHATROOMS_MAX_PAGE_SIZE", "100"))
+# Chatroom names are the joined filenames; long ones are shortened in listings.
+CHATROOM_NAME_MAX_LENGTH = 200
+SEARCH_QUERY_MAX_LENGTH = 200
+# Every write to a session's files or messages bumps its revision, which the read endpoints
+# serve as an ETag. The key is refreshed on each use, so only abandoned sessions expire.
+SESSION_REVISION_TTL_SECONDS = int(os.getenv("SESSION_REVISION_TTL_SECONDS", str(30 * 24 * 3600)))
+
+def _as_uuid(session_id) -> uuid.UUID:
+    """ChatSession ids are UUID columns; binding a UUID keeps them portable across database drivers."""
+    return session_id if isinstance(session_id, uuid.UUID) else uuid.UUID(str(session_id))
+
+def _lookup_uuid(session_id) -> Optional[uuid.UUID]:
+    """_as_uuid for lookups: an id that is not a UUID names no session, so it finds nothing."""
+    try:
+        return _as_uuid(session_id)
+    except ValueError:
+        return None
+
+def encode_cursor(created_at: datetime, session_id: uuid.UUID) -> str:
+    """Opaque keyset cursor pointing just after the given chatroom."""
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{session_id}".encode()).decode()
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    try:
+        created_at, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(session_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def _contains(query: str) -> str:
+    """ILIKE pattern matching query anywhere, with LIKE wildcards in the query escaped."""
+    escaped = query[:SEARCH_QUERY_MAX_LENGTH].replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
 class DatabaseService:
-    def __init__(self, session_factory: sessionmaker):
+    def __init__(self, session_factory: sessionmaker, cache_service: RedisCacheService = None):
         self.session_factory = session_factory
-        
+        self.cache_service = cache_service
+
+    def get_session_revision(self, session_id: str) -> Optional[int]:
+        """The session's revision, or None without a cache service (no conditional requests then)."""
+        if self.cache_service is None:
+            return None
+        return self.cache_service.get_revision(f"session_revision:{session_id}", ex=SESSION_REVISION_TTL_SECONDS)
+
+    def _bump_revision(self, session_id: str):
+        # Called after the commit: a reader takes the revision before reading the rows, so it
+        # can pair an old revision with new rows (one extra refetch) but never the reverse.
+        if self.cache_service is not None:
+            self.cache_service.bump_revision(f"session_revision:{session_id}", ex=SESSION_REVISION_TTL_SECONDS)
+
+    @timed("database")
     def create_session(self, session_id: str, filenames: List[str]):
         """Creates a new chat session in the database."""
         db = self.session_factory()
         try:
-            db_session = ChatSession(id=session_id, name=", ".join(filenames), uploaded_files=filenames)
+            db_session = ChatSession(id=_as_uuid(session_id), name=", ".join(filenames), uploaded_files=filenames)
             db.add(db_session)
+            db.add_all(ChatSessionFile(session_id=db_session.id, filename=filename) for filename in filenames)
             db.commit()
         finally:
             db.close()
+        self._bump_revision(session_id)
 
+    @timed("database")
     def get_session(self, session_id: str) -> Optional[ChatSession]:
         """Retrieves a ChatSession object from the database by its ID."""
         db = self.session_factory()
         try:
-            chat_session = db.query(ChatSession).filter_by(id=session_id).first()
-            return chat_session
+            session_uuid = _lookup_uuid(session_id)
+            if session_uuid is None:
+                return None
+            return db.query(ChatSession).filter_by(id=session_uuid).first()
         finally:
             db.close()
     
+    @timed("database")
     def update_uploaded_files(self, session_id: str, filenames: List[str]):
         """Updates the list of uploaded files for an existing session."""
         db = self.session_factory()
         try:
-            chat_session = db.query(ChatSession).filter_by(id=session_id).first()
+            session_uuid = _lookup_uuid(session_id)
+            chat_session = db.query(ChatSession).filter_by(id=session_uuid).first() if session_uuid else None
             if chat_session:
                 chat_session.uploaded_files = filenames
+                db.query(ChatSessionFile).filter(ChatSessionFile.session_id == chat_session.id).delete()
+                db.add_all(ChatSessionFile(session_id=chat_session.id, filename=filename) for filename in filenames)
                 db.commit()
         finally:
             db.close()
+        self._bump_revision(session_id)
 
+    @timed("database")
     def add_message(self, session_id: str, role: str, content: str):
         db = self.session_factory()
         try:
@@ -46,7 +115,57 @@ class DatabaseService:
             db.commit()
         finally:
             db.close()
+        self._bump_revision(session_id)
+
+    @timed("database")
+    def add_messages(self, session_id: str, messages: List[Dict[str, str]]):
+        """
+        Adds several {"role", "content"} messages in a single transaction.
+        Messages restored from an archive keep their original ISO "created_at".
+        """
+        db = self.session_factory()
+        try:
+            db.add_all(
+                ChatMessage(session_id=session_id, role=m["role"], content=m["content"], created_at=datetime.fromisoformat(m["created_at"]))
+                if m.get("created_at") else ChatMessage(session_id=session_id, role=m["role"], content=m["content"])
+                for m in messages
+            )
+            db.commit()
+        finally:
+            db.close()
+        self._bump_revision(session_id)
+
+    @timed("database")
+    def export_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Like get_chat_history, with each message's created_at as an ISO string, for archiving."""
+        db = self.session_factory()
+        try:
+            messages = db.query(ChatMessage).filter(ChatMessage.session_id == session_id).order_by(ChatMessage.created_at, ChatMessage.id).all()
+            return [{"role": m.role, "content": m.content, "created_at": m.created_at.isoformat() if m.created_at else None} for m in messages]
+        finally:
+            db.close()
 
+    @timed("database")
+    def delete_chat_history(self, session_id: str, batch_size: int) -> int:
+        """Deletes a session's messages in transactions of at most batch_size rows; returns the count."""
+        deleted = 0
+        try:
+            while True:
+                db = self.session_factory()
+                try:
+                    ids = [row.id for row in db.query(ChatMessage.id).filter(ChatMessage.session_id == session_id).limit(batch_size)]
+                    if not ids:
+                        return deleted
+                    db.query(ChatMessage).filter(ChatMessage.id.in_(ids)).delete(synchronize_session=False)
+                    db.commit()
+                    deleted += len(ids)
+                finally:
+                    db.close()
+        finally:
+            if deleted:
+                self._bump_revision(session_id)
+
+    @timed("database")
     def get_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
         db = self.session_factory()
         try:
@@ -55,25 +174,114 @@ class DatabaseService:
         finally:
             db.close()
 
-    def get_all_chatrooms(self) -> List[Dict[str, Any]]:
+    @timed("database")
+    def list_chatrooms(
+        self,
+        limit: int = CHATROOMS_DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        name_query: Optional[str] = None,
+        filename_query: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Returns one page of chatrooms, newest first, using keyset pagination on (created_at, id).
+        name_query and filename_query filter by case-insensitive substring.
+        """
+        limit = max(1, min(limit, CHATROOMS_MAX_PAGE_SIZE))
+        db = self.session_factory()
+        try:
+            query = db.query(ChatSession.id, ChatSession.name, ChatSession.created_at)
+            if cursor:
+                created_at, last_id = decode_cursor(cursor)
+                query = query.filter(or_(
+                    ChatSession.created_at < created_at,
+                    and_(ChatSession.created_at == created_at, ChatSession.id < last_id),
+                ))
+            if name_query:
+                query = query.filter(ChatSession.name.ilike(_contains(name_query), escape="\\"))
+            if filename_query:
+                matching = select(ChatSessionFile.session_id).where(ChatSessionFile.filename.ilike(_contains(filename_query), escape="\\"))
+                query = query.filter(ChatSession.id.in_(matching))
+
+            rows = query.order_by(ChatSession.created_at.desc(), ChatSession.id.desc()).limit(limit + 1).all()
+            page = rows[:limit]
+            next_cursor = encode_cursor(page[-1].created_at, page[-1].id) if len(rows) > limit else None
+            return {
+                "chatrooms": [
+                    {"session_id": row.id, "name": (row.name or "")[:CHATROOM_NAME_MAX_LENGTH], "created_at": row.created_at}
+                    for row in page
+                ],
+                "next_cursor": next_cursor,
+            }
+        finally:
+            db.close()
+
+    @timed("database")
+    def backfill_session_files(self):
+        """Creates chat_session_files rows for sessions stored before the table existed."""
+        db = self.session_factory()
+        try:
+            has_files = select(ChatSessionFile.session_id).where(ChatSessionFile.session_id == ChatSession.id).exists()
+            sessions = db.query(ChatSession).filter(~has_files).all()
+            for chat_session in sessions:
+                db.add_all(ChatSessionFile(session_id=chat_session.id, filename=filename) for filename in chat_session.uploaded_files or [])
+            db.commit()
+            return len(sessions)
+        finally:
+            db.close()
+
+    @timed("database")
+    def get_collection_pointer(self, session_id: str) -> Optional[Tuple[int, str]]:
+        """Returns the (version, collection name) serving the session, or None if none was recorded."""
         db = self.session_factory()
         try:
-            sessions = db.query(ChatSession).all()
-            return [{"session_id": s.id, "name": s.name} for s in sessions]
+            session_uuid = _lookup_uuid(session_id)
+            if session_uuid is None:
+                return None
+            pointer = db.query(SessionCollection).filter_by(session_id=session_uuid).first()
+            return (pointer.version, pointer.collection_name) if pointer else None
+        finally:
+            db.close()
+
+    @timed("database")
+    def swap_collection_pointer(self, session_id: str, version: int, collection_name: str) -> Tuple[bool, Optional[str]]:
+        """
+        Points the session at a newly built collection, unless a newer version was swapped in
+        meanwhile. Returns (swapped, retired collection name or None) in a single transaction.
+        """
+        db = self.session_factory()
+        try:
+            pointer = db.query(SessionCollection).filter_by(session_id=_as_uuid(session_id)).with_for_update().first()
+            if pointer is None:
+                db.add(SessionCollection(session_id=_as_uuid(session_id), version=version, collection_name=collection_name))
+                db.commit()
+                return True, None
+            if pointer.version >= version:
+                return False, None
+            retired = pointer.collection_name
+            pointer.version = version
+            pointer.collection_name = collection_name
+            db.commit()
+            return True, retired
         finally:
             db.close()
 
+    @timed("database")
     def delete_session(self, session_id: str):
         db = self.session_factory()
         try:
             db.query(ChatMessage).filter(ChatMessage.session_id == session_id).delete()
-            db.query(ChatSession).filter(ChatSession.id == session_id).delete()
+            session_uuid = _lookup_uuid(session_id)
+            if session_uuid is not None:
+                db.query(SessionCollection).filter(SessionCollection.session_id == session_uuid).delete()
+                db.query(ChatSessionFile).filter(ChatSessionFile.session_id == session_uuid).delete()
+                db.query(ChatSession).filter(ChatSession.id == session_uuid).delete()
             db.commit()
         finally:
             db.close()
+        self._bump_revision(session_id)
 
 # --- Dependency Injection for FastAPI ---
-def get_database_service() -> Generator[DatabaseService, None, None]:
+def get_database_service(cache_service: RedisCacheService = Depends(get_redis_cache_service)) -> Generator[DatabaseService, None, None]:
     """
     Dependency that provides a DatabaseService instance.
     The session factory is imported here and yielded.
@@ -81,6 +289,6 @@ def get_database_service() -> Generator[DatabaseService, None, None]:
     from backend.database import SessionLocal
     db_session = SessionLocal()
     try:
-        yield DatabaseService(SessionLocal)
+        yield DatabaseService(SessionLocal, cache_service)
     finally:
         db_session.close()
\ No newline at end of file
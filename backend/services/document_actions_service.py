@@ -1,33 +1,81 @@
 # backend/services/document_actions_service.py
 
+import hashlib
+import json
 import logging
-from typing import List, Dict, Any, Optional
-from langchain_chroma import Chroma
-from backend.components.document_actions import get_summarize_chain, get_comparison_chain, get_classification_chain
+import os
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
 from backend.services.database_service import DatabaseService, get_database_service
+from backend.services.redis_cache_service import RedisCacheService, get_redis_cache_service
+from backend.utils.metrics import timed, ACTION_CACHE_REQUESTS
 from fastapi import Depends, HTTPException
-from langchain_core.documents import Document
+
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+    from langchain_core.documents import Document
 
 logger = logging.getLogger(__name__)
 
+# Summaries, comparisons and classifications are deterministic at temperature 0 for a fixed
+# collection version, so they are cached (ACTION_CACHE_TTL=0 disables the cache).
+ACTION_CACHE_TTL = int(os.getenv("ACTION_CACHE_TTL", "86400"))
+ACTION_CACHE_MAX_ENTRIES = int(os.getenv("ACTION_CACHE_MAX_ENTRIES", "10000"))
+ACTION_CACHE_MAX_ENTRY_BYTES = int(os.getenv("ACTION_CACHE_MAX_ENTRY_BYTES", "65536"))
+ACTION_CACHE_INDEX_KEY = "action_cache:index"
+
 class DocumentActionsService:
-    def __init__(self, db_service: DatabaseService):
+    def __init__(self, db_service: DatabaseService, cache_service: RedisCacheService):
         self.db_service = db_service
+        self.cache_service = cache_service
+
+    @staticmethod
+    def _result_cache_key(action: str, session_id: str, filenames: Optional[List[str]], language: str, version: int) -> str:
+        files = hashlib.sha256(json.dumps(sorted(filenames or [])).encode()).hexdigest()[:16]
+        return f"action_cache:{session_id}:{version}:{action}:{language}:{files}"
+
+    def get_cached_result(self, action: str, session_id: str, filenames: Optional[List[str]], language: str, version: int) -> Optional[str]:
+        """Returns a cached action result for this collection version, or None."""
+        if ACTION_CACHE_TTL <= 0:
+            return None
+        key = self._result_cache_key(action, session_id, filenames, language, version)
+        try:
+            cached = self.cache_service.get_json(key)
+            ACTION_CACHE_REQUESTS.labels(action, "hit" if cached else "miss").inc()
+            if cached:
+                self.cache_service.track_lru(ACTION_CACHE_INDEX_KEY, key, ACTION_CACHE_MAX_ENTRIES)
+                return cached["result"]
+        except Exception as e:
+            logger.warning(f"Could not read cached {action} result: {e}")
+        return None
+
+    def cache_result(self, action: str, session_id: str, filenames: Optional[List[str]], language: str, version: int, result: str):
+        """Caches an action result; results larger than ACTION_CACHE_MAX_ENTRY_BYTES are not cached."""
+        if ACTION_CACHE_TTL <= 0 or len(result.encode()) > ACTION_CACHE_MAX_ENTRY_BYTES:
+            return
+        key = self._result_cache_key(action, session_id, filenames, language, version)
+        try:
+            self.cache_service.set_json(key, {"result": result}, ex=ACTION_CACHE_TTL)
+            self.cache_service.track_lru(ACTION_CACHE_INDEX_KEY, key, ACTION_CACHE_MAX_ENTRIES)
+        except Exception as e:
+            logger.warning(f"Could not cache {action} result: {e}")
 
-    def _retrieve_content(self, vector_store: Chroma, filenames: Optional[List[str]]) -> List[Document]:
+    @timed("document_actions", "retrieve_content")
+    def _retrieve_content(self, vector_store: "Chroma", filenames: Optional[List[str]], collection_version: Optional[int] = None) -> List["Document"]:
         """
         Retrieves document content from the vector store based on filenames.
         If no filenames are provided, it retrieves all documents.
         """
+        from backend.components.retrieval_cache import cached_embed_query, cached_similarity_search
+
         if not filenames:
-            retriever = vector_store.as_retriever(search_kwargs={"k": 100})
-            docs = retriever.invoke("all") 
+            query_embedding = cached_embed_query(vector_store.embeddings, "all")
+            docs = cached_similarity_search(vector_store, query_embedding, 100, collection_version)
         else:
             docs = []
+            query_embedding = cached_embed_query(vector_store.embeddings, "")
             for filename in filenames:
                 try:
-                    retriever = vector_store.as_retriever(search_kwargs={"filter": {"filename": filename}})
-                    file_docs = retriever.get_relevant_documents("")
+                    file_docs = cached_similarity_search(vector_store, query_embedding, 4, collection_version, filter={"filename": filename})
                     docs.extend(file_docs)
                 except Exception as e:
                     logger.warning(f"Could not retrieve documents for filename {filename}: {e}")
@@ -37,18 +85,19 @@ class DocumentActionsService:
         
         return docs
 
-    def summarize_documents(self, vector_store: Chroma, filenames: Optional[List[str]], language: str) -> str:
+    def summarize_documents(self, vector_store: "Chroma", filenames: Optional[List[str]], language: str, collection_version: Optional[int] = None) -> str:
         """Generates a summary for the specified documents."""
         try:
-            docs = self._retrieve_content(vector_store, filenames)
+            docs = self._retrieve_content(vector_store, filenames, collection_version)
             combined_content = "\n\n".join([doc.page_content for doc in docs])
+            from backend.components.document_actions import get_summarize_chain
             summary_chain = get_summarize_chain(language=language)
             return summary_chain.invoke({"text": combined_content})
         except ValueError as e:
             logger.error(f"Error summarizing documents: {e}")
             raise HTTPException(status_code=400, detail=str(e))
 
-    def compare_documents(self, vector_store: Chroma, filenames: List[str], language: str) -> str:
+    def compare_documents(self, vector_store: "Chroma", filenames: List[str], language: str, collection_version: Optional[int] = None) -> str:
         """Compares multiple documents."""
         if len(filenames) < 2:
             raise HTTPException(status_code=400, detail="Comparison requires at least two files.")
@@ -56,20 +105,22 @@ class DocumentActionsService:
         content_summary = ""
         for filename in filenames:
             try:
-                docs = self._retrieve_content(vector_store, [filename])
+                docs = self._retrieve_content(vector_store, [filename], collection_version)
                 combined_content = "\n\n".join([doc.page_content for doc in docs])
                 content_summary += f"\n\n--- Content of {filename} ---\n{combined_content}"
             except ValueError:
                 raise HTTPException(status_code=404, detail=f"File not found: {filename}")
 
+        from backend.components.document_actions import get_comparison_chain
         comparison_chain = get_comparison_chain(language=language)
         return comparison_chain.invoke({"filenames": ", ".join(filenames), "content_summary": content_summary})
 
-    def classify_topics(self, vector_store: Chroma, language: str) -> str:
+    def classify_topics(self, vector_store: "Chroma", language: str, collection_version: Optional[int] = None) -> str:
         """Classifies the main topics of all documents in the session."""
         try:
-            docs = self._retrieve_content(vector_store, filenames=None)
+            docs = self._retrieve_content(vector_store, filenames=None, collection_version=collection_version)
             combined_content = "\n\n".join([doc.page_content for doc in docs])
+            from backend.components.document_actions import get_classification_chain
             classification_chain = get_classification_chain(language=language)
             return classification_chain.invoke({"text": combined_content})
         except ValueError as e:
@@ -79,5 +130,6 @@ class DocumentActionsService:
 # --- Dependency Injection for FastAPI ---
 def get_document_actions_service(
     db_service: DatabaseService = Depends(get_database_service),
+    cache_service: RedisCacheService = Depends(get_redis_cache_service),
 ) -> DocumentActionsService:
-    return DocumentActionsService(db_service=db_service)
\ No newline at end of file
+    return DocumentActionsService(db_service=db_service, cache_service=cache_service)
\ No newline at end of file
@@ -1,17 +1,67 @@
 from http.client import HTTPException
 import logging
-from typing import List, Dict, Any, Optional
-from langchain_chroma import Chroma
-from langchain_core.documents import Document
-from backend.components.document_processor import get_pdf_text, create_text_chunks, vectorize_and_store
+import os
+import time
+import uuid
+from typing import Callable, List, Dict, Any, Optional, Tuple, TYPE_CHECKING
 from backend.chroma_client_singleton import ChromaClientSingleton
+from backend.components.retrieval_cache import LRUCache
 from backend.services.database_service import DatabaseService, get_database_service
 from backend.services.redis_cache_service import RedisCacheService, get_redis_cache_service
 from backend.utils.model_loader import get_embeddings_model
+from backend.utils.metrics import INGEST_TASKS_SUPERSEDED, SESSION_LIFECYCLE_EVENTS, stage_timer, timed
+from backend.utils.session_archive import SessionArchive
+from backend.utils.upload_staging import UploadStaging
 from fastapi import Depends
 
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+
 logger = logging.getLogger(__name__)
 
+# With float16 or int8, a collection's vectors are only kept quantized (in Redis); Chroma keeps the texts.
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")
+# Memory each process may use for decoded quantized indexes (MiB), so a request does not fetch and decode one.
+QUANTIZED_INDEX_CACHE_MB = int(os.getenv("QUANTIZED_INDEX_CACHE_MB", "256"))
+INGEST_STAGING_TTL = int(os.getenv("INGEST_STAGING_TTL", "3600"))
+# Sessions not used for this long have their vectors evicted to the session archive (0 disables eviction).
+SESSION_IDLE_TTL_SECONDS = int(os.getenv("SESSION_IDLE_TTL_SECONDS", str(7 * 24 * 3600)))
+# At most this many sessions are evicted per garbage-collection run.
+SESSION_GC_BATCH_SIZE = int(os.getenv("SESSION_GC_BATCH_SIZE", "50"))
+# Also move evicted sessions' chat history out of Postgres, in transactions of SESSION_GC_DELETE_BATCH rows.
+SESSION_GC_ARCHIVE_HISTORY = os.getenv("SESSION_GC_ARCHIVE_HISTORY", "false").lower() == "true"
+SESSION_GC_DELETE_BATCH = int(os.getenv("SESSION_GC_DELETE_BATCH", "1000"))
+# How long a request for an evicted session waits while another request re-hydrates it.
+SESSION_REHYDRATE_WAIT_SECONDS = float(os.getenv("SESSION_REHYDRATE_WAIT_SECONDS", "120"))
+SESSION_LOCK_SECONDS = 600
+# The collection pointer is re-read from Postgres at least this often.
+COLLECTION_POINTER_CACHE_TTL = int(os.getenv("COLLECTION_POINTER_CACHE_TTL", "86400"))
+# How long a session remembers its current ingestion task; older tasks for the session stop at their next check.
+INGEST_TASK_TTL = int(os.getenv("INGEST_TASK_TTL", "86400"))
+# Chunks are read from Chroma in pages of this size when a session is archived.
+ARCHIVE_PAGE_SIZE = 5000
+
+LAST_ACCESS_KEY = "session_last_access"
+SEED_OFFSET_KEY = "session_gc:seed_offset"
+
+QUANTIZATION_MODES = ("none", "float16", "int8")
+
+if VECTOR_QUANTIZATION not in QUANTIZATION_MODES:
+    raise ValueError(f"VECTOR_QUANTIZATION must be one of {QUANTIZATION_MODES}, got {VECTOR_QUANTIZATION!r}")
+
+def versioned_collection_name(session_id: str, version: int) -> str:
+    return f"{session_id}_v{version}"
+
+def session_id_of(collection_name: str) -> str:
+    """Inverse of versioned_collection_name; unversioned collections are named after the session."""
+    return collection_name.split("_v", 1)[0]
+
+# Keyed by collection name, which is versioned, so a re-ingested session never hits a stale index.
+_quantized_index_cache = LRUCache(QUANTIZED_INDEX_CACHE_MB * 1024 * 1024, weigh=lambda index: index.nbytes)
+
+class IngestSuperseded(Exception):
+    """Raised inside an ingestion task once a newer upload for the same session has replaced it."""
+
 class DocumentService:
     """Service to handle the core document processing and persistence logic."""
     
@@ -21,67 +71,345 @@ class DocumentService:
         cache_service: RedisCacheService,
         chroma_client: ChromaClientSingleton,
         embeddings,
+        archive: SessionArchive = None,
+        staging: UploadStaging = None,
     ):
         self.db_service = db_service
         self.cache_service = cache_service
         self.chroma_client = chroma_client
         self.embeddings = embeddings
+        self.archive = archive or SessionArchive()
+        self.staging = staging or UploadStaging()
 
     def process_documents(self, session_id: str, file_data: List[Dict[str, Any]]):
         """
         Processes uploaded documents and stores them in a vector store.
+        Runs every file in-process; the Celery pipeline fans the same steps out across workers.
+        """
+        results = [self.prepare_file(session_id, file) for file in file_data]
+        return self.commit_documents(session_id, results)
+
+    @timed("ingestion")
+    def stage_upload(self, upload) -> str:
+        """
+        Copies a spooled upload to the shared staging directory in chunks and returns its
+        name, so the file reaches the workers without being held in API memory, Redis or
+        the task message.
+        """
+        return self.staging.stage(upload.chunks())
+
+    def sweep_staged_uploads(self, now: float = None) -> int:
+        """Removes staged uploads older than INGEST_STAGING_TTL, whose tasks never ran or died."""
+        removed = self.staging.sweep(INGEST_STAGING_TTL, now)
+        if removed:
+            logger.info(f"Removed {removed} stale staged uploads.")
+        return removed
+
+    def claim_ingest_task(self, session_id: str, task_id: str) -> Optional[str]:
+        """Makes task_id the session's current ingestion task; returns the task it replaces, if any."""
+        pipe = self.cache_service.client.pipeline()
+        pipe.get(f"ingest_task:{session_id}")
+        pipe.set(f"ingest_task:{session_id}", task_id, ex=INGEST_TASK_TTL)
+        previous, _ = pipe.execute()
+        previous = previous.decode() if previous else None
+        return previous if previous != task_id else None
+
+    def ensure_current_ingest(self, session_id: str, task_id: Optional[str]):
+        """Raises IngestSuperseded if a newer ingestion task has been claimed for the session."""
+        if task_id is None:
+            return
+        current = self.cache_service.client.get(f"ingest_task:{session_id}")
+        if current is not None and current.decode() != task_id:
+            raise IngestSuperseded(f"Ingestion task {task_id} for session {session_id} was superseded by {current.decode()}.")
+
+    @timed("ingestion")
+    def prepare_file(self, session_id: str, file: Dict[str, Any], ingest_task_id: Optional[str] = None) -> Dict[str, Any]:
         """
+        Extracts, chunks and embeds a single file and stages the result in Redis.
+        Failures are reported in the returned dict instead of raised, so one bad
+        file does not prevent the rest of the upload from being committed.
+        With ingest_task_id, the work stops between embedding batches once a newer
+        upload has claimed the session, and the file is reported as 'superseded'.
+        """
+        from backend.components.document_processor import embed_file, pack_embedded_chunks
+
+        filename = file["filename"]
+        content_path = file.get("content_path")
+        check_cancelled = lambda: self.ensure_current_ingest(session_id, ingest_task_id)
         try:
-            try:
-                self.chroma_client.client.get_collection(name=session_id)
-                self.chroma_client.client.delete_collection(name=session_id)
-                logger.info(f"Existing ChromaDB collection for session {session_id} deleted.")
-            except Exception:
-                logger.info(f"No existing ChromaDB collection found for session {session_id}. Proceeding.")
+            check_cancelled()
+            if content_path:
+                content = self.staging.read(content_path)
+                if content is None:
+                    raise ValueError("The uploaded file expired before it was processed.")
+                file = {"filename": filename, "content": content}
+            documents, vectors = embed_file(file, self.embeddings, check_cancelled)
+            if not documents:
+                logger.warning(f"No text found in file {filename}. Skipping.")
+                return {"filename": filename, "status": "empty"}
 
-            all_documents = []
-            filenames = [file['filename'] for file in file_data]
-            
-            for file in file_data:
-                raw_text = get_pdf_text([file])
-                
-                if not raw_text:
-                    logger.warning(f"No text found in file {file['filename']}. Skipping.")
-                    continue
-
-                texts = create_text_chunks(raw_text)
-                documents = [Document(page_content=t, metadata={"filename": file["filename"]}) for t in texts]
-                all_documents.extend(documents)
-            
-            if not all_documents:
+            check_cancelled()
+            staging_key = f"ingest_staging:{session_id}:{uuid.uuid4()}"
+            self.cache_service.set_bytes(staging_key, pack_embedded_chunks(documents, vectors), ex=INGEST_STAGING_TTL)
+            return {"filename": filename, "status": "ok", "staging_key": staging_key, "chunks": len(documents)}
+        except IngestSuperseded as e:
+            logger.info(f"Stopped preparing {filename}: {e}")
+            INGEST_TASKS_SUPERSEDED.labels("prepare").inc()
+            return {"filename": filename, "status": "superseded"}
+        except Exception as e:
+            logger.error(f"Error preparing file {filename} for session {session_id}: {e}", exc_info=True)
+            return {"filename": filename, "status": "error", "error": str(e)}
+        finally:
+            if content_path:
+                self.staging.remove(content_path)
+
+    @timed("ingestion")
+    def commit_documents(
+        self,
+        session_id: str,
+        results: List[Dict[str, Any]],
+        drop_retired: Optional[Callable[[str, str], None]] = None,
+        ingest_task_id: Optional[str] = None,
+    ):
+        """
+        Builds a new versioned collection from the staged chunks of every prepared file,
+        then swaps the session's collection pointer to it. The previous collection keeps
+        serving queries until the swap and is then handed to drop_retired(session_id, name),
+        which drops it right away by default. Files that failed or had no text are left
+        out of the session's uploaded files and reported back in 'failed_files'.
+        With ingest_task_id, nothing is swapped in once a newer upload has claimed the
+        session: the ingestion is abandoned between batches and reported as 'superseded'.
+        """
+        import numpy as np
+        from backend.components.document_processor import unpack_embedded_chunks, store_embedded_chunks
+
+        staging_keys = [result["staging_key"] for result in results if result["status"] == "ok"]
+        collection_name = None
+        swapped = False
+        try:
+            ingested = [result for result in results if result["status"] == "ok"]
+            failed = [{k: v for k, v in result.items() if k != "staging_key"} for result in results if result["status"] != "ok"]
+            if any(result["status"] == "superseded" for result in results):
+                logger.info(f"Session {session_id}: a newer upload replaced this one while it was being prepared; discarding it.")
+                return {"status": "superseded", "session_id": session_id, "failed_files": failed}
+            check_cancelled = lambda: self.ensure_current_ingest(session_id, ingest_task_id)
+            check_cancelled()
+            if not ingested:
                 raise ValueError("No text found in the uploaded documents.")
 
-            vectorize_and_store(all_documents, self.embeddings, self.chroma_client.client, session_id)
-            
-            self.db_service.update_uploaded_files(session_id, filenames)
-            
+            all_documents = []
+            all_vectors = []
+            with stage_timer("ingestion", "load_staged"):
+                for result in ingested:
+                    data = self.cache_service.get_bytes(result["staging_key"])
+                    if data is None:
+                        raise ValueError(f"Staged chunks for {result['filename']} expired before they were committed.")
+                    documents, vectors = unpack_embedded_chunks(data)
+                    all_documents.extend(documents)
+                    all_vectors.append(vectors)
+
+            current_version, current_name = self.get_collection_pointer(session_id)
+            version = self._allocate_version(session_id, current_version)
+            collection_name = versioned_collection_name(session_id, version)
+            vectors = np.vstack(all_vectors)
+            ids = [str(uuid.uuid4()) for _ in all_documents]
+            with stage_timer("ingestion", "chroma_upsert"):
+                self._delete_collection(collection_name)
+                store_embedded_chunks(
+                    self.chroma_client.client, collection_name, all_documents, self._chroma_vectors(vectors), ids=ids, check_cancelled=check_cancelled
+                )
+            with stage_timer("ingestion", "quantized_index"):
+                self._store_quantized_index(collection_name, ids, all_documents, vectors)
+
+            # The last chance for a newer upload to win: after this, the stale collection would be served.
+            check_cancelled()
+
+            swapped, retired = self.db_service.swap_collection_pointer(session_id, version, collection_name)
+            if not swapped:
+                logger.warning(f"Session {session_id}: version {version} was superseded by a newer upload; discarding it.")
+                return {"status": "superseded", "session_id": session_id, "failed_files": failed}
+            if retired is None and current_version == 0:
+                # The session was still served by its original, unversioned collection.
+                retired = current_name
+            self._cache_pointer(session_id, version, collection_name)
+
+            self.db_service.update_uploaded_files(session_id, [result["filename"] for result in ingested])
+
             self.cache_service.set_flag(f"vector_store_ready:{session_id}")
-            
-            logger.info(f"Successfully processed {len(all_documents)} document chunks for session {session_id}.")
-            return {"status": "complete", "session_id": session_id}
-        
+            # New documents replace whatever an earlier eviction archived.
+            self.cache_service.delete_keys(f"session_evicted:{session_id}")
+            self.archive.remove(session_id, "chunks")
+            self.touch_session(session_id)
+            if retired:
+                (drop_retired or self.drop_collection)(session_id, retired)
+
+            if failed:
+                logger.warning(f"Session {session_id}: {len(failed)} file(s) were not ingested: {failed}")
+            logger.info(f"Successfully processed {len(all_documents)} document chunks for session {session_id} (collection version {version}).")
+            return {"status": "complete", "session_id": session_id, "collection_version": version, "failed_files": failed}
+
+        except IngestSuperseded as e:
+            logger.info(f"Stopped committing: {e}")
+            INGEST_TASKS_SUPERSEDED.labels("commit").inc()
+            return {"status": "superseded", "session_id": session_id, "failed_files": failed}
         except Exception as e:
             logger.error(f"Error processing documents for session {session_id}: {e}", exc_info=True)
             raise
-    
+        finally:
+            self.cache_service.delete_keys(*staging_keys)
+            if collection_name and not swapped:
+                self.drop_collection(session_id, collection_name)
+
+    def _delete_collection(self, collection_name: str):
+        """Deletes a ChromaDB collection and its quantized index, if they exist."""
+        self.cache_service.delete_keys(f"quantized_index:{collection_name}")
+        _quantized_index_cache.pop(collection_name)
+        try:
+            self.chroma_client.client.get_collection(name=collection_name)
+            self.chroma_client.client.delete_collection(name=collection_name)
+            logger.info(f"ChromaDB collection {collection_name} deleted.")
+        except Exception:
+            logger.info(f"No ChromaDB collection {collection_name} found. Proceeding.")
+
+    @staticmethod
+    def _chroma_vectors(vectors):
+        """The vectors to store in Chroma: the real ones, or placeholders when the quantized index keeps them."""
+        if VECTOR_QUANTIZATION == "none":
+            return vectors
+        from backend.components.vector_quantization import placeholder_embeddings
+
+        return placeholder_embeddings(len(vectors))
+
+    def _store_quantized_index(self, collection_name: str, ids: List[str], documents, vectors):
+        """Persists the collection's vectors as a quantized index when quantization is enabled."""
+        if VECTOR_QUANTIZATION == "none":
+            return None
+        from backend.components.vector_quantization import QuantizedIndex
+
+        index = QuantizedIndex.from_embeddings(ids, vectors, [doc.metadata for doc in documents], VECTOR_QUANTIZATION)
+        self.cache_service.set_bytes(f"quantized_index:{collection_name}", index.to_bytes())
+        _quantized_index_cache.put(collection_name, index)
+        logger.info(f"Stored {VECTOR_QUANTIZATION} index for collection {collection_name} ({index.nbytes} bytes of vectors).")
+        return index
+
+    def _load_quantized_index(self, collection_name: str):
+        """
+        The collection's quantized index, fetched from Redis and decoded once per process.
+        An index lost from Redis is rebuilt from the collection.
+        """
+        index = _quantized_index_cache.get(collection_name)
+        if index is None:
+            from backend.components.vector_quantization import QuantizedIndex
+
+            index_bytes = self.cache_service.get_bytes(f"quantized_index:{collection_name}")
+            if index_bytes:
+                index = QuantizedIndex.from_bytes(index_bytes)
+                _quantized_index_cache.put(collection_name, index)
+            else:
+                index = self._rebuild_quantized_index(collection_name)
+        return index
+
+    def _rebuild_quantized_index(self, collection_name: str):
+        """
+        Quantizes the vectors of a collection that has no index: those stored in Chroma for a
+        collection ingested without quantization, or else re-embedded from the chunk texts.
+        """
+        import numpy as np
+        from langchain_core.documents import Document
+
+        try:
+            collection = self.chroma_client.client.get_collection(name=collection_name)
+        except Exception:
+            return None
+        stored = collection.get(include=["embeddings", "documents", "metadatas"])
+        if not stored["ids"]:
+            return None
+        vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+        if vectors.shape[1] == 1:
+            logger.warning(f"The quantized index of collection {collection_name} was lost; re-embedding its chunks.")
+            vectors = np.asarray(self.embeddings.embed_documents(stored["documents"]), dtype=np.float32)
+        documents = [Document(page_content=text, metadata=metadata or {}) for text, metadata in zip(stored["documents"], stored["metadatas"])]
+        return self._store_quantized_index(collection_name, stored["ids"], documents, vectors)
+
+    # --- Collection version pointer ---
+
+    def get_collection_pointer(self, session_id: str) -> Tuple[int, str]:
+        """
+        Returns the (version, collection name) serving the session, from Redis or else Postgres.
+        Sessions ingested before versioning are served by version 0, named after the session.
+        """
+        cached = self.cache_service.get_json(f"collection_pointer:{session_id}")
+        if cached:
+            return cached["version"], cached["collection"]
+        version, collection_name = self.db_service.get_collection_pointer(session_id) or (0, session_id)
+        self._cache_pointer(session_id, version, collection_name)
+        return version, collection_name
+
+    def _cache_pointer(self, session_id: str, version: int, collection_name: str):
+        self.cache_service.set_json(
+            f"collection_pointer:{session_id}", {"version": version, "collection": collection_name}, ex=COLLECTION_POINTER_CACHE_TTL
+        )
+
+    def _allocate_version(self, session_id: str, current_version: int) -> int:
+        """A version number no other upload of this session has used, above the current one."""
+        version = self.cache_service.increment(f"collection_seq:{session_id}")
+        if version <= current_version:
+            # The sequence was lost (e.g. Redis was flushed); continue after the pointer.
+            version = current_version + 1
+            self.cache_service.client.set(f"collection_seq:{session_id}", version)
+        return version
+
+    def get_collection_version(self, session_id: str) -> int:
+        """
+        The version of the collection serving the session. It changes whenever the session
+        is re-ingested, so other caches use it as an invalidation key.
+        """
+        return self.get_collection_pointer(session_id)[0]
+
+    def drop_collection(self, session_id: str, collection_name: str):
+        """Drops a retired collection, unless the session's pointer (re-read from Postgres) still uses it."""
+        pointer = self.db_service.get_collection_pointer(session_id)
+        if pointer is not None:
+            # Also repairs the cached pointer, should the swap's cache update have been lost.
+            self._cache_pointer(session_id, *pointer)
+            if pointer[1] == collection_name:
+                logger.warning(f"Not dropping collection {collection_name}: it is serving session {session_id}.")
+                return
+        self._delete_collection(collection_name)
+
     def get_filenames(self, session_id: str) -> List[str]:
         """Retrieves filenames associated with a chat session."""
         chat_session = self.db_service.get_session(session_id)
         return chat_session.uploaded_files if chat_session else []
 
-    def get_vector_store(self, session_id: str) -> Optional[Chroma]:
-        """Returns the Chroma vector store instance for a session."""
+    def get_vector_store(self, session_id: str) -> Optional["Chroma"]:
+        """
+        Returns the Chroma vector store instance for a session, on the collection its pointer names.
+        A session whose vectors were evicted while idle is re-hydrated first, which blocks.
+        """
         if not self.cache_service.get_flag(f"vector_store_ready:{session_id}"):
-            return None
+            if not self.rehydrate_session(session_id):
+                return None
+        self.touch_session(session_id)
+        _, collection_name = self.get_collection_pointer(session_id)
+        from langchain_chroma import Chroma
+
+        if VECTOR_QUANTIZATION != "none":
+            from backend.components.vector_quantization import QuantizedChroma
+
+            quantized_index = self._load_quantized_index(collection_name)
+            if quantized_index is not None:
+                return QuantizedChroma(
+                    client=self.chroma_client.client,
+                    embedding_function=self.embeddings,
+                    collection_name=collection_name,
+                    quantized_index=quantized_index,
+                )
+            logger.warning(f"No quantized index for collection {collection_name}. Falling back to Chroma's search.")
         return Chroma(
             client=self.chroma_client.client,
             embedding_function=self.embeddings,
-            collection_name=session_id
+            collection_name=collection_name
         )
         
     def delete_vector_store(self, session_id: str):
@@ -89,12 +417,199 @@ class DocumentService:
         Deletes the ChromaDB collection associated with the session ID.
         """
         try:
-            self.chroma_client.client.delete_collection(name=session_id)
+            self.cache_service.remove_member(LAST_ACCESS_KEY, session_id)
+            self.cache_service.delete_keys(f"session_evicted:{session_id}")
+            self.archive.delete(session_id)
+            _, collection_name = self.get_collection_pointer(session_id)
+            # The version sequence is kept, so versions are never reused for this session id.
+            self.cache_service.delete_keys(f"collection_pointer:{session_id}")
+            self._delete_collection(collection_name)
             logger.info(f"Successfully deleted ChromaDB collection for session: {session_id}")
         except Exception as e:
             logger.error(f"Failed to delete ChromaDB collection for session {session_id}: {e}")
             pass
 
+    # --- Idle-session eviction ---
+
+    def touch_session(self, session_id: str):
+        """Records that the session was just used, which postpones its eviction."""
+        try:
+            self.cache_service.touch(LAST_ACCESS_KEY, session_id)
+        except Exception as e:
+            logger.warning(f"Could not record access to session {session_id}: {e}")
+
+    def collect_idle_sessions(self, now: float = None) -> Dict[str, Any]:
+        """
+        One garbage-collection pass: evicts up to SESSION_GC_BATCH_SIZE sessions that have not
+        been used for SESSION_IDLE_TTL_SECONDS. Collections without a recorded access (created
+        before tracking, or after Redis lost it) are first registered as used now.
+        """
+        if SESSION_IDLE_TTL_SECONDS <= 0:
+            return {"seeded": 0, "evicted": [], "skipped": []}
+        now = now or time.time()
+        seeded = self._seed_last_access(now)
+        evicted, skipped = [], []
+        for session_id in self.cache_service.members_before(LAST_ACCESS_KEY, now - SESSION_IDLE_TTL_SECONDS, SESSION_GC_BATCH_SIZE):
+            try:
+                outcome = self.evict_session(session_id, idle_before=now - SESSION_IDLE_TTL_SECONDS)
+            except Exception as e:
+                logger.error(f"Could not evict session {session_id}: {e}", exc_info=True)
+                outcome = "error"
+            (evicted if outcome == "evicted" else skipped).append(session_id)
+        logger.info(f"Session GC: {len(evicted)} evicted, {len(skipped)} skipped, {seeded} newly tracked.")
+        return {"seeded": seeded, "evicted": evicted, "skipped": skipped}
+
+    def _seed_last_access(self, now: float) -> int:
+        """Registers one page of Chroma collections per pass, resuming where the last pass stopped."""
+        offset = self.cache_service.get_int(SEED_OFFSET_KEY)
+        page_size = SESSION_GC_BATCH_SIZE * 10
+        collections = self.chroma_client.client.list_collections(limit=page_size, offset=offset)
+        seeded = 0
+        for collection in collections:
+            session_id = session_id_of(collection.name)
+            try:
+                uuid.UUID(session_id)
+            except ValueError:
+                continue
+            if self.cache_service.get_score(LAST_ACCESS_KEY, session_id) is None:
+                self.cache_service.touch(LAST_ACCESS_KEY, session_id, at=now, only_new=True)
+                seeded += 1
+        next_offset = offset + len(collections) if len(collections) == page_size else 0
+        self.cache_service.client.set(SEED_OFFSET_KEY, next_offset)
+        return seeded
+
+    @timed("session_gc")
+    def evict_session(self, session_id: str, idle_before: float) -> str:
+        """
+        Archives an idle session's chunks (and, with SESSION_GC_ARCHIVE_HISTORY, its chat
+        history) and drops its vectors. Returns "evicted" or why the session was skipped.
+        """
+        lock_key = f"session_gc:lock:{session_id}"
+        token = self.cache_service.acquire_lock(lock_key, SESSION_LOCK_SECONDS)
+        if token is None:
+            SESSION_LIFECYCLE_EVENTS.labels("skipped").inc()
+            return "busy"
+        try:
+            last_access = self.cache_service.get_score(LAST_ACCESS_KEY, session_id)
+            if last_access is not None and last_access >= idle_before:
+                SESSION_LIFECYCLE_EVENTS.labels("skipped").inc()
+                return "recently_used"
+            _, collection_name = self.get_collection_pointer(session_id)
+            try:
+                collection = self.chroma_client.client.get_collection(name=collection_name)
+            except Exception:
+                # Nothing to evict (never ingested, deleted, or already evicted).
+                self.cache_service.remove_member(LAST_ACCESS_KEY, session_id)
+                return "no_collection"
+
+            with stage_timer("session_gc", "archive_chunks"):
+                chunks = {"ids": [], "documents": [], "metadatas": []}
+                offset = 0
+                while True:
+                    page = collection.get(include=["documents", "metadatas"], limit=ARCHIVE_PAGE_SIZE, offset=offset)
+                    for field in chunks:
+                        chunks[field].extend(page[field])
+                    if len(page["ids"]) < ARCHIVE_PAGE_SIZE:
+                        break
+                    offset += ARCHIVE_PAGE_SIZE
+                self.archive.write(session_id, "chunks", chunks)
+            if SESSION_GC_ARCHIVE_HISTORY:
+                with stage_timer("session_gc", "archive_history"):
+                    history = self.db_service.export_chat_history(session_id)
+                    if history:
+                        self.archive.write(session_id, "history", history)
+                        self.db_service.delete_chat_history(session_id, SESSION_GC_DELETE_BATCH)
+
+            # Flag the session as evicted before it stops being ready, so readers re-hydrate it.
+            self.cache_service.set_flag(f"session_evicted:{session_id}")
+            self.cache_service.delete_keys(f"vector_store_ready:{session_id}")
+            self._delete_collection(collection_name)
+            self.cache_service.remove_member(LAST_ACCESS_KEY, session_id)
+            SESSION_LIFECYCLE_EVENTS.labels("evicted").inc()
+            logger.info(f"Evicted idle session {session_id} ({len(chunks['ids'])} chunks archived).")
+            return "evicted"
+        finally:
+            self.cache_service.release_lock(lock_key, token)
+
+    def rehydrate_session(self, session_id: str) -> bool:
+        """
+        Rebuilds an evicted session's collection by re-embedding its archived chunks, and
+        restores its archived chat history. Concurrent callers wait for the one doing the
+        work. Returns False when the session was not evicted or could not be re-hydrated.
+        """
+        deadline = time.monotonic() + SESSION_REHYDRATE_WAIT_SECONDS
+        lock_key = f"session_gc:lock:{session_id}"
+        while True:
+            if self.cache_service.get_flag(f"vector_store_ready:{session_id}"):
+                return True
+            if not self.cache_service.get_flag(f"session_evicted:{session_id}"):
+                return False
+            token = self.cache_service.acquire_lock(lock_key, SESSION_LOCK_SECONDS)
+            if token is not None:
+                try:
+                    return self._rehydrate_locked(session_id)
+                finally:
+                    self.cache_service.release_lock(lock_key, token)
+            if time.monotonic() >= deadline:
+                logger.warning(f"Timed out waiting for session {session_id} to be re-hydrated.")
+                return False
+            time.sleep(0.1)
+
+    @timed("session_gc")
+    def _rehydrate_locked(self, session_id: str) -> bool:
+        import numpy as np
+        from langchain_core.documents import Document
+        from backend.components.document_processor import store_embedded_chunks
+
+        if not self.cache_service.get_flag(f"session_evicted:{session_id}"):
+            return self.cache_service.get_flag(f"vector_store_ready:{session_id}")
+        chunks = self.archive.read(session_id, "chunks")
+        if not chunks or not chunks["ids"]:
+            logger.error(f"Session {session_id} was evicted but its archive is missing.")
+            return False
+
+        self._restore_history_locked(session_id)
+        with stage_timer("session_gc", "reembed"):
+            vectors = np.asarray(self.embeddings.embed_documents(chunks["documents"]), dtype=np.float32)
+        documents = [Document(page_content=text, metadata=metadata or {}) for text, metadata in zip(chunks["documents"], chunks["metadatas"])]
+        # Rebuilt under the same collection name and chunk ids, so the pointer and
+        # cached retrieval results stay valid.
+        _, collection_name = self.get_collection_pointer(session_id)
+        self._delete_collection(collection_name)
+        store_embedded_chunks(self.chroma_client.client, collection_name, documents, self._chroma_vectors(vectors), ids=chunks["ids"])
+        self._store_quantized_index(collection_name, chunks["ids"], documents, vectors)
+
+        self.cache_service.set_flag(f"vector_store_ready:{session_id}")
+        self.cache_service.delete_keys(f"session_evicted:{session_id}")
+        self.archive.remove(session_id, "chunks")
+        self.touch_session(session_id)
+        SESSION_LIFECYCLE_EVENTS.labels("rehydrated").inc()
+        logger.info(f"Re-hydrated session {session_id} ({len(documents)} chunks re-embedded).")
+        return True
+
+    def restore_history(self, session_id: str):
+        """Moves a session's archived chat history back into Postgres, if it was archived."""
+        if not self.cache_service.get_flag(f"session_evicted:{session_id}"):
+            return
+        deadline = time.monotonic() + SESSION_REHYDRATE_WAIT_SECONDS
+        lock_key = f"session_gc:lock:{session_id}"
+        while (token := self.cache_service.acquire_lock(lock_key, SESSION_LOCK_SECONDS)) is None:
+            if time.monotonic() >= deadline:
+                return
+            time.sleep(0.1)
+        try:
+            self._restore_history_locked(session_id)
+        finally:
+            self.cache_service.release_lock(lock_key, token)
+
+    def _restore_history_locked(self, session_id: str):
+        history = self.archive.read(session_id, "history")
+        if history is None:
+            return
+        self.db_service.add_messages(session_id, history)
+        self.archive.remove(session_id, "history")
+        SESSION_LIFECYCLE_EVENTS.labels("history_restored").inc()
+
 
 # --- Dependency Injection for FastAPI ---
 def get_document_service(
@@ -114,7 +629,7 @@ def get_document_service(
 def get_vector_store_dependency(
     session_id: str,
     doc_service: DocumentService = Depends(get_document_service),
-) -> Chroma:
+) -> "Chroma":
     """
     This is the new dependency that directly retrieves the vector store.
     It takes 'session_id' as a parameter, which is provided by the endpoint.
@@ -1,38 +1,152 @@
 import redis
 import os
-import json
+import time
+import uuid
+from backend.utils import json_codec
 from backend.utils.env_loader import load_env
+from backend.utils.metrics import timed
 
 load_env()
 
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
 class RedisCacheService:
     def __init__(self, host: str, port: int, db: int):
         self.client = redis.StrictRedis(host=host, port=port, db=db)
 
+    @timed("redis")
     def set_json(self, key: str, data: dict, ex: int = None):
         """Sets a key with a JSON-serializable dictionary."""
         try:
-            self.client.set(key, json.dumps(data), ex=ex)
+            self.client.set(key, json_codec.dumps(data), ex=ex)
         except Exception as e:
             print(f"Error setting Redis key {key}: {e}")
 
+    @timed("redis")
     def get_json(self, key: str) -> dict | None:
         """Gets and deserializes a JSON dictionary from a key."""
         try:
             data = self.client.get(key)
-            return json.loads(data) if data else None
+            return json_codec.loads(data) if data else None
         except Exception as e:
             print(f"Error getting Redis key {key}: {e}")
             return None
 
+    @timed("redis")
+    def set_bytes(self, key: str, data: bytes, ex: int = None):
+        """Sets a key with a raw binary payload."""
+        self.client.set(key, data, ex=ex)
+
+    @timed("redis")
+    def get_bytes(self, key: str) -> bytes | None:
+        """Gets a raw binary payload from a key."""
+        return self.client.get(key)
+
+    @timed("redis")
+    def push_recent(self, key: str, value: str, limit: int):
+        """Prepends a value to a capped list of recent entries."""
+        pipeline = self.client.pipeline()
+        pipeline.lpush(key, value)
+        pipeline.ltrim(key, 0, limit - 1)
+        pipeline.execute()
+
+    @timed("redis")
+    def get_recent(self, key: str) -> list:
+        """Returns the entries of a capped list, newest first."""
+        return [value.decode() for value in self.client.lrange(key, 0, -1)]
+
+    @timed("redis")
+    def increment(self, key: str) -> int:
+        """Atomically increments an integer counter and returns its new value."""
+        return self.client.incr(key)
+
+    @timed("redis")
+    def get_int(self, key: str, default: int = 0) -> int:
+        """Gets an integer counter, or the default when it is not set."""
+        value = self.client.get(key)
+        return int(value) if value is not None else default
+
+    @timed("redis")
+    def bump_revision(self, key: str, ex: int = None) -> int:
+        """
+        Increments a revision counter and returns it. A missing counter starts at the current
+        time in milliseconds, so revisions keep increasing after the key expires or is lost.
+        """
+        pipeline = self.client.pipeline()
+        pipeline.set(key, int(time.time() * 1000), nx=True)
+        pipeline.incr(key)
+        if ex:
+            pipeline.expire(key, ex)
+        return pipeline.execute()[1]
+
+    @timed("redis")
+    def get_revision(self, key: str, ex: int = None) -> int:
+        """Returns a revision counter, starting a missing one the way bump_revision does."""
+        pipeline = self.client.pipeline()
+        pipeline.set(key, int(time.time() * 1000), nx=True)
+        pipeline.get(key)
+        if ex:
+            pipeline.expire(key, ex)
+        return int(pipeline.execute()[1])
+
+    @timed("redis")
+    def track_lru(self, index_key: str, key: str, max_entries: int):
+        """
+        Marks key as recently used in a sorted-set index and deletes the least
+        recently used keys once the index holds more than max_entries.
+        """
+        pipeline = self.client.pipeline()
+        pipeline.zadd(index_key, {key: time.time()})
+        pipeline.zcard(index_key)
+        _, size = pipeline.execute()
+        if size > max_entries:
+            evicted = [member for member, _ in self.client.zpopmin(index_key, size - max_entries)]
+            if evicted:
+                self.client.delete(*evicted)
+
+    @timed("redis")
+    def touch(self, index_key: str, member: str, at: float = None, only_new: bool = False):
+        """Records member in a sorted-set index with a timestamp score (now by default)."""
+        self.client.zadd(index_key, {member: at or time.time()}, nx=only_new)
+
+    @timed("redis")
+    def members_before(self, index_key: str, before: float, limit: int) -> list:
+        """Returns up to limit members whose timestamp is older than before, oldest first."""
+        return [member.decode() for member in self.client.zrangebyscore(index_key, "-inf", f"({before}", start=0, num=limit)]
+
+    @timed("redis")
+    def get_score(self, index_key: str, member: str) -> float | None:
+        return self.client.zscore(index_key, member)
+
+    @timed("redis")
+    def remove_member(self, index_key: str, member: str):
+        self.client.zrem(index_key, member)
+
+    @timed("redis")
+    def acquire_lock(self, key: str, seconds: float) -> str | None:
+        """Takes a lock that expires after seconds; returns its token, or None if it is held."""
+        token = uuid.uuid4().hex
+        return token if self.client.set(key, token, nx=True, px=int(seconds * 1000)) else None
+
+    @timed("redis")
+    def release_lock(self, key: str, token: str):
+        """Releases a lock taken with acquire_lock, unless it expired and was taken by someone else."""
+        self.client.register_script(_RELEASE_LOCK_SCRIPT)(keys=[key], args=[token])
+
+    @timed("redis")
     def set_flag(self, key: str, value: bool = True, ex: int = None):
         """Sets a simple flag (e.g., for readiness status)."""
         self.client.set(key, "true" if value else "false", ex=ex)
 
+    @timed("redis")
     def get_flag(self, key: str) -> bool:
         """Checks if a flag exists and is set to true."""
         return self.client.get(key) == b"true"
 
+    @timed("redis")
     def delete_keys(self, *keys: str):
         """Deletes one or more keys from the cache."""
         if keys:
@@ -1,13 +1,18 @@
 from asyncio.log import logger
+import gc
 import os
-from celery import Celery
+import time
+from celery import Celery, chord
+from celery.signals import worker_init, before_task_publish, task_prerun
 from backend.services.document_service import DocumentService
 from backend.services.database_service import DatabaseService
 from backend.services.redis_cache_service import RedisCacheService
 from backend.chroma_client_singleton import ChromaClientSingleton
-from backend.utils.model_loader import get_embeddings_model
+from backend.utils.model_loader import get_embeddings_model, preload_embeddings_model
 from backend.database import SessionLocal
 from backend.utils.env_loader import load_env
+from backend.utils.metrics import CELERY_QUEUE_WAIT_SECONDS, metrics_registry
+from backend.utils.profiling import profiled
 import logging
 
 load_env()
@@ -19,24 +24,126 @@ logger = logging.getLogger(__name__)
 redis_url = os.getenv("REDIS_URL", "redis://redis:6379/0")
 celery_app = Celery("tasks", broker=redis_url, backend=redis_url)
 
+# Uploads are routed by total size, so small jobs never wait behind large ones. Run separate
+# workers for each queue (`-Q ingest_small,celery` and `-Q ingest_large`, see docker-compose.yml).
+INGEST_SMALL_QUEUE = os.getenv("INGEST_SMALL_QUEUE", "ingest_small")
+INGEST_LARGE_QUEUE = os.getenv("INGEST_LARGE_QUEUE", "ingest_large")
+INGEST_LARGE_JOB_BYTES = int(os.getenv("INGEST_LARGE_JOB_BYTES", str(20 * 1024 * 1024)))
+
+# A collection replaced by re-ingestion is dropped this long after the swap.
+COLLECTION_DROP_DELAY_SECONDS = float(os.getenv("COLLECTION_DROP_DELAY_SECONDS", "60"))
+
+# Run `celery -A backend.tasks beat` next to the workers to schedule the idle-session GC.
+SESSION_GC_INTERVAL_SECONDS = float(os.getenv("SESSION_GC_INTERVAL_SECONDS", "3600"))
+celery_app.conf.beat_schedule = {
+    "evict-idle-sessions": {
+        "task": "backend.tasks.evict_idle_sessions_task",
+        "schedule": SESSION_GC_INTERVAL_SECONDS,
+        # A run that could not start before the next one is due is dropped rather than piled up.
+        "options": {"expires": SESSION_GC_INTERVAL_SECONDS},
+    },
+}
+
+@worker_init.connect
+def preload_worker_model(**kwargs):
+    """
+    Loads the embedding model in the worker's main process before the pool forks,
+    so every child starts warm and shares the weights copy-on-write.
+    """
+    preload_embeddings_model()
+    start_worker_metrics_server()
+    # Keep the cyclic GC from touching (and therefore copying) the preloaded objects in children.
+    gc.freeze()
+
+def start_worker_metrics_server():
+    """Serves the worker's metrics on CELERY_METRICS_PORT (disabled when unset)."""
+    port = os.getenv("CELERY_METRICS_PORT")
+    if port:
+        from prometheus_client import start_http_server
+        start_http_server(int(port), registry=metrics_registry())
+        logger.info(f"Worker metrics served on port {port}.")
+
+@before_task_publish.connect
+def stamp_enqueue_time(headers=None, **kwargs):
+    """Records the publish time in the message headers to measure queue wait."""
+    if headers is not None:
+        headers["enqueued_at"] = time.time()
+
+@task_prerun.connect
+def observe_queue_wait(task=None, **kwargs):
+    enqueued_at = getattr(task.request, "enqueued_at", None)
+    if enqueued_at:
+        queue = (task.request.delivery_info or {}).get("routing_key") or "unknown"
+        CELERY_QUEUE_WAIT_SECONDS.labels(task.name, queue).observe(max(0.0, time.time() - enqueued_at))
+
+def ingest_queue(file_data: list) -> str:
+    """The queue for an upload: the large-job queue once its files add up to INGEST_LARGE_JOB_BYTES."""
+    total_bytes = sum(file.get("size", 0) for file in file_data)
+    return INGEST_LARGE_QUEUE if total_bytes >= INGEST_LARGE_JOB_BYTES else INGEST_SMALL_QUEUE
+
+def build_document_service() -> DocumentService:
+    """Builds a DocumentService wired to the worker's own connections."""
+    cache_service = RedisCacheService(os.getenv("REDIS_HOST", "redis"), 6379, 0)
+    return DocumentService(
+        db_service=DatabaseService(session_factory=SessionLocal, cache_service=cache_service),
+        cache_service=cache_service,
+        chroma_client=ChromaClientSingleton(),
+        embeddings=get_embeddings_model()
+    )
+
 @celery_app.task(bind=True)
-def process_documents_task(self, session_id: str, file_data: list):
-    try:
-        db_service = DatabaseService(session_factory=SessionLocal)
-        cache_service = RedisCacheService(os.getenv("REDIS_HOST", "redis"), 6379, 0)
-        
-        doc_service = DocumentService(
-            db_service=db_service,
-            cache_service=cache_service,
-            chroma_client=ChromaClientSingleton(),
-            embeddings=get_embeddings_model()
-        )
-        
-        doc_service.process_documents(session_id, file_data)
-        
-        return {"status": "complete", "session_id": session_id}
+def process_documents_task(self, session_id: str, file_data: list, profile_mode: str = None, profile_id: str = None):
+    """
+    Fans ingestion out into one prepare_file_task per file and a commit_documents_task callback.
+    The chord replaces this task and inherits its id, so callers keep polling the same task.
+    Subtasks go to the same queue as the upload and carry its id, so they stop once a newer
+    upload for the session has claimed it (see DocumentService.claim_ingest_task).
+    When the upload was profiled, each subtask stores its own profile under `{profile_id}-...`.
+    """
+    if not file_data:
+        raise ValueError("No files to process.")
+    queue = ingest_queue(file_data)
+    header = [
+        prepare_file_task.s(
+            session_id, file, ingest_task_id=self.request.id, profile_mode=profile_mode, profile_id=profile_id and f"{profile_id}-prepare-{i}"
+        ).set(queue=queue)
+        for i, file in enumerate(file_data)
+    ]
+    callback = commit_documents_task.s(
+        session_id, ingest_task_id=self.request.id, profile_mode=profile_mode, profile_id=profile_id and f"{profile_id}-commit"
+    ).set(queue=queue)
+    return self.replace(chord(header, callback))
 
+@celery_app.task
+def prepare_file_task(session_id: str, file: dict, ingest_task_id: str = None, profile_mode: str = None, profile_id: str = None):
+    """Extracts, chunks and embeds one file; failures are returned, not raised."""
+    service = build_document_service()
+    with profiled(service.cache_service, profile_mode, f"prepare_file_task {file.get('filename')}", profile_id):
+        return service.prepare_file(session_id, file, ingest_task_id=ingest_task_id)
+
+@celery_app.task(bind=True)
+def commit_documents_task(self, results: list, session_id: str, ingest_task_id: str = None, profile_mode: str = None, profile_id: str = None):
+    """Writes every successfully prepared file to the session's collection and flags it ready."""
+    try:
+        service = build_document_service()
+        with profiled(service.cache_service, profile_mode, "commit_documents_task", profile_id):
+            return service.commit_documents(session_id, results, drop_retired=schedule_collection_drop, ingest_task_id=ingest_task_id)
     except Exception as e:
         self.update_state(state="FAILURE", meta={"exc_type": type(e).__name__, "exc_message": str(e)})
         logger.error(f"Celery task failed for session {session_id}: {e}")
-        raise
\ No newline at end of file
+        raise
+
+def schedule_collection_drop(session_id: str, collection_name: str):
+    """Drops a retired collection once queries that already opened it have had time to finish."""
+    drop_collection_task.apply_async(args=(session_id, collection_name), countdown=COLLECTION_DROP_DELAY_SECONDS)
+
+@celery_app.task
+def drop_collection_task(session_id: str, collection_name: str):
+    build_document_service().drop_collection(session_id, collection_name)
+
+@celery_app.task
+def evict_idle_sessions_task():
+    """Evicts one bounded batch of idle sessions and removes stale staged uploads; scheduled by Celery beat."""
+    service = build_document_service()
+    service.sweep_staged_uploads()
+    return service.collect_idle_sessions()
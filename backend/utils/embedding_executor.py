@@ -0,0 +1,130 @@
+# backend/utils/embedding_executor.py
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from backend.utils.metrics import EMBEDDING_BATCH_SIZE, stage_timer
+
+logger = logging.getLogger(__name__)
+
+# "direct" embeds every query on its own, "batched" micro-batches concurrent queries in this
+# process, "remote" sends them to the shared embedding server (backend/embedding_server.py).
+EMBEDDING_EXECUTOR = os.getenv("EMBEDDING_EXECUTOR", "batched")
+# How long the first query of a batch waits for others to join it, and the largest batch.
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "3"))
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "64"))
+EMBEDDING_SERVICE_URL = os.getenv("EMBEDDING_SERVICE_URL", "http://localhost:8002")
+EMBEDDING_SERVICE_TIMEOUT = float(os.getenv("EMBEDDING_SERVICE_TIMEOUT", "60"))
+# embed_documents calls are sent to the embedding server in requests of at most this many texts.
+REMOTE_DOCUMENTS_PER_REQUEST = 256
+
+EMBEDDING_EXECUTORS = ("direct", "batched", "remote")
+
+if EMBEDDING_EXECUTOR not in EMBEDDING_EXECUTORS:
+    raise ValueError(f"EMBEDDING_EXECUTOR must be one of {EMBEDDING_EXECUTORS}, got {EMBEDDING_EXECUTOR!r}")
+
+class MicroBatchingEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that merges concurrent embed_query calls into one batched forward pass.
+    Callers block on a future while a single background thread collects queries for up to
+    window_seconds (or max_batch_size queries) and embeds them with embed_documents.
+    The window is only waited for while traffic is concurrent, i.e. when the previous batch
+    held more than one query, so a lone query on an idle process is embedded right away.
+    embed_documents is passed through: ingestion already embeds whole files in batches.
+    """
+
+    def __init__(self, embeddings: Embeddings, window_seconds: float = None, max_batch_size: int = None):
+        self.embeddings = embeddings
+        self.window_seconds = EMBEDDING_BATCH_WINDOW_MS / 1000 if window_seconds is None else window_seconds
+        self.max_batch_size = max_batch_size or EMBEDDING_MAX_BATCH_SIZE
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_pid = None
+        self._last_batch_size = 0
+
+    @property
+    def model_name(self) -> str:
+        # Keeps the query-embedding cache keys identical to those of the wrapped model.
+        return getattr(self.embeddings, "model_name", None) or type(self.embeddings).__name__
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((text, future))
+        return future.result()
+
+    def _ensure_worker(self):
+        # The model may be preloaded before gunicorn/Celery fork; threads do not survive the
+        # fork, so each process starts its own batching thread on first use.
+        if self._worker is not None and self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is None or self._worker_pid != os.getpid():
+                self._queue = queue.Queue()
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker_pid = os.getpid()
+                self._worker.start()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + (self.window_seconds if self._last_batch_size > 1 else 0)
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self._last_batch_size = len(batch)
+            EMBEDDING_BATCH_SIZE.observe(len(batch))
+            # Identical queries in one batch (e.g. retries, coalesced callers) are embedded once.
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                with stage_timer("embeddings", "query_batch"):
+                    vectors = dict(zip(texts, self.embeddings.embed_documents(texts)))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for text, future in batch:
+                future.set_result(vectors[text])
+
+class RemoteEmbeddings(Embeddings):
+    """Client of the shared embedding server, which holds the only copy of the model."""
+
+    def __init__(self, url: str = None, model_name: str = None, timeout: float = None):
+        import requests
+
+        self.url = (url or EMBEDDING_SERVICE_URL).rstrip("/")
+        self.model_name = model_name
+        self.timeout = timeout or EMBEDDING_SERVICE_TIMEOUT
+        self._session = requests.Session()
+
+    def _embed(self, texts: List[str], kind: str) -> List[List[float]]:
+        response = self._session.post(f"{self.url}/embed", json={"texts": texts, "kind": kind}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["embeddings"]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), REMOTE_DOCUMENTS_PER_REQUEST):
+            vectors.extend(self._embed(texts[start:start + REMOTE_DOCUMENTS_PER_REQUEST], "documents"))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], "query")[0]
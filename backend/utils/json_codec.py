@@ -0,0 +1,22 @@
+# backend/utils/json_codec.py
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+# Numpy arrays (e.g. embeddings) are written as lists; non-string keys are stringified like json does.
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON. Several times faster than json.dumps on message lists and float vectors."""
+    return orjson.dumps(value, option=_OPTIONS)
+
+def loads(data: bytes | str) -> Any:
+    return orjson.loads(data)
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; the API's default response class."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,160 @@
+import functools
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import multiprocess
+
+logger = logging.getLogger(__name__)
+
+# Buckets from 1 ms to 5 min: covers Redis calls as well as long LLM calls and ingestion.
+_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    "doc_copilot_stage_seconds",
+    "Duration of an instrumented pipeline stage or service call.",
+    ["component", "stage"],
+    buckets=_BUCKETS,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "doc_copilot_http_request_seconds",
+    "Duration of HTTP requests by route template.",
+    ["method", "route", "status"],
+    buckets=_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "doc_copilot_llm_tokens_total",
+    "LLM tokens used, by chain step and token kind (input/output).",
+    ["chain", "kind"],
+)
+CELERY_QUEUE_WAIT_SECONDS = Histogram(
+    "doc_copilot_celery_queue_wait_seconds",
+    "Time a Celery task waited in the broker between publish and start, by task and queue.",
+    ["task", "queue"],
+    buckets=_BUCKETS,
+)
+INGEST_TASKS_SUPERSEDED = Counter(
+    "doc_copilot_ingest_tasks_superseded_total",
+    "Ingestion work abandoned because a newer upload replaced it, by the step that noticed (prepare/commit).",
+    ["stage"],
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "doc_copilot_admission_wait_seconds",
+    "Time an LLM-bound request waited for a concurrency slot.",
+    ["endpoint"],
+    buckets=_BUCKETS,
+)
+ADMISSION_REJECTIONS = Counter(
+    "doc_copilot_admission_rejections_total",
+    "LLM-bound requests rejected with 429, by reason.",
+    ["endpoint", "reason"],
+)
+COALESCED_REQUESTS = Counter(
+    "doc_copilot_coalesced_requests_total",
+    "Single-flight outcomes: leader (executed), follower (reused a result) or orphaned (leader vanished).",
+    ["endpoint", "role"],
+)
+ACTION_CACHE_REQUESTS = Counter(
+    "doc_copilot_action_cache_requests_total",
+    "Summarize/compare/classify result cache lookups, by action and result (hit/miss).",
+    ["action", "result"],
+)
+RETRIEVAL_CACHE_REQUESTS = Counter(
+    "doc_copilot_retrieval_cache_requests_total",
+    "Query-embedding and retrieval-result cache lookups, by cache and result (hit/miss).",
+    ["cache", "result"],
+)
+PDF_EXTRACTIONS = Counter(
+    "doc_copilot_pdf_extractions_total",
+    "PDF text extraction attempts, by backend and outcome (ok/empty/error/timeout).",
+    ["backend", "outcome"],
+)
+SESSION_LIFECYCLE_EVENTS = Counter(
+    "doc_copilot_session_lifecycle_total",
+    "Idle-session garbage collection events (evicted, rehydrated, history_restored, skipped).",
+    ["event"],
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "doc_copilot_embedding_batch_size",
+    "Number of queries embedded together by the micro-batching embedding executor.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+CONTEXT_COMPRESSION_TOKENS = Counter(
+    "doc_copilot_context_compression_tokens_total",
+    "Tokens of the retrieved context of compressed questions, before (retrieved) and after (kept) compression.",
+    ["kind"],
+)
+# Both gauges hold the global value read from Redis, so the latest sample from any process is right.
+LLM_IN_FLIGHT = Gauge(
+    "doc_copilot_llm_in_flight",
+    "LLM-bound requests currently holding a concurrency slot (all replicas).",
+    multiprocess_mode="mostrecent",
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "doc_copilot_llm_queue_depth",
+    "LLM-bound requests waiting for a concurrency slot (all replicas).",
+    multiprocess_mode="mostrecent",
+)
+
+@contextmanager
+def stage_timer(component: str, stage: str):
+    """Times a block as a span: observed in STAGE_SECONDS and logged at DEBUG."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(component, stage).observe(elapsed)
+        logger.debug(f"span {component}.{stage} took {elapsed * 1000:.1f} ms")
+
+def timed(component: str, stage: str = None):
+    """Decorator form of stage_timer; the stage defaults to the function name."""
+    def decorator(func):
+        name = stage or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(component, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_llm_usage(chain: str, message) -> None:
+    """Adds the token usage reported on an AIMessage to LLM_TOKENS."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage.get("input_tokens"):
+        LLM_TOKENS.labels(chain, "input").inc(usage["input_tokens"])
+    if usage.get("output_tokens"):
+        LLM_TOKENS.labels(chain, "output").inc(usage["output_tokens"])
+
+def instrument_llm(llm, chain: str):
+    """
+    Wraps a chat model so every call is timed as an 'llm' stage and its token usage is counted.
+    Returns a runnable that can be piped like the model itself.
+    """
+    from langchain_core.runnables import RunnableLambda
+
+    def invoke(prompt_value, config=None):
+        with stage_timer("llm", chain):
+            message = llm.invoke(prompt_value, config=config)
+        record_llm_usage(chain, message)
+        return message
+
+    return RunnableLambda(invoke, name=f"{chain}_llm")
+
+def metrics_registry():
+    """
+    Returns the registry to expose. With PROMETHEUS_MULTIPROC_DIR set (gunicorn or
+    Celery prefork), samples from every process are aggregated from that directory.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+def render_metrics():
+    """Returns (payload, content_type) for a /metrics response."""
+    return generate_latest(metrics_registry()), CONTENT_TYPE_LATEST
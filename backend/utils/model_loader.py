@@ -1,15 +1,85 @@
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+_model_status = {"loaded": False, "load_seconds": None, "warmup_seconds": None}
+_chat_model_factory = None
+_embeddings_executor = None
 
 class EmbeddingsSingleton:
     _instance = None
 
     def __new__(cls):
         if cls._instance is None:
+            from langchain_huggingface.embeddings import HuggingFaceEmbeddings
             cls._instance = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2",
+                model_name=EMBEDDING_MODEL_NAME,
                 encode_kwargs={'normalize_embeddings': False}
             )
         return cls._instance
 
 def get_embeddings_model():
-    return EmbeddingsSingleton()
\ No newline at end of file
+    """
+    Returns the embeddings used for ingestion and retrieval, behind the executor selected by
+    EMBEDDING_EXECUTOR: the local model, the local model with query micro-batching, or a
+    client of the shared embedding server (in which case no model is loaded in this process).
+    """
+    global _embeddings_executor
+    from backend.utils.embedding_executor import EMBEDDING_EXECUTOR, MicroBatchingEmbeddings, RemoteEmbeddings
+
+    if EMBEDDING_EXECUTOR == "direct":
+        return EmbeddingsSingleton()
+    if _embeddings_executor is None:
+        if EMBEDDING_EXECUTOR == "remote":
+            _embeddings_executor = RemoteEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+        else:
+            _embeddings_executor = MicroBatchingEmbeddings(EmbeddingsSingleton())
+    return _embeddings_executor
+
+def preload_embeddings_model():
+    """
+    Loads the embedding model and runs one warm-up inference.
+    Called before worker processes fork so children share the weights copy-on-write.
+    Calling it again once the model is loaded is a no-op. With EMBEDDING_EXECUTOR=remote
+    the warm-up request instead checks that the embedding server is answering.
+    """
+    if _model_status["loaded"]:
+        return get_embeddings_model()
+
+    # The Rust tokenizer thread pool does not survive a fork; keep it single-threaded in the parent.
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    start = time.perf_counter()
+    model = get_embeddings_model()
+    loaded = time.perf_counter()
+    # embed_documents runs the same forward pass without starting the micro-batching thread,
+    # which would not survive the fork anyway.
+    model.embed_documents(["warm-up"])
+    warmed = time.perf_counter()
+
+    _model_status.update(loaded=True, load_seconds=loaded - start, warmup_seconds=warmed - loaded)
+    logger.info(f"Embeddings model loaded in {loaded - start:.2f}s, warm-up inference took {warmed - loaded:.2f}s (pid {os.getpid()}).")
+    return model
+
+def get_chat_model(temperature: float = 0):
+    """Returns the chat model used by every chain (ChatOpenAI unless a factory was set)."""
+    if _chat_model_factory is not None:
+        return _chat_model_factory(temperature)
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(temperature=temperature)
+
+def set_chat_model_factory(factory):
+    """
+    Overrides the chat model, e.g. with a deterministic fake for offline benchmarks.
+    The factory is called with the temperature; pass None to restore ChatOpenAI.
+    """
+    global _chat_model_factory
+    _chat_model_factory = factory
+
+def get_embeddings_model_status() -> dict:
+    """Reports whether the embedding model has been loaded and warmed up in this process."""
+    return dict(_model_status)
@@ -0,0 +1,295 @@
+import asyncio
+import cProfile
+import functools
+import logging
+import marshal
+import os
+import pstats
+import secrets
+import sys
+import threading
+import time
+import uuid
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from starlette.concurrency import run_in_threadpool as starlette_run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# Profiling is only wired in when an admin token is configured.
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN")
+MAX_CONCURRENT_PROFILES = int(os.getenv("MAX_CONCURRENT_PROFILES", "1"))
+PROFILE_TTL_SECONDS = int(os.getenv("PROFILE_TTL_SECONDS", "86400"))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+PROFILE_MODES = ("sample", "cprofile")
+PROFILE_INDEX_KEY = "profiles:index"
+
+# Content type and file extension of the stored profile per mode.
+PROFILE_FORMATS = {
+    "sample": ("text/plain", "folded"),     # Folded stacks: flamegraph.pl, speedscope, inferno.
+    "cprofile": ("application/octet-stream", "prof"),  # pstats dump: snakeviz, flameprof, gprof2dot.
+}
+
+_profile_slots = threading.BoundedSemaphore(MAX_CONCURRENT_PROFILES)
+
+def profiling_enabled() -> bool:
+    return bool(PROFILING_ADMIN_TOKEN)
+
+def is_admin(token: Optional[str]) -> bool:
+    return profiling_enabled() and token is not None and secrets.compare_digest(token, PROFILING_ADMIN_TOKEN)
+
+def requested_profile_mode(headers, query_params) -> Optional[str]:
+    """
+    Returns the profile mode asked for by an admin, or None.
+    Requested via `X-Profile: sample|cprofile` or `?profile=sample|cprofile`, and
+    authenticated with the `X-Admin-Token` header only, so the token never ends up
+    in access logs or browser history.
+    """
+    mode = headers.get("x-profile") or query_params.get("profile")
+    if not mode:
+        return None
+    if not is_admin(headers.get("x-admin-token")):
+        return None
+    return mode if mode in PROFILE_MODES else "sample"
+
+# The profile of the request (or task) being handled, if any. Child tasks and threadpool
+# calls inherit it, which is how their work is attributed to the right profile.
+_active_profile: ContextVar[Optional["ProfileSession"]] = ContextVar("active_profile", default=None)
+
+class ProfileSession:
+    """
+    Collects one profile across the threads that work for it: the threadpool calls made
+    through capture_call, plus the event loop while it runs one of the request's tasks.
+    Work of other requests interleaving on the same threads is left out.
+    """
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.active = True
+        self.stats: Optional[pstats.Stats] = None
+        self._lock = threading.Lock()
+        self._threads = Counter()
+        self._thread_names = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._tasks = weakref.WeakSet()
+
+    def track_loop(self, loop: asyncio.AbstractEventLoop, task: Optional[asyncio.Task]):
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._thread_names[self._loop_thread_id] = threading.current_thread().name
+        if task is not None:
+            self.track_task(task)
+
+    def track_task(self, task: asyncio.Task):
+        with self._lock:
+            self._tasks.add(task)
+
+    def sampled_threads(self) -> List[int]:
+        """Threads currently working for this profile."""
+        with self._lock:
+            thread_ids = [thread_id for thread_id, depth in self._threads.items() if depth]
+            if self._loop is not None and asyncio.current_task(self._loop) in self._tasks:
+                thread_ids.append(self._loop_thread_id)
+        return thread_ids
+
+    def thread_name(self, thread_id: int) -> str:
+        return self._thread_names.get(thread_id, str(thread_id))
+
+    @contextmanager
+    def capture_thread(self):
+        """Includes the current thread in the profile for the duration of the block."""
+        thread_id = threading.get_ident()
+        with self._lock:
+            nested = self._threads[thread_id] > 0 or not self.active
+            self._threads[thread_id] += 1
+            self._thread_names[thread_id] = threading.current_thread().name
+        profiler = None
+        if self.mode == "cprofile" and not nested:
+            # cProfile only sees the thread that enables it, so each thread gets its own.
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows one cProfile per interpreter; another thread of this profile holds it.
+                profiler = None
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            with self._lock:
+                self._threads[thread_id] -= 1
+                if profiler is not None and self.active:
+                    if self.stats is None:
+                        self.stats = pstats.Stats(profiler)
+                    else:
+                        self.stats.add(profiler)
+
+    def stop(self) -> bytes:
+        with self._lock:
+            self.active = False
+            return marshal.dumps(self.stats.stats if self.stats is not None else {})
+
+class SamplingProfiler:
+    """Samples the stacks of a ProfileSession's threads at a fixed interval and aggregates folded stacks."""
+
+    def __init__(self, session: ProfileSession, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.session = session
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in self.session.sampled_threads():
+                frame = frames.get(thread_id)
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if names:
+                    # The thread is the root frame, so loop and threadpool time show up side by side.
+                    names.append(self.session.thread_name(thread_id))
+                    self.stacks[";".join(reversed(names))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> bytes:
+        self._stop.set()
+        self._thread.join()
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()).encode()
+
+class ProfileResult:
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.data: Optional[bytes] = None
+        self.seconds = 0.0
+
+@contextmanager
+def profile_block(mode: str):
+    """
+    Profiles the enclosed block. Yields a ProfileResult whose data is filled in on exit,
+    or None when the concurrent-profile cap is reached.
+    On a plain thread (a Celery task), the thread itself is profiled. Inside an event loop,
+    the profile covers the calling task, the tasks it starts and the threadpool calls they
+    make through run_in_threadpool or profiled_in_thread. cprofile mode only covers the
+    threadpool calls, since a deterministic profiler on the loop thread would also record
+    every other request the loop is serving.
+    """
+    if not _profile_slots.acquire(blocking=False):
+        logger.warning("Profile requested but MAX_CONCURRENT_PROFILES is reached; running unprofiled.")
+        yield None
+        return
+
+    result = ProfileResult(mode)
+    session = ProfileSession(mode)
+    context_token = _active_profile.set(session)
+    start = time.perf_counter()
+    try:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            session.track_loop(loop, asyncio.current_task())
+        sampler = SamplingProfiler(session) if mode == "sample" else None
+        if sampler is not None:
+            sampler.start()
+        try:
+            if loop is None:
+                with session.capture_thread():
+                    yield result
+            else:
+                yield result
+        finally:
+            data = session.stop()
+            result.data = sampler.stop() if sampler is not None else data
+    finally:
+        result.seconds = time.perf_counter() - start
+        _active_profile.reset(context_token)
+        _profile_slots.release()
+
+def capture_call(func: Callable, /, *args, **kwargs):
+    """Calls func, including it in the active profile when there is one."""
+    session = _active_profile.get()
+    if session is None:
+        return func(*args, **kwargs)
+    with session.capture_thread():
+        return func(*args, **kwargs)
+
+async def run_in_threadpool(func: Callable, *args, **kwargs):
+    """starlette's run_in_threadpool; the call is part of the request's profile."""
+    return await starlette_run_in_threadpool(capture_call, func, *args, **kwargs)
+
+def profiled_in_thread(endpoint: Callable) -> Callable:
+    """Decorates a sync endpoint, which FastAPI runs in the threadpool, so that it is profiled."""
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        return capture_call(endpoint, *args, **kwargs)
+    return wrapper
+
+def track_profiled_tasks(loop: asyncio.AbstractEventLoop):
+    """
+    Installs a task factory on the loop that adds tasks created while a profile is active
+    (such as the one running the endpoint behind the middleware) to that profile.
+    """
+    previous_factory = loop.get_task_factory()
+
+    def task_factory(loop, coro, **kwargs):
+        if previous_factory is not None:
+            task = previous_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        context = kwargs.get("context")
+        session = context.get(_active_profile) if context is not None else _active_profile.get()
+        if session is not None and session.active:
+            session.track_task(task)
+        return task
+
+    loop.set_task_factory(task_factory)
+
+def store_profile(cache_service, result: ProfileResult, label: str, profile_id: Optional[str] = None) -> str:
+    """Stores a captured profile and its metadata in Redis and returns its id."""
+    profile_id = profile_id or uuid.uuid4().hex
+    cache_service.set_bytes(f"profile:{profile_id}", result.data, ex=PROFILE_TTL_SECONDS)
+    cache_service.set_json(f"profile_meta:{profile_id}", {
+        "profile_id": profile_id,
+        "label": label,
+        "mode": result.mode,
+        "seconds": result.seconds,
+        "created_at": time.time(),
+        "pid": os.getpid(),
+    }, ex=PROFILE_TTL_SECONDS)
+    cache_service.push_recent(PROFILE_INDEX_KEY, profile_id, limit=200)
+    logger.info(f"Stored {result.mode} profile {profile_id} for {label} ({result.seconds:.2f}s).")
+    return profile_id
+
+@contextmanager
+def profiled(cache_service, mode: Optional[str], label: str, profile_id: Optional[str] = None):
+    """
+    Profiles the block when mode is set and stores the result; a no-op when mode is None.
+    Yields the ProfileResult, or None when nothing is being captured.
+    """
+    if not mode:
+        yield None
+        return
+    result = None
+    try:
+        with profile_block(mode) as result:
+            yield result
+    finally:
+        # Profiles of failing requests are often the interesting ones, so store them too.
+        if result is not None and result.data is not None:
+            try:
+                store_profile(cache_service, result, label, profile_id)
+            except Exception as e:
+                logger.error(f"Could not store profile for {label}: {e}")
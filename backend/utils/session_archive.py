@@ -0,0 +1,47 @@
+# backend/utils/session_archive.py
+
+import gzip
+import json
+import os
+import shutil
+import uuid
+from typing import Any, Optional
+
+# Cold storage for evicted sessions. It must be shared by the API and the workers
+# (a common volume or a mounted bucket), since a worker evicts and the API re-hydrates.
+SESSION_ARCHIVE_DIR = os.getenv("SESSION_ARCHIVE_DIR", "data/session_archive")
+
+class SessionArchive:
+    """Gzipped JSON documents per session in a directory tree: <root>/<session_id>/<name>.json.gz."""
+
+    def __init__(self, root: str = None):
+        self.root = root or SESSION_ARCHIVE_DIR
+
+    def _path(self, session_id: str, name: str) -> str:
+        # Session ids are UUIDs; parsing them keeps arbitrary strings out of the path.
+        return os.path.join(self.root, str(uuid.UUID(str(session_id))), f"{name}.json.gz")
+
+    def write(self, session_id: str, name: str, payload: Any):
+        """Writes a document atomically, so a crash never leaves a truncated archive behind."""
+        path = self._path(session_id, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+        with gzip.open(temporary, "wt", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(temporary, path)
+
+    def read(self, session_id: str, name: str) -> Optional[Any]:
+        try:
+            with gzip.open(self._path(session_id, name), "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def remove(self, session_id: str, name: str):
+        try:
+            os.remove(self._path(session_id, name))
+        except FileNotFoundError:
+            pass
+
+    def delete(self, session_id: str):
+        shutil.rmtree(os.path.dirname(self._path(session_id, "_")), ignore_errors=True)
@@ -0,0 +1,77 @@
+# backend/utils/upload_staging.py
+
+import os
+import time
+import uuid
+
+# Uploaded files wait here for the ingestion workers. It must be shared by the API and the
+# workers (a common volume), like SESSION_ARCHIVE_DIR, since the API writes and a worker reads.
+UPLOAD_STAGING_DIR = os.getenv("UPLOAD_STAGING_DIR", "data/upload_staging")
+
+class UploadStaging:
+    """
+    Staged upload files in a directory: <root>/<uuid>.pdf. Files are referred to by their
+    name, not their full path, so the API and the workers may mount the directory in
+    different places.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or UPLOAD_STAGING_DIR
+
+    def _path(self, name: str) -> str:
+        # Names come back through task messages; parsing them keeps arbitrary paths out.
+        stem, extension = os.path.splitext(name)
+        if extension != ".pdf":
+            raise ValueError(f"Not a staged upload: {name!r}")
+        return os.path.join(self.root, f"{uuid.UUID(stem)}.pdf")
+
+    def stage(self, chunks) -> str:
+        """
+        Writes the chunks to a new staged file and returns its name. The file is written under a
+        temporary name and renamed, so a worker never reads a partial upload.
+        """
+        name = f"{uuid.uuid4()}.pdf"
+        path = self._path(name)
+        os.makedirs(self.root, exist_ok=True)
+        temporary = f"{path}.tmp"
+        try:
+            with open(temporary, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(temporary, path)
+        except BaseException:
+            self._unlink(temporary)
+            raise
+        return name
+
+    def read(self, name: str) -> bytes | None:
+        try:
+            with open(self._path(name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def remove(self, name: str):
+        self._unlink(self._path(name))
+
+    def sweep(self, max_age_seconds: float, now: float = None) -> int:
+        """Removes staged files older than max_age_seconds, left behind by uploads that were never processed."""
+        now = now or time.time()
+        removed = 0
+        if not os.path.isdir(self.root):
+            return removed
+        for entry in os.scandir(self.root):
+            try:
+                if entry.is_file() and now - entry.stat().st_mtime > max_age_seconds:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    @staticmethod
+    def _unlink(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
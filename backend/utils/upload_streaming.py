@@ -0,0 +1,168 @@
+import hashlib
+import os
+from tempfile import SpooledTemporaryFile
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from backend.utils.profiling import run_in_threadpool
+
+MAX_UPLOAD_FILE_BYTES = int(os.getenv("MAX_UPLOAD_FILE_BYTES", str(50 * 1024 * 1024)))
+MAX_UPLOAD_REQUEST_BYTES = int(os.getenv("MAX_UPLOAD_REQUEST_BYTES", str(200 * 1024 * 1024)))
+# Each file is kept in memory up to this size and rolls over to a temporary file beyond it.
+UPLOAD_SPOOL_MEMORY_BYTES = int(os.getenv("UPLOAD_SPOOL_MEMORY_BYTES", str(1024 * 1024)))
+MAX_FORM_FIELD_BYTES = 64 * 1024
+# The PDF header must appear within the first 1024 bytes of the file.
+PDF_MAGIC = b"%PDF-"
+PDF_HEADER_WINDOW = 1024
+COPY_CHUNK_BYTES = 1024 * 1024
+
+class SpooledUpload:
+    """One uploaded file, spooled to memory/disk while its size and SHA-256 are tracked."""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.size = 0
+        self.file = SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MEMORY_BYTES)
+        self._sha256 = hashlib.sha256()
+        self._head = b""
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    @property
+    def on_disk(self) -> bool:
+        """True once the spool has rolled over to its temporary file, so writes go to disk."""
+        return self.file._rolled
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > MAX_UPLOAD_FILE_BYTES:
+            raise HTTPException(status_code=413, detail=f"{self.filename} exceeds the {MAX_UPLOAD_FILE_BYTES} byte limit per file.")
+        if len(self._head) < PDF_HEADER_WINDOW:
+            self._head += data[:PDF_HEADER_WINDOW - len(self._head)]
+            if len(self._head) >= PDF_HEADER_WINDOW:
+                self.check_pdf_header()
+        self._sha256.update(data)
+        self.file.write(data)
+
+    def check_pdf_header(self):
+        if PDF_MAGIC not in self._head:
+            raise HTTPException(status_code=415, detail=f"{self.filename} is not a PDF file.")
+
+    def chunks(self, size: int = COPY_CHUNK_BYTES):
+        """Yields the spooled content in chunks, from the start."""
+        self.file.seek(0)
+        while chunk := self.file.read(size):
+            yield chunk
+
+    def close(self):
+        self.file.close()
+
+class _PartCollector:
+    """python-multipart callbacks that route file parts into SpooledUploads and collect form fields."""
+
+    def __init__(self, max_files: int):
+        self.max_files = max_files
+        self.fields: Dict[str, str] = {}
+        self.files: List[SpooledUpload] = []
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._name = ""
+        self._field_value = b""
+        self._current: Optional[SpooledUpload] = None
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": lambda data, start, end: self._append("_header_field", data[start:end]),
+            "on_header_value": lambda data, start, end: self._append("_header_value", data[start:end]),
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def _append(self, attribute: str, data: bytes):
+        setattr(self, attribute, getattr(self, attribute) + data)
+
+    def on_part_begin(self):
+        self._headers = {}
+        self._field_value = b""
+        self._current = None
+
+    def on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition"))
+        self._name = options.get(b"name", b"").decode()
+        if b"filename" in options:
+            if len(self.files) >= self.max_files:
+                raise HTTPException(status_code=400, detail=f"You can only upload {self.max_files} files per chat.")
+            self._current = SpooledUpload(os.path.basename(options[b"filename"].decode()))
+            self.files.append(self._current)
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._current is not None:
+            self._current.write(data[start:end])
+        else:
+            self._field_value += data[start:end]
+            if len(self._field_value) > MAX_FORM_FIELD_BYTES:
+                raise HTTPException(status_code=413, detail=f"Form field {self._name} is too large.")
+
+    def on_part_end(self):
+        if self._current is not None:
+            if self._current.size < PDF_HEADER_WINDOW:
+                self._current.check_pdf_header()
+        else:
+            self.fields[self._name] = self._field_value.decode()
+
+    @property
+    def writing_to_disk(self) -> bool:
+        return self._current is not None and self._current.on_disk
+
+    def close(self):
+        for upload in self.files:
+            upload.close()
+
+async def stream_pdf_upload(request: Request, max_files: int) -> Tuple[Dict[str, str], List[SpooledUpload]]:
+    """
+    Parses a multipart/form-data request of PDF files as it streams in, without buffering it.
+    Per-file, per-request and file-count limits and the PDF header are checked while reading,
+    so oversized or non-PDF uploads are rejected before the rest of the body is read.
+    The caller must close() the returned uploads.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type"))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload.")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_REQUEST_BYTES:
+        raise HTTPException(status_code=413, detail=f"Uploads are limited to {MAX_UPLOAD_REQUEST_BYTES} bytes per request.")
+
+    collector = _PartCollector(max_files)
+    parser = MultipartParser(params[b"boundary"], collector.callbacks())
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > MAX_UPLOAD_REQUEST_BYTES:
+                raise HTTPException(status_code=413, detail=f"Uploads are limited to {MAX_UPLOAD_REQUEST_BYTES} bytes per request.")
+            # Like Starlette's parser, chunks of a file that has rolled over to disk are
+            # written from the threadpool, so that the disk writes do not block the event loop.
+            if collector.writing_to_disk:
+                await run_in_threadpool(parser.write, chunk)
+            else:
+                parser.write(chunk)
+        parser.finalize()
+    except Exception as e:
+        collector.close()
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(status_code=400, detail=f"Malformed multipart upload: {e}")
+    return collector.fields, collector.files
@@ -0,0 +1,8 @@
+import os
+
+# The benchmarks run offline: chunks and context budgets are counted with the dependency-free
+# "approx" tokenizer unless CHUNK_ENCODING / CONTEXT_ENCODING name a real one.
+os.environ.setdefault("CHUNK_ENCODING", "approx")
+os.environ.setdefault("CONTEXT_ENCODING", "approx")
+# The services get their own SQLite engine (see harness.py); this only keeps backend.database importable.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
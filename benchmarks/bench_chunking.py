@@ -0,0 +1,94 @@
+# benchmarks/bench_chunking.py
+"""
+Compares the character-based RecursiveCharacterTextSplitter against the
+token-aware page chunker: throughput (MB/s) and chunk size in tokens.
+Tokens are those of CHUNK_ENCODING; benchmarks default it to the offline "approx"
+tokenizer (see benchmarks/__init__.py), so set it to measure a real one.
+
+Usage: python -m benchmarks.bench_chunking --pages 500 [--pdf file.pdf ...]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from backend.components.document_processor import get_pdf_pages
+from backend.components.token_chunker import create_page_chunks, get_tokenizer
+from benchmarks.fixtures import make_page_text
+
+
+def create_text_chunks(text: str) -> list:
+    """The baseline: the character splitter ingestion used before the token-aware page chunker."""
+    return RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200).split_text(text)
+
+
+def make_pages(n_pages: int, words_per_page: int = 450, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [make_page_text(rng, words_per_page) for _ in range(n_pages)]
+
+
+def token_stats(texts: list) -> dict:
+    counts = get_tokenizer().count_batch(texts)
+    return {
+        "chunks": len(counts),
+        "mean_tokens": statistics.mean(counts),
+        "stdev_tokens": statistics.pstdev(counts),
+        "max_tokens": max(counts),
+    }
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def run(pages: list, repeat: int) -> dict:
+    megabytes = sum(len(page.encode("utf-8")) for page in pages) / 1e6
+    get_tokenizer()  # Exclude the one-off tokenizer load from the timings.
+
+    character_chunks, character_time = timed(lambda: create_text_chunks("".join(pages)), repeat)
+    token_chunks, token_time = timed(lambda: create_page_chunks(pages, "bench.pdf"), repeat)
+
+    return {
+        "pages": len(pages),
+        "megabytes": megabytes,
+        "results": {
+            "recursive_character_splitter": {
+                "mb_per_second": megabytes / character_time,
+                **token_stats(character_chunks),
+            },
+            "token_page_chunker": {
+                "mb_per_second": megabytes / token_time,
+                **token_stats([doc.page_content for doc in token_chunks]),
+            },
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500, help="Number of synthetic pages when no --pdf is given.")
+    parser.add_argument("--pdf", nargs="*", default=[], help="Real PDF files to chunk instead of synthetic pages.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.pdf:
+        pages = []
+        for path in args.pdf:
+            with open(path, "rb") as f:
+                pages.extend(get_pdf_pages({"filename": path, "content": f.read()}))
+    else:
+        pages = make_pages(args.pages)
+    print(json.dumps(run(pages, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
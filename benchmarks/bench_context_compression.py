@@ -0,0 +1,127 @@
+# benchmarks/bench_context_compression.py
+"""
+Prompt size, answer latency and answer-sentence retention with and without
+extractive context compression (`backend.components.context_compression`).
+
+Generated PDFs are ingested into the offline services (see benchmarks/harness.py).
+Each question is built from a sentence of the corpus, the "answer sentence". For
+every token budget, the benchmark reports:
+  - compress_ms: p50 time to compress one question's retrieved chunks, with the
+    sentence-embedding cache cold;
+  - answer_input_tokens: mean input tokens of the answer LLM call in ChatService.get_answer,
+    as counted by the fake model (words);
+  - get_answer_ms: p50 latency of get_answer. The fake model charges
+    --seconds-per-input-token for the prompt, as prompt processing costs a real LLM;
+  - retention: the share of questions whose answer sentence is still in the context,
+    out of those where retrieval found it. It is measured on the question itself, since
+    the fake model's standalone-question rewrite in get_answer is unrelated text.
+"none" is the uncompressed baseline.
+
+Usage: python -m benchmarks.bench_context_compression --pages 10 30 --questions 40 --budgets 200 400 800
+"""
+
+import argparse
+import json
+import random
+import time
+import uuid
+
+from prometheus_client import REGISTRY
+
+from backend.components import chat_logic, context_compression
+from backend.components.context_compression import compress_documents, split_sentences
+from backend.components.retrieval_cache import cached_embed_query, cached_similarity_search
+from benchmarks.fixtures import make_pdf_with_text
+from benchmarks.harness import build_offline_services, environment, percentile
+
+
+def answer_input_tokens() -> float:
+    return REGISTRY.get_sample_value("doc_copilot_llm_tokens_total", {"chain": "answer", "kind": "input"}) or 0.0
+
+
+def contains(documents: list, sentence: str) -> bool:
+    # Extracted text wraps lines where the PDF does, so whitespace is normalized first.
+    return any(sentence in " ".join(doc.page_content.split()) for doc in documents)
+
+
+def make_questions(page_texts: list, count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    sentences = [" ".join(s.split()) for text in page_texts for s in split_sentences(text) if len(s.split()) >= 10]
+    questions = []
+    for sentence in rng.sample(sentences, min(count, len(sentences))):
+        questions.append({"question": f"What does the document say about {' '.join(sentence.rstrip('.').split()[:8]).lower()}?", "answer_sentence": sentence})
+    return questions
+
+
+def run(pages: list, question_count: int, budgets: list, llm_latency: float, seconds_per_input_token: float) -> dict:
+    services = build_offline_services(llm_latency=llm_latency, seconds_per_input_token=seconds_per_input_token)
+    file_data, page_texts = [], []
+    for i, n_pages in enumerate(pages):
+        content, texts = make_pdf_with_text(n_pages, seed=i)
+        file_data.append({"filename": f"fixture_{i}_{n_pages}p.pdf", "content": content})
+        page_texts.extend(texts)
+
+    session_id = str(uuid.uuid4())
+    services["db_service"].create_session(session_id, [file["filename"] for file in file_data])
+    services["document_service"].process_documents(session_id, file_data)
+    vector_store = services["document_service"].get_vector_store(session_id)
+    questions = make_questions(page_texts, question_count)
+
+    results = []
+    for budget in [None] + budgets:
+        context_compression._sentence_cache.clear()
+        compress_seconds, answer_seconds, found, retained = [], [], 0, 0
+        for item in questions:
+            query_embedding = cached_embed_query(vector_store.embeddings, item["question"])
+            documents = cached_similarity_search(vector_store, query_embedding, chat_logic.RETRIEVAL_K, None)
+            if budget is not None:
+                start = time.perf_counter()
+                documents_after = compress_documents(vector_store.embeddings, query_embedding, documents, budget)
+                compress_seconds.append(time.perf_counter() - start)
+            else:
+                documents_after = documents
+            if contains(documents, item["answer_sentence"]):
+                found += 1
+                retained += contains(documents_after, item["answer_sentence"])
+
+        chat_logic.CONTEXT_COMPRESSION = budget is not None
+        context_compression.CONTEXT_TOKEN_BUDGET = budget or context_compression.CONTEXT_TOKEN_BUDGET
+        tokens_before = answer_input_tokens()
+        for item in questions:
+            start = time.perf_counter()
+            services["chat_service"].get_answer(vector_store, item["question"], session_id, "en")
+            answer_seconds.append(time.perf_counter() - start)
+
+        results.append({
+            "budget": budget if budget is not None else "none",
+            "compress_ms": percentile(compress_seconds, 50) * 1000 if compress_seconds else 0.0,
+            "answer_input_tokens": (answer_input_tokens() - tokens_before) / len(questions),
+            "get_answer_ms": percentile(answer_seconds, 50) * 1000,
+            "retention": retained / found if found else None,
+        })
+
+    baseline = results[0]
+    for result in results[1:]:
+        result["token_reduction"] = 1 - result["answer_input_tokens"] / baseline["answer_input_tokens"]
+        result["latency_change"] = result["get_answer_ms"] / baseline["get_answer_ms"] - 1
+    return {
+        "environment": environment(),
+        "config": {"pages": pages, "questions": len(questions), "llm_latency_seconds": llm_latency, "seconds_per_input_token": seconds_per_input_token},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 30])
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--budgets", type=int, nargs="+", default=[200, 400, 800])
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--seconds-per-input-token", type=float, default=0.0002)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.pages, args.questions, args.budgets, args.llm_latency, args.seconds_per_input_token), indent=2))
+
+
+if __name__ == "__main__":
+    main()
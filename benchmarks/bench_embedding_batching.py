@@ -0,0 +1,95 @@
+# benchmarks/bench_embedding_batching.py
+"""
+Query-embedding throughput with and without cross-request micro-batching.
+
+At each concurrency level, that many threads embed distinct queries back to back,
+as concurrent /ask-question/ requests do, first calling the model directly and then
+through `MicroBatchingEmbeddings`. Reports queries per second, latency percentiles
+and the mean batch size. With --remote-url the same load is also sent to a running
+embedding server (`uvicorn backend.embedding_server:app --port 8002`).
+
+The default model is a simulated one with a forward-pass cost profile (fixed overhead
+per call, small cost per text, calls serialized); --embeddings minilm uses the real model.
+
+Usage: python -m benchmarks.bench_embedding_batching --concurrency 1 8 64 --queries 512
+"""
+
+import argparse
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.utils.embedding_executor import MicroBatchingEmbeddings, RemoteEmbeddings
+from benchmarks.fakes import SimulatedModelEmbeddings
+
+
+def run_load(embeddings, concurrency: int, queries: int) -> dict:
+    texts = [f"What does section {i} say about the termination clause?" for i in range(queries)]
+    latencies = []
+
+    def embed(text):
+        start = time.perf_counter()
+        embeddings.embed_query(text)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(embed, texts))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "queries_per_second": queries / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    }
+
+
+class CountingEmbeddings:
+    """Counts embed_documents calls of the wrapped model, to derive the mean batch size."""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return self.embeddings.embed_documents(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--queries", type=int, default=512)
+    parser.add_argument("--embeddings", choices=["simulated", "minilm"], default="simulated")
+    parser.add_argument("--window-ms", type=float, default=3)
+    parser.add_argument("--remote-url", default=None)
+    args = parser.parse_args()
+
+    if args.embeddings == "minilm":
+        from backend.utils.model_loader import EmbeddingsSingleton
+        model = EmbeddingsSingleton()
+        model.embed_documents(["warm-up"])
+    else:
+        model = SimulatedModelEmbeddings()
+
+    results = []
+    for concurrency in args.concurrency:
+        counting = CountingEmbeddings(model)
+        batched = MicroBatchingEmbeddings(counting, window_seconds=args.window_ms / 1000)
+        result = {
+            "concurrency": concurrency,
+            "direct": run_load(model, concurrency, args.queries),
+            "batched": run_load(batched, concurrency, args.queries),
+        }
+        result["batched"]["mean_batch_size"] = args.queries / counting.calls
+        if args.remote_url:
+            result["remote"] = run_load(RemoteEmbeddings(args.remote_url), concurrency, args.queries)
+        result["speedup"] = result["batched"]["queries_per_second"] / result["direct"]["queries_per_second"]
+        results.append(result)
+
+    print(json.dumps({"embeddings": args.embeddings, "queries": args.queries, "window_ms": args.window_ms, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
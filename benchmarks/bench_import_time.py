@@ -0,0 +1,133 @@
+# benchmarks/bench_import_time.py
+"""
+Import-time profile and startup budget for the API process.
+
+Runs `python -X importtime -c "import backend.main"` in a fresh interpreter,
+reports the slowest modules by cumulative time and checks that none of the
+heavy LLM / vector-store dependencies are imported eagerly. Exits non-zero
+when the budget is exceeded or a forbidden module is loaded, so it can be
+used as a CI regression check.
+
+The budget applies to the time the app adds on top of the frameworks it cannot
+start without (FastAPI, SQLAlchemy, redis-py, ...), whose share is taken from
+the same `-X importtime` run. Their import alone takes 0.7-2 s depending on the
+machine, so a wall-clock budget for the whole import would mostly measure the
+machine. The fastest of --repeat runs is reported.
+
+Usage: python -m benchmarks.bench_import_time --budget-ms 300 --top 25 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET_MODULE = "backend.main"
+
+# Must only be imported by the services that need them, never by importing the app.
+FORBIDDEN_AT_IMPORT = (
+    "celery",
+    "langchain_openai",
+    "langchain_huggingface",
+    "langchain_community",
+    "langchain_chroma",
+    "chromadb",
+    "openai",
+    "sentence_transformers",
+    "torch",
+)
+
+# Imported by the app in any case; their time is reported but not charged to the budget.
+FRAMEWORK_PACKAGES = {"fastapi", "starlette", "pydantic", "pydantic_core", "sqlalchemy", "redis", "prometheus_client", "orjson", "python_multipart"}
+
+_PROBE = (
+    "import sys, json, time\n"
+    "start = time.perf_counter()\n"
+    f"import {TARGET_MODULE}\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(json.dumps({'import_ms': elapsed * 1000, 'modules': sorted(sys.modules)}))\n"
+)
+
+
+def parse_importtime(stderr: str) -> list:
+    """Parses `-X importtime` lines into (module, depth, self_us, cumulative_us) rows, in output order."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return rows
+
+
+def framework_ms(rows: list) -> float:
+    """Time spent importing FRAMEWORK_PACKAGES, counting each outermost framework import once."""
+    total, stack = 0.0, []
+    # Children are printed before their parent; reversed, every parent comes before its children.
+    for row in reversed(rows):
+        while stack and stack[-1][0] >= row["depth"]:
+            stack.pop()
+        inside = bool(stack) and stack[-1][1]
+        is_framework = row["module"].split(".")[0] in FRAMEWORK_PACKAGES
+        if is_framework and not inside:
+            total += row["cumulative_ms"]
+        stack.append((row["depth"], inside or is_framework))
+    return total
+
+
+def probe(env: dict) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["rows"] = parse_importtime(completed.stderr)
+    result["framework_ms"] = framework_ms(result["rows"])
+    result["app_ms"] = result["import_ms"] - result["framework_ms"]
+    return result
+
+
+def run(top: int, repeat: int = 5) -> dict:
+    """Imports the app repeat times and keeps the fastest run, which is the least disturbed by other load."""
+    env = dict(os.environ)
+    env.setdefault("PYTHONPATH", REPO_ROOT)
+    best = min((probe(env) for _ in range(repeat)), key=lambda result: result["app_ms"])
+    loaded = set(best["modules"])
+    forbidden = sorted(name for name in FORBIDDEN_AT_IMPORT if name in loaded)
+    return {
+        "module": TARGET_MODULE,
+        "import_ms": best["import_ms"],
+        "framework_ms": best["framework_ms"],
+        "app_ms": best["app_ms"],
+        "forbidden_modules_loaded": forbidden,
+        "slowest": sorted(best["rows"], key=lambda row: row["cumulative_ms"], reverse=True)[:top],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--budget-ms", type=float, default=float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "300")),
+        help="Budget for the import time the app adds on top of FRAMEWORK_PACKAGES.",
+    )
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    report = run(args.top, args.repeat)
+    report["budget_ms"] = args.budget_ms
+    report["within_budget"] = report["app_ms"] <= args.budget_ms and not report["forbidden_modules_loaded"]
+    print(json.dumps(report, indent=2))
+    if not report["within_budget"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/bench_ingest_scaling.py
+"""
+Wall time of the fan-out ingestion pipeline against the number of workers.
+
+Runs the same map/reduce shape as the Celery chord: one extract/chunk/embed
+job per file across a process pool, then a single commit step that gathers
+the staged payloads. Redis and Chroma are left out so that the timings only
+reflect how the per-file work scales.
+
+Usage: python -m benchmarks.bench_ingest_scaling --files 5 --pages 40 --workers 1 2 4 8
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from backend.components.document_processor import embed_file, pack_embedded_chunks, unpack_embedded_chunks
+from benchmarks.fakes import HashingEmbeddings
+from benchmarks.fixtures import make_file_data
+
+_embeddings = None
+
+
+def _init_worker(embeddings_kind: str):
+    """Loads the embedding model once per worker process, like a Celery child."""
+    global _embeddings
+    if embeddings_kind == "minilm":
+        from backend.utils.model_loader import get_embeddings_model
+        _embeddings = get_embeddings_model()
+    else:
+        _embeddings = HashingEmbeddings()
+    _embeddings.embed_query("warm-up")
+
+
+def _prepare(file: dict) -> bytes:
+    documents, vectors = embed_file(file, _embeddings)
+    return pack_embedded_chunks(documents, vectors)
+
+
+def run(file_data: list, worker_counts: list, embeddings_kind: str) -> dict:
+    results = []
+    for workers in worker_counts:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(embeddings_kind,)) as pool:
+            # Start every worker before timing so model loading is excluded.
+            list(pool.map(_init_worker, [embeddings_kind] * workers))
+            start = time.perf_counter()
+            staged = list(pool.map(_prepare, file_data))
+            chunks = sum(len(unpack_embedded_chunks(payload)[0]) for payload in staged)
+            np.vstack([unpack_embedded_chunks(payload)[1] for payload in staged])
+            elapsed = time.perf_counter() - start
+        results.append({"workers": workers, "wall_seconds": elapsed, "chunks": chunks})
+
+    baseline = results[0]["wall_seconds"]
+    for result in results:
+        result["speedup"] = baseline / result["wall_seconds"]
+    return {"files": len(file_data), "embeddings": embeddings_kind, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=40, help="Pages per generated PDF.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--embeddings", choices=["minilm", "hashed"], default="minilm")
+    args = parser.parse_args()
+
+    file_data = make_file_data([args.pages] * args.files)
+    print(json.dumps(run(file_data, args.workers, args.embeddings), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/bench_json_responses.py
+"""
+Serialization time and bytes on the wire of chat-history payloads.
+
+For histories of several lengths ({"messages": [...]}, as /chat-history/ and
+/ask-question/ return them) it times:
+  - encoding: FastAPI's default path (jsonable_encoder, then json.dumps as JSONResponse
+    renders), plain json.dumps, and the orjson codec (`backend.utils.json_codec`);
+  - decoding, as the Redis cache and single-flight followers do: json.loads and orjson;
+  - compression: gzip at several levels, and brotli when the package is installed.
+Sizes are reported raw and compressed. The generated text draws on a small vocabulary,
+so compression ratios are higher than on real documents.
+
+Usage: python -m benchmarks.bench_json_responses --messages 10 100 1000
+"""
+
+import argparse
+import gzip
+import importlib.util
+import json
+import random
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from backend.utils import json_codec
+from benchmarks.fixtures import make_page_text
+
+
+def make_history(n_messages: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    messages = []
+    for i in range(n_messages):
+        if i % 2 == 0:
+            messages.append({"role": "user", "content": make_page_text(rng, rng.randint(8, 30)).rstrip(".") + "?"})
+        else:
+            messages.append({"role": "assistant", "content": make_page_text(rng, rng.randint(80, 300))})
+    return {"messages": messages}
+
+
+def best_ms(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def fastapi_default(payload) -> bytes:
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def run(sizes: list, repeat: int, gzip_levels: list) -> list:
+    brotli = importlib.import_module("brotli") if importlib.util.find_spec("brotli") else None
+    results = []
+    for n_messages in sizes:
+        payload = make_history(n_messages, seed=n_messages)
+        body = json_codec.dumps(payload)
+        result = {
+            "messages": n_messages,
+            "encode_ms": {
+                "fastapi_default": best_ms(lambda: fastapi_default(payload), repeat),
+                "json": best_ms(lambda: json.dumps(payload).encode(), repeat),
+                "orjson": best_ms(lambda: json_codec.dumps(payload), repeat),
+            },
+            "decode_ms": {
+                "json": best_ms(lambda: json.loads(body), repeat),
+                "orjson": best_ms(lambda: json_codec.loads(body), repeat),
+            },
+            "bytes": {"raw": len(body)},
+            "compress_ms": {},
+        }
+        for level in gzip_levels:
+            result["bytes"][f"gzip_{level}"] = len(gzip.compress(body, compresslevel=level))
+            result["compress_ms"][f"gzip_{level}"] = best_ms(lambda: gzip.compress(body, compresslevel=level), repeat)
+        if brotli is not None:
+            for quality in (4, 11):
+                result["bytes"][f"brotli_{quality}"] = len(brotli.compress(body, quality=quality))
+                result["compress_ms"][f"brotli_{quality}"] = best_ms(lambda: brotli.compress(body, quality=quality), repeat)
+        result["encode_speedup"] = result["encode_ms"]["fastapi_default"] / result["encode_ms"]["orjson"]
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--gzip-levels", type=int, nargs="+", default=[1, 5, 9])
+    args = parser.parse_args()
+
+    print(json.dumps({"results": run(args.messages, args.repeat, args.gzip_levels)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
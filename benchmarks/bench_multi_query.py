@@ -0,0 +1,129 @@
+# benchmarks/bench_multi_query.py
+"""
+Retrieval latency and recall of multi-query retrieval (`chat_logic.retrieve_documents`
+with template variants from `backend.components.multi_query`).
+
+The corpus draws on a large pseudo-word vocabulary, so that sentences can be told
+apart by the hashing-based simulated embeddings. Questions join two corpus sentences
+("X and Y?"), as users ask about two things at once; recall is the share of those two answer sentences found
+in the top-k retrieved chunks. For each number of variants it reports recall, and
+p50 retrieval latency (embedding, searches and fusion) with the searches run
+concurrently as the chain does and, for comparison, one after another.
+
+The embedding model is simulated (fixed cost per call plus a cost per text), and
+every Chroma search is delayed by --search-latency-ms to stand in for the round
+trip to a ChromaDB server.
+
+Usage: python -m benchmarks.bench_multi_query --variants 0 2 4 --questions 40
+"""
+
+import argparse
+import json
+import random
+import time
+import uuid
+
+from backend.components import chat_logic, retrieval_cache
+from backend.components.context_compression import split_sentences
+from backend.components.multi_query import fuse_results, template_variants
+from benchmarks.fakes import SimulatedModelEmbeddings
+from benchmarks.fixtures import make_pdf_with_text, make_vocabulary
+from benchmarks.harness import build_offline_services, environment, percentile
+
+
+def make_questions(page_texts: list, count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    sentences = [" ".join(s.split()) for text in page_texts for s in split_sentences(text) if len(s.split()) >= 10]
+    questions = []
+    for _ in range(count):
+        first, second = rng.sample(sentences, 2)
+        opening = lambda sentence: " ".join(sentence.rstrip(".").split()[:5]).lower()
+        questions.append({"question": f"What about {opening(first)} and {opening(second)}?", "answer_sentences": [first, second]})
+    return questions
+
+
+def with_search_latency(vector_store, seconds: float):
+    search = vector_store.similarity_search_by_vector
+
+    def slow_search(*args, **kwargs):
+        time.sleep(seconds)
+        return search(*args, **kwargs)
+
+    vector_store.similarity_search_by_vector = slow_search
+    return vector_store
+
+
+def retrieve_sequentially(vector_store, queries: list) -> list:
+    """retrieve_documents with the searches run one after another."""
+    embeddings = retrieval_cache.cached_embed_queries(vector_store.embeddings, queries)
+    results = [retrieval_cache.cached_similarity_search(vector_store, embedding, chat_logic.RETRIEVAL_K, None) for embedding in embeddings]
+    return fuse_results(results, chat_logic.RETRIEVAL_K)
+
+
+def measure(vector_store, questions: list, variants: int, sequential: bool = False) -> dict:
+    latencies, found = [], 0
+    for item in questions:
+        retrieval_cache._embedding_cache.clear()
+        queries = template_variants(item["question"], variants)
+        start = time.perf_counter()
+        if sequential:
+            documents = retrieve_sequentially(vector_store, queries)
+        else:
+            documents, _ = chat_logic.retrieve_documents(vector_store, queries)
+        latencies.append(time.perf_counter() - start)
+        text = " ".join(" ".join(doc.page_content.split()) for doc in documents)
+        found += sum(sentence in text for sentence in item["answer_sentences"])
+    return {"p50_ms": percentile(latencies, 50) * 1000, "recall": found / (2 * len(questions))}
+
+
+def run(pages: list, question_count: int, variant_counts: list, search_latency_ms: float) -> dict:
+    services = build_offline_services(embeddings=SimulatedModelEmbeddings())
+    file_data, page_texts = [], []
+    vocabulary = make_vocabulary(5000)
+    for i, n_pages in enumerate(pages):
+        content, texts = make_pdf_with_text(n_pages, seed=i, words=vocabulary)
+        file_data.append({"filename": f"fixture_{i}_{n_pages}p.pdf", "content": content})
+        page_texts.extend(texts)
+
+    session_id = str(uuid.uuid4())
+    services["db_service"].create_session(session_id, [file["filename"] for file in file_data])
+    services["document_service"].process_documents(session_id, file_data)
+    vector_store = with_search_latency(services["document_service"].get_vector_store(session_id), search_latency_ms / 1000)
+    # Sentences cut by a chunk boundary can never be retrieved whole; such questions are skipped.
+    chunks = [" ".join(text.split()) for text in vector_store.get()["documents"]]
+    questions = [
+        item for item in make_questions(page_texts, 2 * question_count)
+        if all(any(sentence in chunk for chunk in chunks) for sentence in item["answer_sentences"])
+    ][:question_count]
+
+    results = []
+    for variants in variant_counts:
+        results.append({
+            "variants": variants,
+            "concurrent": measure(vector_store, questions, variants),
+            "sequential": measure(vector_store, questions, variants, sequential=True),
+        })
+
+    baseline = results[0]["concurrent"]["p50_ms"]
+    for result in results:
+        result["latency_vs_single_query"] = result["concurrent"]["p50_ms"] / baseline
+    return {
+        "environment": environment(),
+        "config": {"pages": pages, "questions": len(questions), "k": chat_logic.RETRIEVAL_K, "search_latency_ms": search_latency_ms},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 30])
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--variants", type=int, nargs="+", default=[0, 2, 4])
+    parser.add_argument("--search-latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.pages, args.questions, args.variants, args.search_latency_ms), indent=2))
+
+
+if __name__ == "__main__":
+    main()
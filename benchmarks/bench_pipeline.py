@@ -0,0 +1,92 @@
+# benchmarks/bench_pipeline.py
+"""
+Offline end-to-end benchmark of the RAG pipeline.
+
+Drives DocumentService.process_documents, ChatService.get_answer and the
+DocumentActionsService actions against local stand-ins (see benchmarks/harness.py)
+using generated PDFs of several sizes. Emits p50/p95 timings and throughput
+per stage as JSON, so runs can be stored and compared for regressions.
+
+Usage: python -m benchmarks.bench_pipeline --sizes 1 10 50 --repeat 5 --output results.json
+"""
+
+import argparse
+import json
+import uuid
+
+from backend.components.document_processor import get_pdf_pages
+from backend.components.token_chunker import create_page_chunks
+from benchmarks.fixtures import make_file_data
+from benchmarks.harness import StageTimer, build_offline_services, environment
+
+QUESTIONS = [
+    "What are the payment terms?",
+    "Summarize the termination clause.",
+    "How is confidentiality handled?",
+    "What revenue growth is reported for the quarter?",
+]
+
+
+def run(sizes: list, repeat: int, questions: int, llm_latency: float) -> dict:
+    services = build_offline_services(llm_latency=llm_latency)
+    timer = StageTimer()
+    file_data = make_file_data(sizes)
+    embeddings = services["document_service"].embeddings
+
+    for _ in range(repeat):
+        for file in file_data:
+            with timer.time("extract", len(file["content"]) / 1e6, "mb"):
+                pages = get_pdf_pages(file)
+            with timer.time("chunk", len(pages), "pages"):
+                documents = create_page_chunks(pages, file["filename"])
+            with timer.time("embed", len(documents), "chunks"):
+                embeddings.embed_documents([doc.page_content for doc in documents])
+
+        session_id = str(uuid.uuid4())
+        services["db_service"].create_session(session_id, [file["filename"] for file in file_data])
+        total_mb = sum(len(file["content"]) for file in file_data) / 1e6
+        with timer.time("process_documents", total_mb, "mb"):
+            services["document_service"].process_documents(session_id, file_data)
+
+        vector_store = services["document_service"].get_vector_store(session_id)
+        for i in range(questions):
+            with timer.time("get_answer", 1, "questions"):
+                services["chat_service"].get_answer(vector_store, QUESTIONS[i % len(QUESTIONS)], session_id, "en")
+
+        filenames = [file["filename"] for file in file_data]
+        with timer.time("summarize"):
+            services["actions_service"].summarize_documents(vector_store, filenames, "en")
+        if len(filenames) >= 2:
+            with timer.time("compare"):
+                services["actions_service"].compare_documents(vector_store, filenames[:2], "en")
+        with timer.time("classify"):
+            services["actions_service"].classify_topics(vector_store, "en")
+
+        services["document_service"].delete_vector_store(session_id)
+
+    return {
+        "environment": environment(),
+        "config": {"sizes_pages": sizes, "repeat": repeat, "questions": questions, "llm_latency_seconds": llm_latency},
+        "stages": timer.summary(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50], help="Pages of each generated PDF.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=8, help="Questions asked per repetition.")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per LLM call.")
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.repeat, args.questions, args.llm_latency)
+    serialized = json.dumps(report, indent=2)
+    print(serialized)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(serialized)
+
+
+if __name__ == "__main__":
+    main()
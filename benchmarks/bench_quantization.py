@@ -0,0 +1,132 @@
+# benchmarks/bench_quantization.py
+"""
+Compares the storage footprint and search quality of float32 vectors in Chroma
+against the float16 / int8 quantized index.
+
+With quantization, Chroma keeps the chunk texts and metadata with a one-dimensional
+placeholder vector, and the quantized index in Redis is the only copy of the vectors.
+Every mode stores the same chunks in a persistent Chroma on disk, so the footprint
+is measured rather than estimated. All byte counts are per million chunks:
+  - chroma_bytes: Chroma's directory (SQLite, with the texts, and the HNSW index);
+  - redis_bytes: the serialized quantized index;
+  - total_bytes: both, i.e. what the chunks cost to store;
+  - vector_bytes: the part of total_bytes that holds the vectors (for float32, Chroma's
+    size minus that of the same chunks with placeholder vectors);
+  - process_cache_bytes: the decoded index an API process caches, which is
+    bounded by QUANTIZED_INDEX_CACHE_MB rather than stored.
+recall_at_k compares the index's top k against exact float32 search. load_ms is the
+one-off decode of the index in a process that has not cached it yet.
+
+Usage: python -m benchmarks.bench_quantization --chunks 20000 --queries 200
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from backend.components.document_processor import store_embedded_chunks
+from backend.components.vector_quantization import QuantizedIndex, placeholder_embeddings
+
+DIMENSIONS = 384  # all-MiniLM-L6-v2
+
+
+def make_corpus(n_chunks: int, n_queries: int, seed: int = 0):
+    """Clustered unit vectors, which resemble sentence embeddings better than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n_chunks // 50), DIMENSIONS)).astype(np.float32)
+    corpus = centers[rng.integers(0, len(centers), n_chunks)] + 0.35 * rng.standard_normal((n_chunks, DIMENSIONS)).astype(np.float32)
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries = corpus[rng.integers(0, n_chunks, n_queries)] + 0.2 * rng.standard_normal((n_queries, DIMENSIONS)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return corpus, queries
+
+
+def exact_top_k(corpus: np.ndarray, query: np.ndarray, k: int) -> list:
+    distances = ((corpus - query) ** 2).sum(axis=1)
+    top = np.argpartition(distances, k - 1)[:k]
+    return top[np.argsort(distances[top])].tolist()
+
+
+def directory_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def chroma_bytes(ids, documents, vectors) -> int:
+    """Bytes on disk of a persistent Chroma holding the chunks with the given vectors."""
+    import chromadb
+
+    with tempfile.TemporaryDirectory() as path:
+        client = chromadb.PersistentClient(path=path)
+        store_embedded_chunks(client, "bench_quantization", documents, vectors, ids=ids)
+        size = directory_bytes(path)
+        client.clear_system_cache()
+    return size
+
+
+def run(n_chunks: int, n_queries: int, k: int, text_chars: int) -> dict:
+    corpus, queries = make_corpus(n_chunks, n_queries)
+    ids = [str(i) for i in range(n_chunks)]
+    text = ("lorem ipsum dolor sit amet " * (text_chars // 27 + 1))[:text_chars]
+    documents = [Document(page_content=f"{i} {text}", metadata={"filename": "bench.pdf", "page": i // 10 + 1}) for i in range(n_chunks)]
+
+    start = time.perf_counter()
+    truth = [exact_top_k(corpus, q, k) for q in queries]
+    float32_latency = (time.perf_counter() - start) / n_queries
+
+    per_million = lambda n_bytes: n_bytes * 1_000_000 // n_chunks
+    float32_total = chroma_bytes(ids, documents, corpus)
+    placeholder_chroma = chroma_bytes(ids, documents, placeholder_embeddings(n_chunks))
+    results = {
+        "float32": {
+            "recall_at_k": 1.0,
+            "chroma_bytes": per_million(float32_total),
+            "redis_bytes": 0,
+            "total_bytes": per_million(float32_total),
+            "vector_bytes": per_million(float32_total - placeholder_chroma),
+            "query_latency_ms": float32_latency * 1000,
+        }
+    }
+
+    for mode in ("float16", "int8"):
+        serialized = QuantizedIndex.from_embeddings(ids, corpus, [doc.metadata for doc in documents], mode).to_bytes()
+        start = time.perf_counter()
+        index = QuantizedIndex.from_bytes(serialized)
+        load_seconds = time.perf_counter() - start
+        hits = 0
+        start = time.perf_counter()
+        for query, expected in zip(queries, truth):
+            hits += len(set(index.search(query, k)) & set(expected))
+        latency = (time.perf_counter() - start) / n_queries
+        total = placeholder_chroma + len(serialized)
+        results[mode] = {
+            "recall_at_k": hits / (k * n_queries),
+            "chroma_bytes": per_million(placeholder_chroma),
+            "redis_bytes": per_million(len(serialized)),
+            "total_bytes": per_million(total),
+            "vector_bytes": per_million(len(serialized)),
+            "total_vs_float32": total / float32_total,
+            "process_cache_bytes": per_million(index.nbytes),
+            "load_ms": load_seconds * 1000,
+            "query_latency_ms": latency * 1000,
+        }
+
+    return {"chunks": n_chunks, "queries": n_queries, "k": k, "text_chars": text_chars, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--text-chars", type=int, default=1000, help="Length of each chunk's text (about 256 tokens by default)")
+    args = parser.parse_args()
+    print(json.dumps(run(args.chunks, args.queries, args.k, args.text_chars), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# benchmarks/bench_upload_memory.py
+"""
+Peak API memory while receiving a /process-pdfs/ upload.
+
+Streams a generated multipart body in small chunks through the streaming upload
+parser (`backend.utils.upload_streaming`) and, for comparison, through Starlette's
+`request.form()` followed by reading every file into memory, as the endpoint used
+to do. Peak Python allocations are measured with tracemalloc. Also checks that an
+oversized file and a non-PDF file are rejected before the whole body is read.
+Exits non-zero when the streaming parser's peak exceeds --budget-mb.
+
+Usage: python -m benchmarks.bench_upload_memory --files 3 --file-mb 20 --budget-mb 8
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+
+from starlette.requests import Request
+
+from benchmarks.fixtures import make_pdf
+
+BOUNDARY = "benchboundary"
+CHUNK_BYTES = 64 * 1024
+
+
+def make_padded_pdf(size: int) -> bytes:
+    """A valid PDF padded with trailing comment bytes up to size."""
+    pdf = make_pdf(2)
+    return pdf + b"%" + b"x" * max(0, size - len(pdf) - 1)
+
+
+def body_parts(files, session_id: str):
+    yield (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="session_id"\r\n\r\n{session_id}\r\n').encode()
+    for filename, content in files:
+        yield (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="files"; filename="{filename}"\r\n'
+               f'Content-Type: application/pdf\r\n\r\n').encode()
+        for start in range(0, len(content), CHUNK_BYTES):
+            yield content[start:start + CHUNK_BYTES]
+        yield b"\r\n"
+    yield f"--{BOUNDARY}--\r\n".encode()
+
+
+def make_request(files, session_id: str = "bench-session") -> Request:
+    chunks = iter(list(body_parts(files, session_id)))
+    consumed = {"bytes": 0}
+
+    async def receive():
+        chunk = next(chunks, None)
+        if chunk is None:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        consumed["bytes"] += len(chunk)
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/process-pdfs/",
+        "headers": [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())],
+    }
+    request = Request(scope, receive)
+    request.consumed = consumed
+    return request
+
+
+async def streaming_upload(request: Request):
+    from backend.utils.upload_streaming import stream_pdf_upload
+
+    _, uploads = await stream_pdf_upload(request, max_files=10)
+    for upload in uploads:
+        upload.close()
+
+
+async def buffered_upload(request: Request):
+    form = await request.form()
+    contents = [await file.read() for file in form.getlist("files")]
+    await form.close()
+    return contents
+
+
+def measure(coroutine_factory, files) -> dict:
+    request = make_request(files)
+    tracemalloc.start()
+    start = time.perf_counter()
+    asyncio.run(coroutine_factory(request))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    body_bytes = request.consumed["bytes"]
+    return {"peak_mb": peak / 1e6, "body_mb": body_bytes / 1e6, "seconds": elapsed, "mb_per_s": body_bytes / 1e6 / elapsed}
+
+
+def rejection(files) -> dict:
+    """Status code of a rejected upload and how much of the body was read before it."""
+    from fastapi import HTTPException
+
+    request = make_request(files)
+    try:
+        asyncio.run(streaming_upload(request))
+        status = 200
+    except HTTPException as e:
+        status = e.status_code
+    total = sum(len(part) for part in body_parts(files, "bench-session"))
+    return {"status": status, "read_fraction": request.consumed["bytes"] / total}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=3)
+    parser.add_argument("--file-mb", type=float, default=20)
+    parser.add_argument("--budget-mb", type=float, default=8)
+    args = parser.parse_args()
+
+    from backend.utils.upload_streaming import MAX_UPLOAD_FILE_BYTES
+
+    files = [(f"file_{i}.pdf", make_padded_pdf(int(args.file_mb * 1e6))) for i in range(args.files)]
+    report = {
+        "streaming": measure(streaming_upload, files),
+        "buffered_baseline": measure(buffered_upload, files),
+        "oversized_file": rejection([("big.pdf", make_padded_pdf(MAX_UPLOAD_FILE_BYTES + 4 * CHUNK_BYTES))]),
+        "not_a_pdf": rejection([("junk.pdf", b"MZ" + b"\0" * (4 * 1024 * 1024))]),
+        "budget_mb": args.budget_mb,
+    }
+    report["within_budget"] = (
+        report["streaming"]["peak_mb"] <= args.budget_mb
+        and report["oversized_file"]["status"] == 413
+        and report["not_a_pdf"]["status"] == 415
+    )
+    print(json.dumps(report, indent=2))
+    if not report["within_budget"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/fakes.py
+"""
+Deterministic stand-ins for the embedding model and the LLM, so the pipeline can be
+benchmarked and tested without OpenAI. Redis is replaced by fakeredis (see harness.py).
+"""
+
+import hashlib
+import re
+import threading
+import time
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings built from token hashes.
+    Similar texts get similar vectors, which is enough to exercise retrieval offline.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            digest = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+            vector[digest % self.dimensions] += 1.0 if (digest >> 32) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class SimulatedModelEmbeddings(HashingEmbeddings):
+    """
+    HashingEmbeddings with the cost profile of a transformer forward pass: a fixed overhead
+    per call plus a smaller cost per text. Calls are serialized, like forward passes that
+    compete for the same CPU cores, so batching is what raises throughput.
+    """
+
+    def __init__(self, dimensions: int = 384, call_overhead_seconds: float = 0.004, seconds_per_text: float = 0.0004):
+        super().__init__(dimensions)
+        self.call_overhead_seconds = call_overhead_seconds
+        self.seconds_per_text = seconds_per_text
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            time.sleep(self.call_overhead_seconds + self.seconds_per_text * len(texts))
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class DeterministicChatModel(BaseChatModel):
+    """
+    Chat model whose reply is derived from a hash of the prompt.
+    Latency is simulated as a fixed overhead plus a per-output-token delay, and optionally
+    a per-input-token (prompt processing) delay. Tokens are counted as words.
+    """
+
+    latency_seconds: float = 0.0
+    seconds_per_token: float = 0.0
+    seconds_per_input_token: float = 0.0
+    reply_words: int = 60
+
+    @property
+    def _llm_type(self) -> str:
+        return "deterministic-fake"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> ChatResult:
+        prompt = "\n".join(str(message.content) for message in messages)
+        digest = hashlib.sha256(prompt.encode()).hexdigest()
+        words = [digest[(7 * i) % 58:(7 * i) % 58 + 6] for i in range(self.reply_words)]
+        input_tokens = len(prompt.split())
+        time.sleep(self.latency_seconds + self.seconds_per_token * len(words) + self.seconds_per_input_token * input_tokens)
+        message = AIMessage(
+            content=" ".join(words),
+            usage_metadata={"input_tokens": input_tokens, "output_tokens": len(words), "total_tokens": input_tokens + len(words)},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,111 @@
+# benchmarks/fixtures.py
+"""Deterministic PDF fixtures for offline benchmarks."""
+
+import random
+import zlib
+from typing import List, Sequence, Tuple
+
+WORDS = (
+    "the contract party shall provide services under this agreement including payment terms "
+    "termination liability confidentiality data protection invoice schedule obligations revenue "
+    "growth quarter results analysis table figure section appendix 2024 12.5% approximately"
+).split()
+
+_LINE_WIDTH = 90
+_LINES_PER_PAGE = 60
+
+
+def make_vocabulary(size: int, seed: int = 0) -> List[str]:
+    """Distinct pseudo-words, for text whose sentences differ enough to be told apart by retrieval."""
+    rng = random.Random(seed)
+    syllables = [c + v for c in "bdfgklmnprstvz" for v in "aeiou"]
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_page_text(rng: random.Random, words_per_page: int, words: Sequence[str] = WORDS) -> str:
+    sentences = []
+    remaining = words_per_page
+    while remaining > 0:
+        length = min(remaining, rng.randint(6, 24))
+        sentences.append(" ".join(rng.choice(words) for _ in range(length)).capitalize() + ".")
+        remaining -= length
+    return " ".join(sentences)
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(text: str) -> List[str]:
+    lines, current = [], ""
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > _LINE_WIDTH:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        lines.append(current)
+    return lines[:_LINES_PER_PAGE]
+
+
+def make_pdf(n_pages: int, words_per_page: int = 450, seed: int = 0, compress: bool = False) -> bytes:
+    """Builds a minimal single-font PDF with n_pages of generated text."""
+    return make_pdf_with_text(n_pages, words_per_page, seed, compress)[0]
+
+
+def make_pdf_with_text(
+    n_pages: int, words_per_page: int = 450, seed: int = 0, compress: bool = False, words: Sequence[str] = WORDS
+) -> Tuple[bytes, List[str]]:
+    """
+    Like make_pdf, also returning the text drawn on each page as ground truth.
+    With compress, the page content streams are Flate-compressed, as in most real PDFs.
+    The text is drawn from words (the small contract vocabulary by default).
+    """
+    rng = random.Random(seed)
+    objects = []
+    page_ids = []
+    page_texts = []
+    font_id = 3
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for _ in range(n_pages):
+        lines = _wrap(make_page_text(rng, words_per_page, words))
+        page_texts.append("\n".join(lines))
+        stream = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_escape(line)}) Tj T*" for line in lines) + " ET"
+        stream_bytes = stream.encode("latin-1")
+        if compress:
+            stream_bytes = zlib.compress(stream_bytes)
+            objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream_bytes) + stream_bytes + b"\nendstream")
+        else:
+            objects.append(b"<< /Length %d >>\nstream\n" % len(stream_bytes) + stream_bytes + b"\nendstream")
+        content_id = len(objects) + 2
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (font_id, content_id)
+        )
+        page_ids.append(len(objects) + 2)
+
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids).encode()
+    all_objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % n_pages] + objects
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(all_objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(all_objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(all_objects) + 1, xref_offset)
+    return bytes(output), page_texts
+
+
+def make_file_data(sizes: List[int], seed: int = 0) -> List[dict]:
+    """Returns upload-shaped file dicts, one generated PDF per entry in sizes (pages)."""
+    return [
+        {"filename": f"fixture_{i}_{pages}p.pdf", "content": make_pdf(pages, seed=seed + i)}
+        for i, pages in enumerate(sizes)
+    ]
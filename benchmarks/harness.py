@@ -0,0 +1,116 @@
+# benchmarks/harness.py
+"""Shared wiring and timing helpers for the offline benchmarks."""
+
+import math
+import os
+import platform
+import subprocess
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import fakeredis
+
+from benchmarks.fakes import DeterministicChatModel, HashingEmbeddings
+
+
+class EphemeralChroma:
+    """Matches ChromaClientSingleton's shape (a `.client` attribute) with an in-process Chroma."""
+
+    def __init__(self):
+        import chromadb
+        self.client = chromadb.EphemeralClient()
+
+
+def build_offline_services(
+    llm_latency: float = 0.0, seconds_per_token: float = 0.0, seconds_per_input_token: float = 0.0,
+    embeddings=None, archive=None, staging=None,
+) -> Dict[str, object]:
+    """
+    Builds the real services on top of local stand-ins: SQLite, fakeredis
+    (with Lua scripting), an ephemeral Chroma, hashing embeddings (unless embeddings is given)
+    and a deterministic chat model. Each call gets its own Redis and database.
+    """
+    from backend.database import Base
+    from backend.services.chat_service import ChatService
+    from backend.services.database_service import DatabaseService
+    from backend.services.document_actions_service import DocumentActionsService
+    from backend.services.document_service import DocumentService
+    from backend.services.redis_cache_service import RedisCacheService
+    from backend.utils.model_loader import set_chat_model_factory
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    cache_service = RedisCacheService("localhost", 6379, 0)
+    cache_service.client = fakeredis.FakeStrictRedis(server=fakeredis.FakeServer())
+
+    db_service = DatabaseService(sessionmaker(autocommit=False, autoflush=False, bind=engine), cache_service)
+
+    set_chat_model_factory(lambda temperature: DeterministicChatModel(
+        latency_seconds=llm_latency, seconds_per_token=seconds_per_token, seconds_per_input_token=seconds_per_input_token
+    ))
+
+    return {
+        "db_service": db_service,
+        "cache_service": cache_service,
+        "document_service": DocumentService(db_service, cache_service, EphemeralChroma(), embeddings or HashingEmbeddings(), archive, staging),
+        "chat_service": ChatService(db_service),
+        "actions_service": DocumentActionsService(db_service, cache_service),
+    }
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class StageTimer:
+    """Collects wall-clock samples per stage and summarizes them as p50/p95/mean."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.units: Dict[str, float] = {}
+        self.unit_names: Dict[str, str] = {}
+
+    @contextmanager
+    def time(self, stage: str, units: float = 0.0, unit_name: str = ""):
+        start = time.perf_counter()
+        yield
+        self.samples.setdefault(stage, []).append(time.perf_counter() - start)
+        if unit_name:
+            self.units[stage] = self.units.get(stage, 0.0) + units
+            self.unit_names[stage] = unit_name
+
+    def summary(self) -> Dict[str, dict]:
+        result = {}
+        for stage, samples in self.samples.items():
+            stats = {
+                "n": len(samples),
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p95_ms": percentile(samples, 95) * 1000,
+                "mean_ms": sum(samples) / len(samples) * 1000,
+            }
+            if stage in self.unit_names:
+                stats[f"{self.unit_names[stage]}_per_second"] = self.units[stage] / sum(samples)
+            result[stage] = stats
+        return result
+
+
+def environment() -> dict:
+    """Identifies the run, so stored results can be compared over time."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor_count": os.cpu_count(),
+    }
@@ -0,0 +1,194 @@
+# benchmarks/load_test.py
+"""
+HTTP load test for one backend replica.
+
+Sends /ask-question/ and /process-pdfs/ requests at increasing concurrency
+levels and reports throughput, latency percentiles and error rates per
+endpoint and level as JSON. Run the backend against the mock LLM
+(benchmarks/mock_openai_server.py) to measure the backend rather than OpenAI.
+
+Questions are spread over --sessions sessions and are all distinct by default,
+so the run measures the LLM path rather than the per-session admission cap and
+request coalescing. Requests rejected with 429 are counted on their own and
+left out of the latency percentiles. Questions answered by coalescing are
+counted from /metrics; the server does not mark them, so with
+--repeated-questions, which cycles through a few fixed questions to measure
+coalescing, their latency is part of the percentiles.
+
+Usage: python -m benchmarks.load_test --base-url http://localhost:8000 \
+           --endpoints ask-question process-pdfs --concurrency 1 4 16 64 --requests 200 --sessions 16
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+import uuid
+from collections import Counter
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+from benchmarks.fixtures import make_file_data
+from benchmarks.harness import environment, percentile
+
+QUESTIONS = [
+    "What are the payment terms?",
+    "Summarize the termination clause.",
+    "How is confidentiality handled?",
+    "What revenue growth is reported for the quarter?",
+]
+
+# Label of each load-tested endpoint in doc_copilot_coalesced_requests_total.
+COALESCING_ENDPOINTS = {"ask-question": "ask_question"}
+
+
+async def wait_for_task(client: httpx.AsyncClient, task_id: str, timeout: float) -> str:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        state = (await client.get(f"/task-status/{task_id}")).json().get("state")
+        if state in ("SUCCESS", "FAILURE", "REVOKED"):
+            return state
+        await asyncio.sleep(0.5)
+    return "TIMEOUT"
+
+
+async def prepare_session(client: httpx.AsyncClient, file_data: list, timeout: float) -> str:
+    """Uploads the fixtures into a fresh session and waits until it can answer questions."""
+    session_id = str(uuid.uuid4())
+    response = await client.post(
+        "/process-pdfs/",
+        data={"session_id": session_id},
+        files=[("files", (file["filename"], file["content"], "application/pdf")) for file in file_data],
+    )
+    response.raise_for_status()
+    state = await wait_for_task(client, response.json()["task_id"], timeout)
+    if state != "SUCCESS":
+        raise RuntimeError(f"Fixture ingestion ended in state {state}.")
+    return session_id
+
+
+def ask_question_request(session_ids: list, distinct: bool = True):
+    """Round-robins over the sessions. Distinct questions are numbered across the whole run."""
+    numbers = itertools.count()
+
+    def build(i: int) -> dict:
+        question = QUESTIONS[i % len(QUESTIONS)]
+        if distinct:
+            question = f"{question} (question {next(numbers)})"
+        return {"method": "POST", "url": "/ask-question/", "json": {
+            "session_id": session_ids[i % len(session_ids)], "question": question, "language": "en",
+        }}
+    return build
+
+
+def process_pdfs_request(file_data: list):
+    def build(i: int) -> dict:
+        return {"method": "POST", "url": "/process-pdfs/", "data": {"session_id": str(uuid.uuid4())},
+                "files": [("files", (file["filename"], file["content"], "application/pdf")) for file in file_data]}
+    return build
+
+
+async def coalesced_followers(client: httpx.AsyncClient, endpoint: str):
+    """Requests for endpoint answered with another request's result so far, from /metrics (None if unavailable)."""
+    try:
+        response = await client.get("/metrics")
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return None
+    return sum(
+        sample.value
+        for family in text_string_to_metric_families(response.text)
+        if family.name == "doc_copilot_coalesced_requests"
+        for sample in family.samples
+        if sample.name.endswith("_total") and sample.labels == {"endpoint": endpoint, "role": "follower"}
+    )
+
+
+async def run_level(client: httpx.AsyncClient, build_request, concurrency: int, total: int, coalescing_endpoint: str = None) -> dict:
+    coalesced_before = coalescing_endpoint and await coalesced_followers(client, coalescing_endpoint)
+    latencies = []
+    statuses = Counter()
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await client.request(**build_request(i))
+                statuses[str(response.status_code)] += 1
+                if response.status_code < 400:
+                    latencies.append(time.perf_counter() - start)
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    rejected = statuses["429"]
+    errors = total - len(latencies) - rejected
+
+    result = {
+        "concurrency": concurrency,
+        "requests": total,
+        "throughput_rps": len(latencies) / elapsed,
+        "error_rate": errors / total,
+        "rejected_429": rejected,
+        "statuses": dict(statuses),
+    }
+    if coalescing_endpoint:
+        coalesced_after = await coalesced_followers(client, coalescing_endpoint)
+        coalesced = None if coalesced_before is None or coalesced_after is None else int(coalesced_after - coalesced_before)
+        result["coalesced"] = coalesced
+    if latencies:
+        result.update({f"p{q}_ms": percentile(latencies, q) * 1000 for q in (50, 95, 99)})
+    return result
+
+
+async def run(
+    base_url: str, endpoints: list, levels: list, total: int, pages: int, timeout: float, sessions: int = 16, distinct: bool = True
+) -> dict:
+    file_data = make_file_data([pages, pages])
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        builders = {}
+        if "ask-question" in endpoints:
+            session_ids = await asyncio.gather(*(prepare_session(client, file_data, timeout) for _ in range(sessions)))
+            builders["ask-question"] = ask_question_request(session_ids, distinct)
+        if "process-pdfs" in endpoints:
+            builders["process-pdfs"] = process_pdfs_request(file_data)
+
+        results = {}
+        for endpoint, build_request in builders.items():
+            results[endpoint] = [
+                await run_level(client, build_request, level, total, COALESCING_ENDPOINTS.get(endpoint)) for level in levels
+            ]
+    return {"environment": environment(), "base_url": base_url, "sessions": sessions, "distinct_questions": distinct, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--endpoints", nargs="+", choices=["ask-question", "process-pdfs"], default=["ask-question", "process-pdfs"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and concurrency level.")
+    parser.add_argument("--pages", type=int, default=10, help="Pages per uploaded fixture PDF.")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument(
+        "--sessions", type=int, default=16,
+        help="Sessions the questions are spread over; keep it above concurrency / LLM_MAX_CONCURRENCY_PER_SESSION.",
+    )
+    parser.add_argument(
+        "--repeated-questions", action="store_true",
+        help="Cycle through a few fixed questions, so identical in-flight requests are coalesced.",
+    )
+    args = parser.parse_args()
+    report = asyncio.run(run(
+        args.base_url, args.endpoints, args.concurrency, args.requests, args.pages, args.timeout, args.sessions, not args.repeated_questions
+    ))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
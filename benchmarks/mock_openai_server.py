@@ -0,0 +1,101 @@
+# benchmarks/mock_openai_server.py
+"""
+Local OpenAI-compatible chat-completions server with configurable latency.
+
+Point the backend at it to run load tests without calling OpenAI:
+    OPENAI_BASE_URL=http://localhost:9000/v1 OPENAI_API_KEY=mock
+
+Usage: python -m benchmarks.mock_openai_server --port 9000 --latency 0.5 --token-latency 0.01
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+settings = {"latency": 0.5, "token_latency": 0.01, "tokens": 80, "error_rate": 0.0}
+
+app = FastAPI()
+
+
+def _reply_tokens(messages: list) -> list:
+    prompt = json.dumps(messages, sort_keys=True)
+    digest = hashlib.sha256(prompt.encode()).hexdigest()
+    return [f" {digest[(7 * i) % 58:(7 * i) % 58 + 6]}" for i in range(settings["tokens"])]
+
+
+def _usage(messages: list, completion_tokens: int) -> dict:
+    prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in messages)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+
+@app.get("/v1/models")
+async def list_models():
+    return {"object": "list", "data": [{"id": "mock-gpt", "object": "model", "owned_by": "mock"}]}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if random.random() < settings["error_rate"]:
+        raise HTTPException(status_code=429, detail="Simulated rate limit.")
+
+    messages = body.get("messages", [])
+    model = body.get("model", "mock-gpt")
+    tokens = _reply_tokens(messages)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    await asyncio.sleep(settings["latency"])
+
+    if body.get("stream"):
+        async def events():
+            for token in tokens:
+                await asyncio.sleep(settings["token_latency"])
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {"role": "assistant", "content": token}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            final = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "usage": _usage(messages, len(tokens)),
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(settings["token_latency"] * len(tokens))
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens).strip()}, "finish_reason": "stop"}],
+        "usage": _usage(messages, len(tokens)),
+    }
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=settings["latency"], help="Seconds before the first token.")
+    parser.add_argument("--token-latency", type=float, default=settings["token_latency"], help="Seconds per generated token.")
+    parser.add_argument("--tokens", type=int, default=settings["tokens"], help="Tokens per reply.")
+    parser.add_argument("--error-rate", type=float, default=settings["error_rate"], help="Fraction of calls answered with 429.")
+    args = parser.parse_args()
+    settings.update(latency=args.latency, token_latency=args.token_latency, tokens=args.tokens, error_rate=args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,14 @@ import time
 import os
 from typing import List, Dict, Any
 
+from frontend.http_cache import ConditionalGetCache
 from frontend.text_strings import STRINGS
 
+@st.cache_resource
+def get_http_cache() -> ConditionalGetCache:
+    """One conditional-GET cache per frontend process, kept across reruns and sessions."""
+    return ConditionalGetCache()
+
 class AppSessionManager:
     """Manages the Streamlit app's state and core functionality."""
 
@@ -43,17 +49,14 @@ class AppSessionManager:
         
     def fetch_initial_data(self):
         """Fetches existing chat history and files from the backend on startup."""
+        http_cache = get_http_cache()
         try:
-            history_response = requests.get(f"{self.backend_url}/chat-history/{st.session_state.session_id}", timeout=300)
-            history_response.raise_for_status()
-            data = history_response.json()
+            data = http_cache.get_json(f"{self.backend_url}/chat-history/{st.session_state.session_id}", timeout=300)
             st.session_state.messages = data.get("messages", [])
             if st.session_state.messages:
                 st.session_state.is_processed = True
             
-            files_response = requests.get(f"{self.backend_url}/chat-files/{st.session_state.session_id}")
-            files_response.raise_for_status()
-            files_data = files_response.json()
+            files_data = http_cache.get_json(f"{self.backend_url}/chat-files/{st.session_state.session_id}")
             st.session_state.uploaded_filenames = files_data.get("files", [])
             
         except requests.exceptions.RequestException as e:
@@ -158,6 +161,11 @@ class FileUploaderComponent:
                     st.error(strings["processing_error"])
                     st.session_state.is_processing = False
                     break
+                elif state == "REVOKED":
+                    # Another upload to this chat replaced this one; its own task reports the result.
+                    st.warning(strings["processing_superseded"])
+                    st.session_state.is_processing = False
+                    break
                 
                 time.sleep(2)
 
@@ -0,0 +1,47 @@
+# frontend/http_cache.py
+
+import copy
+import threading
+from collections import OrderedDict
+
+import requests
+
+class ConditionalGetCache:
+    """
+    Keeps the last JSON body and ETag of each URL and revalidates them with If-None-Match,
+    so an unchanged resource costs a 304 instead of a full download. Shared by all sessions.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_json(self, url: str, **kwargs):
+        """Like requests.get(url, **kwargs).json(), raising for error statuses."""
+        with self._lock:
+            cached = self._entries.get(url)
+        headers = dict(kwargs.pop("headers", None) or {})
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
+        response = requests.get(url, headers=headers, **kwargs)
+        if response.status_code == 304 and cached:
+            with self._lock:
+                if url in self._entries:
+                    self._entries.move_to_end(url)
+            # Callers mutate what they get (e.g. append to the message list), never the cached copy.
+            return copy.deepcopy(cached[1])
+
+        response.raise_for_status()
+        data = response.json()
+        etag = response.headers.get("ETag")
+        with self._lock:
+            if etag:
+                self._entries[url] = (etag, copy.deepcopy(data))
+                self._entries.move_to_end(url)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.pop(url, None)
+        return data
@@ -11,6 +11,7 @@ STRINGS = {
         "processing_spinner": "Processing your documents...",
         "processing_success": "Documents processed successfully!",
         "processing_error": "An error occurred during processing. Please try again.",
+        "processing_superseded": "This upload was replaced by a newer upload to the same chat.",
         "welcome_message": "Welcome! Please upload a PDF to get started.",
         "chat_placeholder": "Ask a question about your documents...",
         "ai_thinking": "AI is thinking...",
@@ -39,6 +40,7 @@ STRINGS = {
         "processing_spinner": "Procesando sus documentos...",
         "processing_success": "¡Documentos procesados con éxito!",
         "processing_error": "Ocurrió un error durante el procesamiento. Por favor, inténtelo de nuevo.",
+        "processing_superseded": "Esta carga fue reemplazada por una carga más reciente en el mismo chat.",
         "welcome_message": "¡Bienvenido! Por favor, suba un PDF para comenzar.",
         "chat_placeholder": "Haga una pregunta sobre sus documentos...",
         "ai_thinking": "La IA está pensando...",
@@ -0,0 +1,33 @@
+# test/conftest.py
+
+# Imported first: sets the offline defaults (approx tokenizer, SQLite URL) before backend modules load.
+import benchmarks  # noqa: F401
+
+import uuid
+
+import pytest
+
+from backend.utils.session_archive import SessionArchive
+from backend.utils.upload_staging import UploadStaging
+from benchmarks.fixtures import make_pdf
+from benchmarks.harness import build_offline_services
+
+
+@pytest.fixture
+def services(tmp_path):
+    """The real services on fakeredis, SQLite, an ephemeral Chroma and the deterministic fakes."""
+    return build_offline_services(
+        archive=SessionArchive(str(tmp_path / "archive")), staging=UploadStaging(str(tmp_path / "staging"))
+    )
+
+
+@pytest.fixture
+def session_id(services):
+    session_id = str(uuid.uuid4())
+    services["db_service"].create_session(session_id, ["contract.pdf"])
+    return session_id
+
+
+@pytest.fixture
+def pdf_file():
+    return {"filename": "contract.pdf", "content": make_pdf(3, seed=1)}
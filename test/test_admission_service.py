@@ -0,0 +1,121 @@
+# test/test_admission_service.py
+
+import asyncio
+
+import fakeredis
+import pytest
+
+from backend.services import admission_service
+from backend.services.admission_service import AdmissionRejected, AdmissionService
+from backend.services.redis_cache_service import RedisCacheService
+
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    monkeypatch.setattr(admission_service, "LLM_MAX_CONCURRENCY", 2)
+    monkeypatch.setattr(admission_service, "LLM_MAX_CONCURRENCY_PER_SESSION", 2)
+    monkeypatch.setattr(admission_service, "LLM_MAX_QUEUE", 4)
+    monkeypatch.setattr(admission_service, "LLM_MAX_WAIT_SECONDS", 1.0)
+    return fakeredis.FakeServer()
+
+
+def make_service(server) -> AdmissionService:
+    cache_service = RedisCacheService("localhost", 6379, 0)
+    cache_service.client = fakeredis.FakeStrictRedis(server=server)
+    return AdmissionService(cache_service)
+
+
+def test_at_most_the_global_limit_runs_at_once(redis_server):
+    running, peak = 0, 0
+
+    async def request(session_id):
+        nonlocal running, peak
+        async with make_service(redis_server).slot("ask_question", session_id):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+
+    async def main():
+        await asyncio.gather(*(request(f"session-{i}") for i in range(4)))
+
+    asyncio.run(main())
+    assert peak == 2
+    client = fakeredis.FakeStrictRedis(server=redis_server)
+    assert client.zcard(admission_service.SLOTS_KEY) == 0
+    assert client.zcard(admission_service.QUEUE_KEY) == 0
+
+
+def test_full_queue_is_rejected_with_retry_after(redis_server, monkeypatch):
+    monkeypatch.setattr(admission_service, "LLM_MAX_QUEUE", 0)
+
+    async def main():
+        async with make_service(redis_server).slot("ask_question", "session"):
+            pass
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        asyncio.run(main())
+    assert rejected.value.status_code == 429
+    assert rejected.value.reason == "queue_full"
+    assert int(rejected.value.headers["Retry-After"]) >= 1
+
+
+def test_cancelled_waiter_leaves_the_queue(redis_server):
+    client = fakeredis.FakeStrictRedis(server=redis_server)
+
+    async def hold(session_id, release):
+        async with make_service(redis_server).slot("ask_question", session_id):
+            await release.wait()
+
+    async def main():
+        release = asyncio.Event()
+        holders = [asyncio.create_task(hold(f"holder-{i}", release)) for i in range(2)]
+        await asyncio.sleep(0.1)
+        waiter = asyncio.create_task(hold("waiter", release))
+        await asyncio.sleep(0.1)
+        assert client.zcard(admission_service.QUEUE_KEY) == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert client.zcard(admission_service.QUEUE_KEY) == 0
+        release.set()
+        await asyncio.gather(*holders)
+
+    asyncio.run(main())
+    assert client.zcard(admission_service.SLOTS_KEY) == 0
+
+
+def test_requests_are_admitted_when_redis_is_down(redis_server, monkeypatch):
+    service = make_service(redis_server)
+
+    def unavailable(*args, **kwargs):
+        raise ConnectionError("Redis is down")
+
+    monkeypatch.setattr(service.client, "register_script", lambda script: unavailable)
+    admitted = []
+
+    async def main():
+        async with service.slot("ask_question", "session"):
+            admitted.append(True)
+
+    asyncio.run(main())
+    assert admitted == [True]
+
+
+def test_batch_takes_the_free_slots_without_passing_waiters(redis_server, monkeypatch):
+    monkeypatch.setattr(admission_service, "LLM_MAX_CONCURRENCY", 3)
+    monkeypatch.setattr(admission_service, "LLM_MAX_CONCURRENCY_PER_SESSION", 3)
+    client = fakeredis.FakeStrictRedis(server=redis_server)
+
+    async def main():
+        service = make_service(redis_server)
+        async with service.slots("ask_batch", "batch", 4) as held:
+            assert held == 3
+            assert client.zcard(admission_service.SLOTS_KEY) == 3
+        async with service.slot("ask_question", "holder"):
+            async with service.slots("ask_batch", "batch", 4) as held:
+                assert held == 2
+
+    asyncio.run(main())
+    assert client.zcard(admission_service.SLOTS_KEY) == 0
+    assert client.zcard(admission_service.QUEUE_KEY) == 0
@@ -0,0 +1,142 @@
+# test/test_coalescing_service.py
+
+import asyncio
+import threading
+import time
+
+import fakeredis
+import pytest
+
+from backend.services import coalescing_service
+from backend.services.coalescing_service import CoalescingService
+from backend.services.redis_cache_service import RedisCacheService
+
+FILES = [{"filename": "contract.pdf", "sha256": "00" * 32, "size": 10}]
+
+
+@pytest.fixture
+def service():
+    cache_service = RedisCacheService("localhost", 6379, 0)
+    cache_service.client = fakeredis.FakeStrictRedis(server=fakeredis.FakeServer())
+    return CoalescingService(cache_service)
+
+
+def ingest_ttl(service):
+    return service.client.ttl(service._ingest_key("session", FILES))
+
+
+def test_ingest_is_reserved_briefly_until_its_task_is_published(service):
+    task_id, is_duplicate = service.claim_ingest("session", FILES, is_running=lambda task_id: True)
+    assert not is_duplicate
+    assert ingest_ttl(service) <= coalescing_service.INGEST_RESERVATION_SECONDS
+
+    assert service.claim_ingest("session", FILES, is_running=lambda task_id: True) == (task_id, True)
+
+    service.confirm_ingest("session", FILES, task_id)
+    assert ingest_ttl(service) > coalescing_service.INGEST_RESERVATION_SECONDS
+
+
+def test_finished_ingest_is_replaced(service):
+    first, _ = service.claim_ingest("session", FILES, is_running=lambda task_id: True)
+    second, is_duplicate = service.claim_ingest("session", FILES, is_running=lambda task_id: False)
+
+    assert not is_duplicate and second != first
+    assert service.client.get(service._ingest_key("session", FILES)).decode() == second
+
+
+def test_concurrent_replacements_of_a_finished_ingest_elect_one_task(service):
+    finished, _ = service.claim_ingest("session", FILES, is_running=lambda task_id: True)
+    claimed = {}
+
+    def is_running(task_id):
+        if task_id == finished:
+            # Another request replaces the finished upload between our read and our write.
+            claimed["other"] = service.claim_ingest("session", FILES, is_running=lambda task_id: False)[0]
+            return False
+        return True
+
+    task_id, is_duplicate = service.claim_ingest("session", FILES, is_running=is_running)
+
+    assert is_duplicate and task_id == claimed["other"]
+
+
+def test_followers_take_over_quickly_from_a_crashed_leader(service, monkeypatch):
+    monkeypatch.setattr(coalescing_service, "SINGLE_FLIGHT_LOCK_SECONDS", 0.3)
+    monkeypatch.setattr(coalescing_service, "LEADER_CHECK_SECONDS", 0.05)
+    key = coalescing_service.coalescing_key("ask_question", "session", {"q": "x"}, 1)
+    # A leader that died right after taking its lock never refreshes it.
+    service.client.set(f"singleflight:lock:{key}", "dead-leader", px=300)
+
+    async def answer():
+        return {"answer": "recomputed"}
+
+    start = time.monotonic()
+    result = asyncio.run(service.run("ask_question", "session", {"q": "x"}, 1, answer))
+
+    assert result == {"answer": "recomputed"}
+    assert time.monotonic() - start < 2
+
+
+def test_live_leader_keeps_its_lock_past_the_ttl(service, monkeypatch):
+    monkeypatch.setattr(coalescing_service, "SINGLE_FLIGHT_LOCK_SECONDS", 0.3)
+    monkeypatch.setattr(coalescing_service, "LEADER_CHECK_SECONDS", 0.05)
+    calls = []
+
+    async def answer():
+        calls.append(1)
+        await asyncio.sleep(1.0)
+        return {"answer": "once"}
+
+    async def main():
+        leader = asyncio.create_task(service.run("ask_question", "session", {"q": "x"}, 1, answer))
+        await asyncio.sleep(0.05)
+        follower = asyncio.create_task(service.run("ask_question", "session", {"q": "x"}, 1, answer))
+        return await asyncio.gather(leader, follower)
+
+    assert asyncio.run(main()) == [{"answer": "once"}, {"answer": "once"}]
+    assert calls == [1]
+
+
+def test_follower_of_a_new_leader_ignores_an_earlier_result(service):
+    key = coalescing_service.coalescing_key("ask_question", "session", {"q": "x"}, 1)
+    lock_key = f"singleflight:lock:{key}"
+    # An earlier leader finished and left its result; a new leader holds the lock.
+    service._publish(key, lock_key, "earlier-leader", {"result": {"answer": "stale"}})
+    service.client.set(lock_key, "new-leader", px=10_000)
+
+    async def answer():
+        raise AssertionError("the follower must wait for the new leader")
+
+    async def main():
+        follower = asyncio.create_task(service.run("ask_question", "session", {"q": "x"}, 1, answer))
+        await asyncio.sleep(0.2)
+        service._publish(key, lock_key, "new-leader", {"result": {"answer": "fresh"}})
+        return await follower
+
+    assert asyncio.run(main()) == {"answer": "fresh"}
+
+
+def test_redis_is_not_called_on_the_event_loop(service, monkeypatch):
+    loop_thread = threading.get_ident()
+    on_loop = []
+    execute_command = service.client.execute_command
+
+    def recording_execute_command(*args, **kwargs):
+        if threading.get_ident() == loop_thread:
+            on_loop.append(args[0])
+        return execute_command(*args, **kwargs)
+
+    monkeypatch.setattr(service.client, "execute_command", recording_execute_command)
+
+    async def answer():
+        await asyncio.sleep(0.3)
+        return {"answer": "once"}
+
+    async def main():
+        leader = asyncio.create_task(service.run("ask_question", "session", {"q": "x"}, 1, answer))
+        await asyncio.sleep(0.05)
+        follower = asyncio.create_task(service.run("ask_question", "session", {"q": "x"}, 1, answer))
+        return await asyncio.gather(leader, follower)
+
+    assert asyncio.run(main()) == [{"answer": "once"}, {"answer": "once"}]
+    assert on_loop == []
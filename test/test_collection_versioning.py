@@ -0,0 +1,120 @@
+# test/test_collection_versioning.py
+
+import threading
+
+import pytest
+
+from benchmarks.fixtures import make_pdf
+
+
+def collection_names(services):
+    return {collection.name for collection in services["document_service"].chroma_client.client.list_collections()}
+
+
+@pytest.fixture
+def reingested(services, session_id, pdf_file):
+    """A session ingested once, and the file for a second upload with different content."""
+    services["document_service"].process_documents(session_id, [pdf_file])
+    return {"filename": "contract.pdf", "content": make_pdf(2, seed=2)}
+
+
+def test_old_collection_serves_until_the_pointer_swap(services, session_id, reingested, monkeypatch):
+    document_service, db_service = services["document_service"], services["db_service"]
+    old_version, old_name = document_service.get_collection_pointer(session_id)
+    old_ids = sorted(document_service.get_vector_store(session_id).get()["ids"])
+    swap = db_service.swap_collection_pointer
+    seen_before_swap = {}
+
+    def checked_swap(session_id, version, collection_name):
+        # The new collection is complete, and queries still go to the old one.
+        seen_before_swap["serving"] = document_service.get_vector_store(session_id)._collection.name
+        seen_before_swap["new_count"] = document_service.chroma_client.client.get_collection(collection_name).count()
+        return swap(session_id, version, collection_name)
+
+    monkeypatch.setattr(db_service, "swap_collection_pointer", checked_swap)
+    retired = []
+    result = document_service.commit_documents(
+        session_id, [document_service.prepare_file(session_id, reingested)], drop_retired=lambda sid, name: retired.append(name)
+    )
+
+    assert seen_before_swap["serving"] == old_name
+    assert seen_before_swap["new_count"] > 0
+    new_version, new_name = document_service.get_collection_pointer(session_id)
+    assert result["collection_version"] == new_version > old_version
+    assert document_service.get_vector_store(session_id)._collection.name == new_name
+    assert sorted(document_service.get_vector_store(session_id).get()["ids"]) != old_ids
+    assert retired == [old_name]
+
+
+def test_stale_version_cannot_replace_a_newer_pointer(services, session_id):
+    db_service = services["db_service"]
+
+    assert db_service.swap_collection_pointer(session_id, 1, "c_v1") == (True, None)
+    assert db_service.swap_collection_pointer(session_id, 3, "c_v3") == (True, "c_v1")
+    assert db_service.swap_collection_pointer(session_id, 2, "c_v2") == (False, None)
+    assert db_service.get_collection_pointer(session_id) == (3, "c_v3")
+
+
+def test_retired_collection_is_dropped_after_the_delay(services, session_id, reingested, monkeypatch):
+    from backend import tasks
+
+    document_service = services["document_service"]
+    _, old_name = document_service.get_collection_pointer(session_id)
+    scheduled = []
+    monkeypatch.setattr(tasks.drop_collection_task, "apply_async", lambda args, countdown: scheduled.append((args, countdown)))
+
+    document_service.commit_documents(
+        session_id, [document_service.prepare_file(session_id, reingested)], drop_retired=tasks.schedule_collection_drop
+    )
+
+    assert scheduled == [((session_id, old_name), tasks.COLLECTION_DROP_DELAY_SECONDS)]
+    # Queries that opened the old collection before the swap can still finish.
+    assert old_name in collection_names(services)
+
+    document_service.drop_collection(*scheduled[0][0])
+    assert old_name not in collection_names(services)
+
+
+def test_collection_in_use_is_never_dropped(services, session_id, pdf_file):
+    document_service = services["document_service"]
+    document_service.process_documents(session_id, [pdf_file])
+    _, current_name = document_service.get_collection_pointer(session_id)
+
+    document_service.drop_collection(session_id, current_name)
+
+    assert current_name in collection_names(services)
+
+
+def test_evicted_session_is_rehydrated_once_under_concurrent_reads(services, session_id, pdf_file, monkeypatch):
+    from backend.services import document_service as document_service_module
+
+    monkeypatch.setattr(document_service_module, "SESSION_IDLE_TTL_SECONDS", 60)
+    document_service = services["document_service"]
+    document_service.process_documents(session_id, [pdf_file])
+    chunk_ids = sorted(document_service.get_vector_store(session_id).get()["ids"])
+    last_access = document_service.cache_service.get_score(document_service_module.LAST_ACCESS_KEY, session_id)
+    assert document_service.collect_idle_sessions(now=last_access + 120)["evicted"] == [session_id]
+
+    rehydrations = []
+    rehydrate = document_service._rehydrate_locked
+
+    def counted_rehydrate(session_id):
+        rehydrations.append(session_id)
+        return rehydrate(session_id)
+
+    monkeypatch.setattr(document_service, "_rehydrate_locked", counted_rehydrate)
+    start = threading.Barrier(4)
+    found = []
+
+    def read():
+        start.wait()
+        found.append(sorted(document_service.get_vector_store(session_id).get()["ids"]))
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+
+    assert rehydrations == [session_id]
+    assert found == [chunk_ids] * 4
@@ -0,0 +1,36 @@
+# test/test_database_service.py
+
+import asyncio
+import json
+
+import pytest
+
+from backend.main import get_chat_files, get_chat_history_endpoint
+
+NOT_A_UUID = "not-a-uuid"
+
+
+def test_lookups_of_a_malformed_session_id_find_nothing(services):
+    db_service = services["db_service"]
+
+    assert db_service.get_session(NOT_A_UUID) is None
+    assert db_service.get_collection_pointer(NOT_A_UUID) is None
+    db_service.update_uploaded_files(NOT_A_UUID, ["contract.pdf"])
+    db_service.delete_session(NOT_A_UUID)
+
+
+def test_creating_a_session_still_requires_a_uuid(services):
+    with pytest.raises(ValueError):
+        services["db_service"].create_session(NOT_A_UUID, ["contract.pdf"])
+
+
+def test_read_endpoints_answer_empty_for_a_malformed_session_id(services):
+    files = get_chat_files(NOT_A_UUID, if_none_match=None, db_service=services["db_service"])
+    history = asyncio.run(
+        get_chat_history_endpoint(
+            NOT_A_UUID, if_none_match=None, db_service=services["db_service"], doc_service=services["document_service"]
+        )
+    )
+
+    assert (files.status_code, json.loads(files.body)) == (200, {"files": []})
+    assert (history.status_code, json.loads(history.body)) == (200, {"messages": []})
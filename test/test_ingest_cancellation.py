@@ -0,0 +1,104 @@
+# test/test_ingest_cancellation.py
+
+import pytest
+
+from backend.components import document_processor
+
+
+class RacingEmbeddings:
+    """Wraps the embeddings; a newer upload claims the session after the first embedding batch."""
+
+    def __init__(self, embeddings, supersede):
+        self.embeddings = embeddings
+        self.supersede = supersede
+        self.batches = 0
+
+    def embed_documents(self, texts):
+        self.batches += 1
+        if self.batches == 1:
+            self.supersede()
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+
+def collection_names(services):
+    return {collection.name for collection in services["document_service"].chroma_client.client.list_collections()}
+
+
+def staged_chunk_keys(services, session_id):
+    return services["document_service"].cache_service.client.keys(f"ingest_staging:{session_id}:*")
+
+
+@pytest.fixture
+def ingested(services, session_id, pdf_file):
+    """A session with a committed collection, so a superseded upload has something to leave alone."""
+    services["document_service"].process_documents(session_id, [pdf_file])
+    return services["document_service"].get_collection_pointer(session_id)
+
+
+def staged_upload(services, pdf_file):
+    name = services["document_service"].staging.stage([pdf_file["content"]])
+    return {"filename": pdf_file["filename"], "content_path": name}
+
+
+def test_upload_superseded_while_embedding_stops_and_removes_its_file(services, session_id, pdf_file, monkeypatch):
+    document_service = services["document_service"]
+    monkeypatch.setattr(document_processor, "INGEST_EMBED_BATCH_SIZE", 1)
+    embeddings = RacingEmbeddings(document_service.embeddings, lambda: document_service.claim_ingest_task(session_id, "newer"))
+    monkeypatch.setattr(document_service, "embeddings", embeddings)
+    document_service.claim_ingest_task(session_id, "older")
+    file = staged_upload(services, pdf_file)
+
+    result = document_service.prepare_file(session_id, file, ingest_task_id="older")
+
+    assert result == {"filename": "contract.pdf", "status": "superseded"}
+    assert embeddings.batches == 1
+    assert document_service.staging.read(file["content_path"]) is None
+    assert staged_chunk_keys(services, session_id) == []
+
+
+def test_upload_superseded_before_its_commit_discards_its_staged_chunks(services, session_id, pdf_file, ingested):
+    document_service = services["document_service"]
+    document_service.claim_ingest_task(session_id, "older")
+    prepared = document_service.prepare_file(session_id, staged_upload(services, pdf_file), ingest_task_id="older")
+    assert prepared["status"] == "ok"
+    collections = collection_names(services)
+
+    document_service.claim_ingest_task(session_id, "newer")
+    result = document_service.commit_documents(session_id, [prepared], ingest_task_id="older")
+
+    assert result["status"] == "superseded"
+    assert staged_chunk_keys(services, session_id) == []
+    assert collection_names(services) == collections
+    assert document_service.get_collection_pointer(session_id) == ingested
+
+
+def test_upload_superseded_while_storing_drops_its_partial_collection(services, session_id, pdf_file, ingested, monkeypatch):
+    document_service = services["document_service"]
+    document_service.claim_ingest_task(session_id, "older")
+    prepared = document_service.prepare_file(session_id, staged_upload(services, pdf_file), ingest_task_id="older")
+    collections = collection_names(services)
+    monkeypatch.setattr(document_service.chroma_client.client, "get_max_batch_size", lambda: 1)
+    store = document_processor.store_embedded_chunks
+    batches = []
+
+    def racing_store(*args, check_cancelled, **kwargs):
+        def check():
+            if batches:
+                # A newer upload claims the session after the first Chroma batch is written.
+                document_service.claim_ingest_task(session_id, "newer")
+            batches.append(1)
+            check_cancelled()
+
+        return store(*args, check_cancelled=check, **kwargs)
+
+    monkeypatch.setattr(document_processor, "store_embedded_chunks", racing_store)
+    result = document_service.commit_documents(session_id, [prepared], ingest_task_id="older")
+
+    assert result["status"] == "superseded"
+    assert len(batches) == 2 < prepared["chunks"]
+    assert staged_chunk_keys(services, session_id) == []
+    assert collection_names(services) == collections
+    assert document_service.get_collection_pointer(session_id) == ingested
@@ -0,0 +1,70 @@
+# test/test_pdf_extractors.py
+
+import subprocess
+import sys
+import time
+
+import pytest
+
+from backend.components import pdf_extractors
+from backend.components.pdf_extractors import EXTRACTORS, ExtractionTimeout, extract_pdf_pages
+from benchmarks.fixtures import make_pdf
+
+
+class StuckWorker(pdf_extractors._ExtractionWorker):
+    """A worker whose backend never returns, e.g. stuck inside one page in native code."""
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-c", "import sys, time; sys.stdin.buffer.read(1); time.sleep(60)"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        )
+
+
+@pytest.fixture(autouse=True)
+def fresh_workers(monkeypatch):
+    monkeypatch.setattr(pdf_extractors, "_idle_workers", [])
+
+
+def test_workers_are_reused_across_files():
+    content = make_pdf(3, seed=1)
+
+    assert len(EXTRACTORS["PyPDF2"].extract_pages(content, timeout=30)) == 3
+    worker, = pdf_extractors._idle_workers
+    assert len(EXTRACTORS["PyPDF2"].extract_pages(content, timeout=30)) == 3
+    assert pdf_extractors._idle_workers == [worker]
+
+
+def test_backend_errors_keep_the_worker():
+    with pytest.raises(RuntimeError, match="PdfReadError|EOF"):
+        EXTRACTORS["PyPDF2"].extract_pages(b"%PDF-1.4 not really a pdf", timeout=30)
+
+    assert len(pdf_extractors._idle_workers) == 1
+
+
+def test_stuck_backend_is_killed_at_the_deadline(monkeypatch):
+    workers = []
+
+    def start_worker():
+        workers.append(StuckWorker())
+        return workers[-1]
+
+    monkeypatch.setattr(pdf_extractors, "_ExtractionWorker", start_worker)
+
+    start = time.monotonic()
+    with pytest.raises(ExtractionTimeout):
+        EXTRACTORS["PyPDF2"].extract_pages(make_pdf(1, seed=1), timeout=0.5)
+
+    assert time.monotonic() - start < 5
+    assert workers[0].process.returncode is not None
+    assert pdf_extractors._idle_workers == []
+
+
+def test_timed_out_backend_falls_back_to_the_next(monkeypatch):
+    monkeypatch.setattr(pdf_extractors, "PDF_EXTRACTOR", "pypdfium2,PyPDF2")
+    monkeypatch.setattr(pdf_extractors, "PDF_EXTRACT_TIMEOUT_SECONDS", 0.5)
+    real_worker = pdf_extractors._ExtractionWorker
+    workers = iter([StuckWorker, real_worker])
+    monkeypatch.setattr(pdf_extractors, "_ExtractionWorker", lambda: next(workers)())
+
+    assert len(extract_pdf_pages(make_pdf(3, seed=1), "contract.pdf")) == 3
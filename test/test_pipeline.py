@@ -0,0 +1,113 @@
+# test/test_pipeline.py
+
+from backend.services import document_actions_service
+
+
+def test_process_documents_stores_page_chunks(services, session_id, pdf_file):
+    result = services["document_service"].process_documents(session_id, [pdf_file])
+
+    assert result["status"] == "complete"
+    assert result["failed_files"] == []
+    vector_store = services["document_service"].get_vector_store(session_id)
+    metadatas = vector_store.get()["metadatas"]
+    assert metadatas
+    assert {metadata["filename"] for metadata in metadatas} == {"contract.pdf"}
+    assert {metadata["page"] for metadata in metadatas} == {1, 2, 3}
+    assert services["document_service"].get_filenames(session_id) == ["contract.pdf"]
+
+
+def test_get_answer_is_deterministic(services, session_id, pdf_file):
+    services["document_service"].process_documents(session_id, [pdf_file])
+    vector_store = services["document_service"].get_vector_store(session_id)
+
+    first = services["chat_service"].get_answer(vector_store, "What are the payment terms?", session_id, "en")
+    second = services["chat_service"].get_answer(vector_store, "What are the payment terms?", session_id, "en")
+
+    assert first and first == second
+
+
+def test_action_results_are_cached_per_collection_version(services, session_id, pdf_file):
+    document_service, actions = services["document_service"], services["actions_service"]
+    document_service.process_documents(session_id, [pdf_file])
+    version = document_service.get_collection_version(session_id)
+
+    assert actions.get_cached_result("summarize", session_id, ["contract.pdf"], "en", version) is None
+    actions.cache_result("summarize", session_id, ["contract.pdf"], "en", version, "summary")
+
+    assert actions.get_cached_result("summarize", session_id, ["contract.pdf"], "en", version) == "summary"
+    assert actions.get_cached_result("summarize", session_id, ["contract.pdf"], "en", version + 1) is None
+
+
+def test_action_cache_evicts_least_recently_used(services, session_id, monkeypatch):
+    monkeypatch.setattr(document_actions_service, "ACTION_CACHE_MAX_ENTRIES", 2)
+    actions = services["actions_service"]
+    for version in (1, 2):
+        actions.cache_result("classify", session_id, None, "en", version, f"topics {version}")
+    # Reading version 1 makes version 2 the least recently used entry.
+    assert actions.get_cached_result("classify", session_id, None, "en", 1) == "topics 1"
+    actions.cache_result("classify", session_id, None, "en", 3, "topics 3")
+
+    assert actions.get_cached_result("classify", session_id, None, "en", 2) is None
+    assert actions.get_cached_result("classify", session_id, None, "en", 1) == "topics 1"
+    assert actions.get_cached_result("classify", session_id, None, "en", 3) == "topics 3"
+
+
+def test_idle_sessions_are_evicted_and_rehydrated(services, session_id, pdf_file, monkeypatch):
+    from backend.services import document_service as document_service_module
+
+    monkeypatch.setattr(document_service_module, "SESSION_IDLE_TTL_SECONDS", 60)
+    document_service = services["document_service"]
+    document_service.process_documents(session_id, [pdf_file])
+    chunk_ids = sorted(document_service.get_vector_store(session_id).get()["ids"])
+    last_access = document_service.cache_service.get_score(document_service_module.LAST_ACCESS_KEY, session_id)
+
+    assert document_service.collect_idle_sessions(now=last_access + 30)["evicted"] == []
+    assert document_service.collect_idle_sessions(now=last_access + 120)["evicted"] == [session_id]
+    assert not document_service.cache_service.get_flag(f"vector_store_ready:{session_id}")
+
+    vector_store = document_service.get_vector_store(session_id)
+    assert sorted(vector_store.get()["ids"]) == chunk_ids
+
+
+def test_batch_question_with_failed_rewrite_is_not_answered(services, session_id, pdf_file):
+    from backend.utils.model_loader import set_chat_model_factory
+    from benchmarks.fakes import DeterministicChatModel
+
+    class FailingRewriteModel(DeterministicChatModel):
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            prompt = "\n".join(str(message.content) for message in messages)
+            if "Follow-Up Question: broken" in prompt:
+                raise RuntimeError("rewrite failed")
+            return super()._generate(messages, stop, run_manager, **kwargs)
+
+    document_service, db_service = services["document_service"], services["db_service"]
+    document_service.process_documents(session_id, [pdf_file])
+    db_service.add_messages(session_id, [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}])
+    set_chat_model_factory(lambda temperature: FailingRewriteModel())
+
+    response = services["chat_service"].get_batch_answers(
+        document_service.get_vector_store(session_id), ["broken", "What are the payment terms?"], session_id, "en",
+        write_history=True,
+    )
+
+    failed, answered = response["answers"]
+    assert failed["error"] == "rewrite failed" and failed["answer"] is None
+    assert "answer_ms" not in failed["timings"]
+    assert answered["answer"] and "error" not in answered
+    assert [message["content"] for message in db_service.get_chat_history(session_id)][2:] == [
+        "What are the payment terms?", answered["answer"],
+    ]
+
+
+def test_staged_upload_is_read_from_the_shared_directory_and_removed(services, session_id, pdf_file):
+    document_service = services["document_service"]
+
+    class Upload:
+        def chunks(self):
+            yield pdf_file["content"]
+
+    content_path = document_service.stage_upload(Upload())
+    result = document_service.prepare_file(session_id, {"filename": "contract.pdf", "content_path": content_path})
+
+    assert result["status"] == "ok"
+    assert document_service.staging.read(content_path) is None
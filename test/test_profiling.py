@@ -0,0 +1,79 @@
+# test/test_profiling.py
+
+import asyncio
+import marshal
+import time
+
+import pytest
+from starlette.concurrency import run_in_threadpool as starlette_run_in_threadpool
+
+from backend.utils import profiling
+from backend.utils.profiling import profile_block, profiled_in_thread, requested_profile_mode, run_in_threadpool, track_profiled_tasks
+
+
+def spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def profiled_work():
+    spin(0.2)
+
+
+def other_work():
+    spin(0.2)
+
+
+@profiled_in_thread
+def sync_endpoint():
+    spin(0.2)
+
+
+async def other_request():
+    # Blocks the loop and the threadpool while the profiled request is running.
+    await asyncio.sleep(0.01)
+    spin(0.1)
+    await run_in_threadpool(other_work)
+
+
+async def profile_request(mode, work):
+    track_profiled_tasks(asyncio.get_running_loop())
+    other = asyncio.create_task(other_request())
+    with profile_block(mode) as result:
+        # Like BaseHTTPMiddleware, the endpoint runs in a task of its own.
+        await asyncio.create_task(work())
+    await other
+    return result
+
+
+def function_names(result):
+    if result.mode == "cprofile":
+        return {name for _, _, name in marshal.loads(result.data)}
+    return set(result.data.decode().replace(";", " ").split())
+
+
+@pytest.mark.parametrize("mode", ["sample", "cprofile"])
+def test_threadpool_work_is_profiled_and_other_requests_are_not(mode):
+    result = asyncio.run(profile_request(mode, lambda: run_in_threadpool(profiled_work)))
+
+    names = function_names(result)
+    assert "profiled_work" in names
+    assert "other_work" not in names
+    assert "other_request" not in names
+
+
+@pytest.mark.parametrize("mode", ["sample", "cprofile"])
+def test_sync_endpoints_are_profiled(mode):
+    # FastAPI runs sync endpoints with starlette's own run_in_threadpool.
+    result = asyncio.run(profile_request(mode, lambda: starlette_run_in_threadpool(sync_endpoint)))
+
+    assert "sync_endpoint" in function_names(result)
+
+
+def test_admin_token_is_only_accepted_in_its_header(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_ADMIN_TOKEN", "secret")
+
+    assert requested_profile_mode({"x-profile": "cprofile", "x-admin-token": "secret"}, {}) == "cprofile"
+    assert requested_profile_mode({}, {"profile": "sample", "admin_token": "secret"}) is None
+    assert requested_profile_mode({"x-admin-token": "secret"}, {"profile": "sample"}) == "sample"
@@ -0,0 +1,14 @@
+# test/test_startup_time.py
+
+import os
+
+from benchmarks import bench_import_time
+
+
+def test_app_imports_within_budget_and_without_heavy_dependencies():
+    # The fastest of three fresh interpreters, as in the CLI check.
+    report = bench_import_time.run(top=10, repeat=3)
+    budget_ms = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "300"))
+
+    assert report["forbidden_modules_loaded"] == []
+    assert report["app_ms"] <= budget_ms, report["slowest"]
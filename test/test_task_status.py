@@ -0,0 +1,44 @@
+# test/test_task_status.py
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from celery.exceptions import TaskRevokedError
+
+from backend import tasks
+from backend.main import get_task_status
+
+
+def task_status(monkeypatch, state, info):
+    monkeypatch.setattr(tasks.process_documents_task, "AsyncResult", lambda task_id: SimpleNamespace(state=state, info=info))
+    return asyncio.run(get_task_status("task"))
+
+
+def test_revoked_upload_is_reported_as_superseded(monkeypatch):
+    assert task_status(monkeypatch, "REVOKED", TaskRevokedError("revoked")) == {"state": "REVOKED", "status": "superseded"}
+
+
+def test_upload_stopped_while_running_is_reported_as_superseded(monkeypatch):
+    result = {"status": "superseded", "session_id": "session", "failed_files": []}
+
+    assert task_status(monkeypatch, "SUCCESS", result) == {"state": "REVOKED", "status": "superseded"}
+
+
+@pytest.mark.parametrize(
+    "state, info, expected",
+    [
+        ("PENDING", None, {"state": "PENDING", "status": "Pending..."}),
+        ("STARTED", {"pid": 1}, {"state": "STARTED", "status": "Processing...", "result": None}),
+        ("RETRY", ValueError("retrying"), {"state": "RETRY", "status": "Processing...", "result": None}),
+        ("FAILURE", ValueError("broken"), {"state": "FAILURE", "status": "broken"}),
+    ],
+)
+def test_other_states(monkeypatch, state, info, expected):
+    assert task_status(monkeypatch, state, info) == expected
+
+
+def test_completed_upload_returns_its_result(monkeypatch):
+    result = {"status": "complete", "session_id": "session", "collection_version": 2, "failed_files": []}
+
+    assert task_status(monkeypatch, "SUCCESS", result) == {"state": "SUCCESS", "status": "complete", "result": result}
@@ -0,0 +1,46 @@
+# test/test_token_chunker.py
+
+from backend.components.token_chunker import create_page_chunks, get_tokenizer, split_page
+
+
+def test_chunks_respect_the_token_budget_and_overlap():
+    page = " ".join(f"word{i}" for i in range(2000))
+
+    spans = split_page(page, chunk_tokens=100, overlap_tokens=20)
+
+    assert len(spans) > 1
+    assert all(count <= 100 for _, _, count in spans)
+    # Consecutive chunks overlap, and together they cover the whole page.
+    assert all(next_start < end for (_, end, _), (next_start, _, _) in zip(spans, spans[1:]))
+    assert spans[0][0] == 0 and spans[-1][1] == len(page)
+
+
+def test_words_longer_than_a_chunk_are_split_by_tokens():
+    page = "intro " + "x" * 20000 + " outro"
+
+    spans = split_page(page, chunk_tokens=100, overlap_tokens=20)
+
+    counts = get_tokenizer().count_batch([page[start:end] for start, end, _ in spans])
+    assert max(counts) <= 100
+    assert "".join(page[start:end] for start, end, _ in spans).replace(" ", "") == page.replace(" ", "")
+
+
+def test_text_without_spaces_is_chunked():
+    page = "漢字仮名交じり文" * 2000
+
+    spans = split_page(page, chunk_tokens=100, overlap_tokens=20)
+
+    assert len(spans) > 1
+    assert all(count <= 100 for _, _, count in spans)
+
+
+def test_chunk_metadata_points_into_the_page():
+    pages = ["first page text " * 100, "", "third page " * 50]
+
+    documents = create_page_chunks(pages, "file.pdf", chunk_tokens=60, overlap_tokens=10)
+
+    assert {doc.metadata["page"] for doc in documents} == {1, 3}
+    assert [doc.metadata["chunk_index"] for doc in documents] == list(range(len(documents)))
+    for doc in documents:
+        page = pages[doc.metadata["page"] - 1]
+        assert page[doc.metadata["start_char"]:doc.metadata["end_char"]] == doc.page_content
@@ -0,0 +1,144 @@
+# test/test_upload_streaming.py
+
+import asyncio
+import threading
+import tracemalloc
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from backend.utils import upload_streaming
+from backend.utils.upload_staging import UploadStaging
+from backend.utils.upload_streaming import stream_pdf_upload
+
+BOUNDARY = b"test-boundary"
+CHUNK = 64 * 1024
+
+
+def multipart_chunks(file_head: bytes, file_size: int):
+    """A session_id field and one file part of file_size bytes, generated in CHUNK-sized pieces."""
+    yield (
+        b"--" + BOUNDARY + b"\r\n"
+        b'Content-Disposition: form-data; name="session_id"\r\n\r\nsession\r\n'
+        b"--" + BOUNDARY + b"\r\n"
+        b'Content-Disposition: form-data; name="files"; filename="contract.pdf"\r\n'
+        b"Content-Type: application/pdf\r\n\r\n"
+    )
+    yield file_head
+    filler = b"x" * CHUNK
+    remaining = file_size - len(file_head)
+    while remaining > 0:
+        yield filler[:remaining]
+        remaining -= CHUNK
+    yield b"\r\n--" + BOUNDARY + b"--\r\n"
+
+
+class StreamingBody:
+    """An ASGI receive callable over a chunk generator that counts how many chunks were read."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.read = 0
+
+    async def __call__(self):
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        self.read += 1
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+
+def make_request(body: StreamingBody, content_length: int = None) -> Request:
+    headers = [(b"content-type", b"multipart/form-data; boundary=" + BOUNDARY)]
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    return Request({"type": "http", "method": "POST", "path": "/process-pdfs/", "headers": headers}, body)
+
+
+def upload(body: StreamingBody, content_length: int = None, max_files: int = 5):
+    return asyncio.run(stream_pdf_upload(make_request(body, content_length), max_files=max_files))
+
+
+def test_oversized_file_is_rejected_before_the_body_is_read(monkeypatch):
+    monkeypatch.setattr(upload_streaming, "MAX_UPLOAD_FILE_BYTES", 1024 * 1024)
+    body = StreamingBody(multipart_chunks(b"%PDF-1.4\n", 8 * 1024 * 1024))
+
+    with pytest.raises(HTTPException) as rejected:
+        upload(body)
+
+    assert rejected.value.status_code == 413
+    assert body.read < 8 * 1024 * 1024 // CHUNK // 2
+
+
+def test_oversized_request_is_rejected_from_its_content_length(monkeypatch):
+    monkeypatch.setattr(upload_streaming, "MAX_UPLOAD_REQUEST_BYTES", 1024 * 1024)
+    body = StreamingBody(multipart_chunks(b"%PDF-1.4\n", 4 * 1024 * 1024))
+
+    with pytest.raises(HTTPException) as rejected:
+        upload(body, content_length=4 * 1024 * 1024)
+
+    assert rejected.value.status_code == 413
+    assert body.read == 0
+
+
+def test_non_pdf_is_rejected_after_its_header_window():
+    body = StreamingBody(multipart_chunks(b"GIF89a", 8 * 1024 * 1024))
+
+    with pytest.raises(HTTPException) as rejected:
+        upload(body)
+
+    assert rejected.value.status_code == 415
+    assert body.read <= 3
+
+
+def test_upload_is_streamed_and_staged_in_bounded_memory(tmp_path):
+    file_size = 16 * 1024 * 1024
+    staging = UploadStaging(str(tmp_path))
+    uploads = []
+
+    tracemalloc.start()
+    try:
+        fields, uploads = upload(StreamingBody(multipart_chunks(b"%PDF-1.4\n", file_size)))
+        name = staging.stage(uploads[0].chunks())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        for spooled in uploads:
+            spooled.close()
+
+    assert fields == {"session_id": "session"}
+    assert (tmp_path / name).stat().st_size == file_size
+    # The spool's in-memory buffer and one copy chunk, not the 16 MiB file.
+    assert peak < 4 * 1024 * 1024
+
+
+def test_too_many_files_are_rejected_with_the_limit():
+    body = StreamingBody(multipart_chunks(b"%PDF-1.4\n", CHUNK))
+
+    with pytest.raises(HTTPException) as rejected:
+        upload(body, max_files=0)
+
+    assert rejected.value.status_code == 400
+    assert rejected.value.detail == "You can only upload 0 files per chat."
+
+
+def test_writes_after_the_spool_rolls_over_leave_the_event_loop(monkeypatch):
+    monkeypatch.setattr(upload_streaming, "UPLOAD_SPOOL_MEMORY_BYTES", 4 * CHUNK)
+    write = upload_streaming.SpooledUpload.write
+    writes = []
+
+    def recorded_write(self, data):
+        writes.append((self.on_disk, threading.get_ident()))
+        return write(self, data)
+
+    monkeypatch.setattr(upload_streaming.SpooledUpload, "write", recorded_write)
+    loop_thread = threading.get_ident()
+    _, uploads = upload(StreamingBody(multipart_chunks(b"%PDF-1.4\n", 16 * CHUNK)))
+    for spooled in uploads:
+        spooled.close()
+
+    assert any(not on_disk for on_disk, _ in writes)
+    assert any(on_disk for on_disk, _ in writes)
+    assert all(thread == loop_thread for on_disk, thread in writes if not on_disk)
+    assert all(thread != loop_thread for on_disk, thread in writes if on_disk)
@@ -0,0 +1,100 @@
+# test/test_vector_quantization.py
+
+import numpy as np
+import pytest
+
+from backend.components.retrieval_cache import LRUCache
+from backend.components.vector_quantization import QuantizedIndex, QuantizedChroma, dequantize
+from backend.services import document_service as document_service_module
+
+
+@pytest.mark.parametrize("mode", ["float16", "int8"])
+def test_serialized_index_searches_like_the_original(mode):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 32)).astype(np.float32)
+    index = QuantizedIndex.from_embeddings([str(i) for i in range(500)], vectors, [{"filename": "a.pdf"}] * 500, mode)
+
+    loaded = QuantizedIndex.from_bytes(index.to_bytes())
+
+    np.testing.assert_array_equal(loaded.sq_norms, index.sq_norms)
+    assert loaded.search(vectors[7], 10) == index.search(vectors[7], 10)
+    assert loaded.search(vectors[7], 10)[0] == 7
+
+
+def test_quantized_index_is_decoded_once_per_process(services, session_id, pdf_file, monkeypatch):
+    monkeypatch.setattr(document_service_module, "VECTOR_QUANTIZATION", "int8")
+    document_service = services["document_service"]
+    document_service.process_documents(session_id, [pdf_file])
+    _, collection_name = document_service.get_collection_pointer(session_id)
+    document_service_module._quantized_index_cache.pop(collection_name)
+
+    decoded = []
+    original_from_bytes = QuantizedIndex.from_bytes
+    monkeypatch.setattr(QuantizedIndex, "from_bytes", lambda data: decoded.append(1) or original_from_bytes(data))
+    first = document_service.get_vector_store(session_id)
+    second = document_service.get_vector_store(session_id)
+
+    assert isinstance(first, QuantizedChroma)
+    assert len(decoded) == 1
+    assert first.quantized_index is second.quantized_index
+    query = document_service.embeddings.embed_query("payment terms")
+    assert [doc.id for doc in first.similarity_search_by_vector(query, k=3)]
+
+
+@pytest.fixture
+def quantized(services, session_id, pdf_file, monkeypatch):
+    monkeypatch.setattr(document_service_module, "VECTOR_QUANTIZATION", "int8")
+    services["document_service"].process_documents(session_id, [pdf_file])
+    return services["document_service"]
+
+
+def test_quantized_collections_keep_no_float32_vectors_in_chroma(quantized, session_id):
+    _, collection_name = quantized.get_collection_pointer(session_id)
+    stored = quantized.chroma_client.client.get_collection(collection_name).get(include=["embeddings", "documents"])
+    vector_store = quantized.get_vector_store(session_id)
+    query = quantized.embeddings.embed_query("payment terms")
+
+    assert stored["embeddings"].shape == (len(stored["ids"]), 1)
+    assert all(stored["documents"])
+    found = vector_store.similarity_search_by_vector(query, k=3)
+    # The index ranks by the exact distance to the reconstructed vectors.
+    index = vector_store.quantized_index
+    rows = index.rows_of([doc.id for doc in found])
+    reconstructed = dequantize(index.codes[rows], index.scales[rows])
+    distances = ((reconstructed - np.asarray(query, dtype=np.float32)) ** 2).sum(axis=1).tolist()
+    assert len(found) == 3 and distances == sorted(distances)
+
+
+def test_metadata_filters_are_searched_on_the_index(quantized, session_id):
+    vector_store = quantized.get_vector_store(session_id)
+    query = quantized.embeddings.embed_query("payment terms")
+    page = vector_store.similarity_search_by_vector(query, k=1)[0].metadata["page"]
+
+    found = vector_store.similarity_search_by_vector(query, k=3, filter={"page": page})
+
+    assert found and all(doc.metadata["page"] == page for doc in found)
+
+
+def test_lost_index_is_rebuilt_from_the_chunk_texts(quantized, session_id):
+    _, collection_name = quantized.get_collection_pointer(session_id)
+    query = quantized.embeddings.embed_query("payment terms")
+    expected = [doc.id for doc in quantized.get_vector_store(session_id).similarity_search_by_vector(query, k=3)]
+    document_service_module._quantized_index_cache.pop(collection_name)
+    quantized.cache_service.delete_keys(f"quantized_index:{collection_name}")
+
+    vector_store = quantized.get_vector_store(session_id)
+
+    assert isinstance(vector_store, QuantizedChroma)
+    assert [doc.id for doc in vector_store.similarity_search_by_vector(query, k=3)] == expected
+    assert quantized.cache_service.get_bytes(f"quantized_index:{collection_name}")
+
+
+def test_index_cache_is_bounded_by_bytes():
+    cache = LRUCache(100, weigh=len)
+    cache.put("a", b"x" * 60)
+    cache.put("b", b"x" * 30)
+    cache.put("c", b"x" * 30)
+    cache.put("huge", b"x" * 101)
+
+    assert cache.get("a") is None and cache.get("huge") is None
+    assert cache.weight == 60 and len(cache) == 2